@@ -24,22 +24,23 @@ type ResponseData = {
   retrieved_chunks?: number;
 };
 
-type RAGSearchResult = {
-  text: string;
-  metadata: {
-    document_id: string;
-    title: string;
-    date: string;
-    type: string;
-    level: string;
-    business_group: string;
-    region: string;
-    risk_type: string;
-    source_link: string;
-  };
+type RAGCitation = {
+  id: number;
+  document_id: string;
+  title: string;
+  source_link: string;
+  type: string;
+  level: string;
+  chunk_indices: number[];
   similarity_score: number;
-  chunk_index: number;
   token_count: number;
+  snippet: string;
+};
+
+type RAGContext = {
+  context: string;
+  token_count: number;
+  citations: RAGCitation[];
 };
 
 // Initialize Gemini
@@ -48,30 +49,39 @@ const genAI = new GoogleGenerativeAI(process.env.GEMINI_API_KEY || '');
 // RAG Service Configuration
 const RAG_SERVICE_URL = process.env.RAG_SERVICE_URL || 'http://localhost:8000';
 
-// Helper function to call RAG service
-async function searchRAGDocuments(query: string, top_k: number = 5): Promise<RAGSearchResult[]> {
+// Token budget for retrieved context in the prompt
+const RAG_CONTEXT_TOKEN_BUDGET = 2000;
+
+// Chunks below this cosine similarity are not worth sending to the model
+const RAG_MIN_SIMILARITY = Number(process.env.RAG_MIN_SIMILARITY || 0.3);
+
+// Helper function to fetch a token-budgeted, cited context from the RAG service
+async function fetchRAGContext(query: string, token_budget: number = RAG_CONTEXT_TOKEN_BUDGET): Promise<RAGContext | null> {
   try {
-    const response = await fetch(`${RAG_SERVICE_URL}/search`, {
+    const response = await fetch(`${RAG_SERVICE_URL}/context`, {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
+        // Chat lookups are scheduled ahead of batch jobs and ingestion
+        'X-Request-Class': 'interactive',
       },
       body: JSON.stringify({
         query,
-        top_k
+        token_budget,
+        max_per_document: 2,
+        min_score: RAG_MIN_SIMILARITY
       }),
     });
 
     if (!response.ok) {
       console.warn('RAG service not available, falling back to basic mode');
-      return [];
+      return null;
     }
 
-    const data = await response.json();
-    return data.results || [];
+    return await response.json();
   } catch (error) {
     console.warn('Failed to connect to RAG service:', error);
-    return [];
+    return null;
   }
 }
 
@@ -122,31 +132,23 @@ export default async function handler(
 
       if (ragAvailable) {
         try {
-          // Use RAG service to get relevant document chunks
-          const ragResults = await searchRAGDocuments(question, 5);
-          retrievedChunks = ragResults.length;
-
-          if (ragResults.length > 0) {
-            // Build rich context from retrieved chunks
-            context = ragResults.map((result, index) => 
-              `Document ${index + 1}: ${result.metadata.title}
-Type: ${result.metadata.type} | Risk Type: ${result.metadata.risk_type}
-Relevance: ${(result.similarity_score * 100).toFixed(1)}%
-
-Content:
-${result.text}
-
----`
-            ).join('\n\n');            // Build sources from RAG results with document navigation
-            ragSources = ragResults.map(result => ({
-              title: result.metadata.title,
-              source_url: result.metadata.source_link || '#',
-              regulation_type: result.metadata.level || 'Banking Regulation',
-              document_type: result.metadata.type,
-              similarity_score: result.similarity_score,
-              chunk_text: result.text.substring(0, 200) + '...',
-              document_id: result.metadata.document_id,
-              document_link: `#document-${result.metadata.document_id}`, // Frontend anchor link
+          // Context is packed server-side to the token budget, numbered to match the citations
+          const ragContext = await fetchRAGContext(question);
+          const citations = ragContext?.citations || [];
+          retrievedChunks = citations.length;
+
+          if (ragContext && citations.length > 0) {
+            context = ragContext.context;
+            // Build sources from the citations with document navigation
+            ragSources = citations.map(citation => ({
+              title: citation.title,
+              source_url: citation.source_link || '#',
+              regulation_type: citation.level || 'Banking Regulation',
+              document_type: citation.type,
+              similarity_score: citation.similarity_score,
+              chunk_text: citation.snippet + '...',
+              document_id: citation.document_id,
+              document_link: `#document-${citation.document_id}`, // Frontend anchor link
               view_in_documents: true // Flag to show "View in Documents" link
             }));
           }
@@ -174,7 +176,7 @@ INSTRUCTIONS:
 - Be specific and cite relevant information from the documents
 - Use **bold text** for key terms and important regulatory concepts
 - Use bullet points for lists of requirements or procedures  
-- Include specific document references when applicable
+- Cite sources by their bracketed numbers, e.g. [1], when applicable
 - Keep response focused and under 300 words
 - Use proper markdown formatting
 
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Measure ingestion memory as the input grows.
+Each run ingests N synthetic documents (copies of the bundled corpus) in a fresh interpreter
+and reports resident memory: the baseline after start-up, the peak (ru_maxrss) and what is
+still resident afterwards. The streaming pipeline's peak growth should stay close to what the
+store retains, while "materialized" (all chunks embedded in one call, the previous behaviour)
+peaks well above it as N grows. --stub-embedder swaps the model for random vectors so only
+the pipeline itself is measured (and no model has to be downloaded).
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+SNIPPET = """
+import itertools, json, os, resource, time
+import numpy as np
+from rag_processor import BankingRAGProcessor
+from document_sources import load_documents
+
+def rss_mb():
+    # Current resident set size; ru_maxrss only reports the peak
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+class StubModel:
+    def __init__(self, dimension):
+        self.dimension = dimension
+        self.rng = np.random.default_rng(0)
+
+    def encode(self, texts, convert_to_numpy=True, **kwargs):
+        return self.rng.standard_normal((len(texts), self.dimension)).astype("float32")
+
+corpus = load_documents()
+def documents(n):
+    for i, doc in enumerate(itertools.islice(itertools.cycle(corpus), n)):
+        yield {{**doc, "id": f"bench-{{i}}"}}
+
+processor = BankingRAGProcessor()
+if {stub}:
+    processor.embedder._model = StubModel(processor.vector_store.dimension)
+processor.embedder.model.encode(["warm up"])
+processor.embedder.encoding.encode("warm up")
+baseline_rss = rss_mb()
+start = time.perf_counter()
+if "{mode}" == "streaming":
+    processor.process_banking_documents(documents({n}))
+else:
+    chunks = [chunk for doc in documents({n})
+              for chunk in processor.chunk_document(processor.enhance_document(doc))]
+    processor.vector_store.add_documents(chunks, processor.embedder.embed_chunks(chunks))
+    del chunks
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "chunks": len(processor.vector_store.chunks),
+    "seconds": round(elapsed, 2),
+    "baseline_rss_mb": round(baseline_rss, 1),
+    "peak_rss_mb": round(peak_rss_mb(), 1),
+    "peak_growth_mb": round(peak_rss_mb() - baseline_rss, 1),
+    "retained_mb": round(rss_mb() - baseline_rss, 1)
+}}))
+"""
+
+def run(mode: str, n: int, stub_embedder: bool = False) -> dict:
+    """Ingest n documents in a fresh interpreter and return its measurements."""
+    output = subprocess.run(
+        [sys.executable, "-c", SNIPPET.format(mode=mode, n=n, stub=stub_embedder)],
+        capture_output=True, text=True, check=True
+    ).stdout.strip().splitlines()
+    return json.loads(output[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure ingestion memory against input size")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 400, 1600], help="Document counts to ingest")
+    parser.add_argument("--modes", nargs="+", default=["streaming", "materialized"], help="Pipelines to compare")
+    parser.add_argument("--stub-embedder", action="store_true", help="Embed with random vectors instead of the model")
+    args = parser.parse_args()
+
+    results = {}
+    for mode in args.modes:
+        results[mode] = {}
+        for n in args.sizes:
+            results[mode][n] = run(mode, n, args.stub_embedder)
+            print(f"{mode} n={n}: {results[mode][n]}")
+
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
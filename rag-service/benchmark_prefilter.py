@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Compare exact IndexFlatIP search with the binary-prefilter two-stage search.
+Reports index memory, per-query latency (p50/p95) and recall@k against the exact results,
+for a saved store or a synthetic clustered corpus, across candidate pool sizes.
+"""
+
+import argparse
+import json
+import statistics
+import time
+from typing import List, Dict, Any
+
+import numpy as np
+
+from rag_processor import FAISSVectorStore, DEFAULT_VECTOR_STORE_PATH
+
+def synthetic_store(n: int, dimension: int, clusters: int, seed: int) -> FAISSVectorStore:
+    """Clustered random vectors, a rough stand-in for topic structure in real embeddings."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dimension)).astype("float32")
+    vectors = centers[rng.integers(0, clusters, n)] + 0.8 * rng.standard_normal((n, dimension)).astype("float32")
+    store = FAISSVectorStore(dimension)
+    chunks = [{"text": "", "metadata": {"document_id": str(i)}, "chunk_index": 0, "token_count": 0} for i in range(n)]
+    store.add_documents(chunks, vectors)
+    return store
+
+def make_queries(store: FAISSVectorStore, count: int, noise: float, seed: int) -> np.ndarray:
+    """Perturbed copies of stored (unit-length) vectors; noise is the relative norm of the perturbation."""
+    rng = np.random.default_rng(seed + 1)
+    picks = rng.integers(0, store.index.ntotal, count)
+    base = store.index.reconstruct_batch(picks.astype("int64"))
+    perturbation = rng.standard_normal(base.shape) * noise / np.sqrt(base.shape[1])
+    return (base + perturbation).astype("float32")
+
+def measure(store: FAISSVectorStore, queries: np.ndarray, top_k: int) -> Dict[str, Any]:
+    """Search every query, returning latencies in ms and the result IDs."""
+    latencies = []
+    ids = []
+    for query in queries:
+        start = time.perf_counter()
+        results = store.search(query.copy(), top_k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        ids.append([r["metadata"]["document_id"] for r in results])
+    latencies.sort()
+    return {
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 3),
+        "ids": ids
+    }
+
+def recall(exact: List[List[str]], approx: List[List[str]]) -> float:
+    hits = sum(len(set(e) & set(a)) for e, a in zip(exact, approx))
+    return round(hits / max(sum(len(e) for e in exact), 1), 4)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the binary prefilter against exact search")
+    parser.add_argument("--store", help=f"Saved store to load (e.g. {DEFAULT_VECTOR_STORE_PATH}); synthetic if omitted")
+    parser.add_argument("--synthetic", type=int, default=100_000, help="Synthetic corpus size")
+    parser.add_argument("--dimension", type=int, default=384, help="Synthetic vector dimension")
+    parser.add_argument("--clusters", type=int, default=200, help="Synthetic topic clusters")
+    parser.add_argument("--queries", type=int, default=200, help="Queries to run")
+    parser.add_argument("--top-k", type=int, default=10, help="Results per query")
+    parser.add_argument("--pools", type=int, nargs="+", default=[50, 100, 200, 500, 1000], help="Candidate pool sizes")
+    parser.add_argument("--kinds", nargs="+", default=["flat", "hnsw"], help="Binary index kinds")
+    parser.add_argument("--query-noise", type=float, default=0.5, help="Relative perturbation of query vectors")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.store:
+        store = FAISSVectorStore()
+        store.load(args.store)
+    else:
+        store = synthetic_store(args.synthetic, args.dimension, args.clusters, args.seed)
+    queries = make_queries(store, args.queries, noise=args.query_noise, seed=args.seed)
+
+    exact = measure(store, queries, args.top_k)
+    report = {
+        "vectors": int(store.index.ntotal),
+        "exact": {"index_bytes": store.index_memory_bytes(), "p50_ms": exact["p50_ms"], "p95_ms": exact["p95_ms"]},
+        "prefilter": []
+    }
+    print(f"exact IndexFlatIP: {report['exact']}")
+
+    for kind in args.kinds:
+        for pool in args.pools:
+            start = time.perf_counter()
+            store.enable_binary_prefilter(kind, pool)
+            build_seconds = time.perf_counter() - start
+            run = measure(store, queries, args.top_k)
+            row = {
+                "kind": kind,
+                "candidate_pool": pool,
+                "binary_index_bytes": store.binary_index_memory_bytes(),
+                "build_seconds": round(build_seconds, 2),
+                "p50_ms": run["p50_ms"],
+                "p95_ms": run["p95_ms"],
+                f"recall@{args.top_k}": recall(exact["ids"], run["ids"])
+            }
+            report["prefilter"].append(row)
+            print(row)
+
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Measure cold-start cost of the RAG service.
+Each measurement runs in a fresh interpreter so module caches do not hide import time.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# Snippets executed in a fresh interpreter; each prints elapsed seconds
+MEASUREMENTS = {
+    "import_rag_processor": """
+import time
+start = time.perf_counter()
+import rag_processor
+print(time.perf_counter() - start)
+""",
+    "search_only_processor": """
+import time, os
+start = time.perf_counter()
+from rag_processor import BankingRAGProcessor
+processor = BankingRAGProcessor(search_only=True)
+path = "{store_path}"
+if os.path.exists(path + ".faiss"):
+    processor.load_vector_store(path)
+print(time.perf_counter() - start)
+""",
+    "modules_loaded_after_import": """
+import sys
+import rag_processor
+heavy = ["sentence_transformers", "torch", "faiss", "tiktoken", "pickle"]
+print(len([name for name in heavy if name in sys.modules]))
+""",
+}
+
+def run_snippet(snippet: str) -> float:
+    """Run a snippet in a fresh interpreter and return the number it prints."""
+    output = subprocess.run(
+        [sys.executable, "-c", snippet],
+        capture_output=True, text=True, check=True
+    ).stdout.strip().splitlines()
+    return float(output[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure RAG service startup time")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per measurement")
+    parser.add_argument("--store", default="./data/banking_vector_store", help="Vector store path to load")
+    args = parser.parse_args()
+
+    results = {}
+    for name, snippet in MEASUREMENTS.items():
+        samples = [run_snippet(snippet.format(store_path=args.store)) for _ in range(args.runs)]
+        results[name] = {
+            "median": round(statistics.median(samples), 4),
+            "min": round(min(samples), 4),
+            "max": round(max(samples), 4)
+        }
+        print(f"{name}: median {results[name]['median']} (min {results[name]['min']}, max {results[name]['max']})")
+
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
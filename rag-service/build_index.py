@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Offline bulk index builder for the Banking RAG service.
+Reads document directories (markdown, JSONL) and pipelines read -> chunk -> embed -> index
+with bounded queues between stages. Progress is checkpointed every N documents so a
+crashed build resumes where it stopped. The finished store is written where main.py loads it.
+"""
+
+import argparse
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import List, Dict, Any
+
+import numpy as np
+
+from rag_processor import BankingRAGProcessor, DEFAULT_VECTOR_STORE_PATH, DEFAULT_EMBEDDING_MODEL
+from document_sources import DocumentSource
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Marks the end of a stage's output
+_END = object()
+# How often a stage blocked on a queue re-checks whether the build was stopped
+STAGE_POLL_SECONDS = 0.1
+
+class IndexCheckpoint:
+    """Tracks completed documents and the partial store written for them."""
+
+    def __init__(self, output_path: str):
+        self.output_path = output_path
+        self.state_path = f"{output_path}.checkpoint.json"
+        self.completed = set()
+        self.store_path = None
+        self.generation = 0
+
+    def load(self) -> bool:
+        """Load checkpoint state from disk. Returns False when there is none."""
+        if not os.path.exists(self.state_path):
+            return False
+        with open(self.state_path, encoding="utf-8") as f:
+            state = json.load(f)
+        self.completed = set(state["completed"])
+        self.store_path = state["store_path"]
+        self.generation = state["generation"]
+        return True
+
+    def save(self, processor: BankingRAGProcessor):
+        """Write the partial store, then atomically point the state file at it."""
+        previous_store = self.store_path
+        self.generation += 1
+        self.store_path = f"{self.output_path}.partial-{self.generation}"
+        processor.save_vector_store(self.store_path)
+
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "completed": sorted(self.completed),
+                "store_path": self.store_path,
+                "generation": self.generation
+            }, f)
+        os.replace(tmp_path, self.state_path)
+
+        if previous_store:
+            _remove_store_files(previous_store)
+        logger.info(f"Checkpoint {self.generation}: {len(self.completed)} documents indexed")
+
+    def clear(self):
+        """Remove checkpoint state and the partial store once the build is complete."""
+        if self.store_path:
+            _remove_store_files(self.store_path)
+        if os.path.exists(self.state_path):
+            os.remove(self.state_path)
+
+    def discard(self):
+        """Drop any existing checkpoint so the next build starts from scratch."""
+        self.load()
+        self.clear()
+        self.completed = set()
+        self.store_path = None
+        self.generation = 0
+
+def _remove_store_files(path: str):
+    for suffix in (".faiss", ".chunks", ".stats.json", ".catalog.json", ".meta.json",
+                   ".docs.faiss", ".docs.json"):
+        if os.path.exists(f"{path}{suffix}"):
+            os.remove(f"{path}{suffix}")
+
+class BulkIndexBuilder:
+    """Pipelines read -> chunk -> embed -> index with bounded queues between stages."""
+
+    def __init__(self, processor: BankingRAGProcessor, output_path: str = DEFAULT_VECTOR_STORE_PATH,
+                 checkpoint_every: int = 1000, batch_size: int = 256, queue_size: int = 64):
+        self.processor = processor
+        self.output_path = output_path
+        self.checkpoint_every = checkpoint_every
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.checkpoint = IndexCheckpoint(output_path)
+        self.errors: List[BaseException] = []
+        # Set when any stage (or the indexing loop) fails, so no stage blocks on a queue forever
+        self._stop = threading.Event()
+
+    def _put(self, out_queue: queue.Queue, item: Any) -> bool:
+        """Put an item, giving up (False) once the build is stopped."""
+        while not self._stop.is_set():
+            try:
+                out_queue.put(item, timeout=STAGE_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, in_queue: queue.Queue) -> Any:
+        """Get an item, or _END once the build is stopped."""
+        while not self._stop.is_set():
+            try:
+                return in_queue.get(timeout=STAGE_POLL_SECONDS)
+            except queue.Empty:
+                continue
+        return _END
+
+    def _fail(self, error: BaseException):
+        self.errors.append(error)
+        self._stop.set()
+
+    def _read_stage(self, inputs: List[str], out_queue: queue.Queue):
+        try:
+            for key, doc in DocumentSource(inputs).iter_changes():
+                if key not in self.checkpoint.completed and not self._put(out_queue, (key, doc)):
+                    return
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            self._put(out_queue, _END)
+
+    def _chunk_stage(self, in_queue: queue.Queue, out_queue: queue.Queue):
+        try:
+            while True:
+                item = self._get(in_queue)
+                if item is _END:
+                    break
+                key, doc = item
+                chunks = self.processor.chunk_document(self.processor.enhance_document(doc))
+                if not self._put(out_queue, (key, chunks)):
+                    return
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            self._put(out_queue, _END)
+
+    def _index_batch(self, keys: List[str], chunks: List[Dict[str, Any]]):
+        if chunks:
+            embeddings = self.processor.embedder.embed_chunks(chunks)
+            self.processor.vector_store.add_documents(chunks, np.asarray(embeddings, dtype="float32"))
+        self.checkpoint.completed.update(keys)
+
+    def build(self, inputs: List[str], resume: bool = True) -> Dict[str, Any]:
+        """Build the store from the inputs, resuming from a checkpoint when one exists."""
+        if resume and self.checkpoint.load():
+            self.processor.load_vector_store(self.checkpoint.store_path)
+            logger.info(f"Resuming from checkpoint with {len(self.checkpoint.completed)} documents done")
+
+        start = time.perf_counter()
+        self.errors = []
+        self._stop.clear()
+        docs_queue = queue.Queue(maxsize=self.queue_size)
+        chunks_queue = queue.Queue(maxsize=self.queue_size)
+        stages = [
+            threading.Thread(target=self._read_stage, args=(inputs, docs_queue), daemon=True),
+            threading.Thread(target=self._chunk_stage, args=(docs_queue, chunks_queue), daemon=True)
+        ]
+        for stage in stages:
+            stage.start()
+
+        # Embed and index on this thread, whole documents per batch so checkpoints stay consistent
+        documents_indexed = 0
+        chunks_indexed = 0
+        since_checkpoint = 0
+        batch_keys: List[str] = []
+        batch_chunks: List[Dict[str, Any]] = []
+        try:
+            while True:
+                item = self._get(chunks_queue)
+                if item is _END:
+                    break
+                key, chunks = item
+                batch_keys.append(key)
+                batch_chunks.extend(chunks)
+                if len(batch_chunks) >= self.batch_size:
+                    self._index_batch(batch_keys, batch_chunks)
+                    documents_indexed += len(batch_keys)
+                    chunks_indexed += len(batch_chunks)
+                    since_checkpoint += len(batch_keys)
+                    batch_keys, batch_chunks = [], []
+                    if since_checkpoint >= self.checkpoint_every:
+                        self.checkpoint.save(self.processor)
+                        since_checkpoint = 0
+        except BaseException:
+            self._stop.set()
+            raise
+        finally:
+            for stage in stages:
+                stage.join(timeout=STAGE_POLL_SECONDS * 10)
+
+        if self.errors:
+            # Keep the last checkpoint so the next run resumes from it
+            raise self.errors[0]
+
+        self._index_batch(batch_keys, batch_chunks)
+        documents_indexed += len(batch_keys)
+        chunks_indexed += len(batch_chunks)
+
+        self.processor.save_vector_store(self.output_path)
+        self.checkpoint.clear()
+
+        elapsed = time.perf_counter() - start
+        return {
+            "documents_indexed": documents_indexed,
+            "chunks_indexed": chunks_indexed,
+            "total_chunks": len(self.processor.vector_store.chunks),
+            "seconds": round(elapsed, 2)
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the banking vector store offline")
+    parser.add_argument("inputs", nargs="+", help="Document directories or .md/.jsonl files")
+    parser.add_argument("--output", default=DEFAULT_VECTOR_STORE_PATH, help="Vector store path (without extension)")
+    parser.add_argument("--checkpoint-every", type=int, default=1000, help="Documents between checkpoints")
+    parser.add_argument("--batch-size", type=int, default=256, help="Chunks per embedding batch")
+    parser.add_argument("--queue-size", type=int, default=64, help="Bounded queue size between stages")
+    parser.add_argument("--no-resume", action="store_true", help="Ignore any existing checkpoint")
+    parser.add_argument("--model", default=DEFAULT_EMBEDDING_MODEL, help="Embedding model name")
+    args = parser.parse_args()
+
+    builder = BulkIndexBuilder(
+        BankingRAGProcessor(model_name=args.model),
+        output_path=args.output,
+        checkpoint_every=args.checkpoint_every,
+        batch_size=args.batch_size,
+        queue_size=args.queue_size
+    )
+    if args.no_resume:
+        builder.checkpoint.discard()
+
+    summary = builder.build(args.inputs, resume=not args.no_resume)
+    print(json.dumps(summary, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+Named vector-store collections served from one process.
+Every collection has its own index, chunk store and sidecar files under a base directory,
+while all of them share a single loaded embedding model. Loaded collections are kept in
+LRU order and the least recently used ones are unloaded to disk when the memory budget
+is exceeded.
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+
+from rag_processor import BankingRAGProcessor, DocumentEmbedder, DEFAULT_CANDIDATE_POOL, read_store_metadata
+from corpus_stats import CorpusStats
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COLLECTIONS_DIR = "./data/collections"
+
+# Rough in-memory cost of chunk text and metadata per token, added to the index size
+BYTES_PER_TOKEN = 6
+
+# Average characters per token, for sizing documents before they are chunked
+CHARS_PER_TOKEN = 4
+
+_NAME_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]{0,63}$")
+
+class CollectionLimitError(Exception):
+    """Raised when an ingest would take a collection over its memory limit."""
+
+def collection_memory_bytes(processor: BankingRAGProcessor) -> int:
+    """Estimated memory held by a collection: index vectors plus chunk text."""
+    vector_store = processor.vector_store
+    return (vector_store.index_memory_bytes() + vector_store.binary_index_memory_bytes()
+            + vector_store.stats.total_tokens * BYTES_PER_TOKEN)
+
+class CollectionManager:
+    """Loads, creates and evicts named collections that share one embedder."""
+
+    def __init__(self, embedder: DocumentEmbedder, base_dir: str = DEFAULT_COLLECTIONS_DIR,
+                 memory_limit_bytes: int = 0, collection_limit_bytes: int = 0,
+                 search_only: bool = False, binary_prefilter: Optional[str] = None,
+                 candidate_pool: int = DEFAULT_CANDIDATE_POOL):
+        self.embedder = embedder
+        self.base_dir = base_dir
+        # Budget for all loaded collections together (0 = unlimited)
+        self.memory_limit_bytes = memory_limit_bytes
+        # Maximum size of a single collection (0 = unlimited)
+        self.collection_limit_bytes = collection_limit_bytes
+        self.search_only = search_only
+        # Two-stage search settings applied to every loaded collection
+        self.binary_prefilter = binary_prefilter
+        self.candidate_pool = candidate_pool
+        self.loaded: "OrderedDict[str, BankingRAGProcessor]" = OrderedDict()
+        self.last_used: Dict[str, float] = {}
+        self._lock = threading.RLock()
+        # Per-collection load locks: loading from disk happens outside the manager lock
+        self._load_locks: Dict[str, threading.Lock] = {}
+        # Per-collection ingest locks, and collections with ingests in flight (never unloaded)
+        self._ingest_locks: Dict[str, threading.Lock] = {}
+        self._ingesting: Dict[str, int] = {}
+        self.metrics = {"loads": 0, "unloads": 0}
+
+    def _path(self, name: str) -> str:
+        if not _NAME_PATTERN.match(name):
+            raise ValueError(f"Invalid collection name: {name!r}")
+        return os.path.join(self.base_dir, name, "vector_store")
+
+    def exists(self, name: str) -> bool:
+        return name in self.loaded or os.path.exists(f"{self._path(name)}.faiss")
+
+    def names(self) -> List[str]:
+        """All collections, loaded or on disk."""
+        on_disk = []
+        if os.path.isdir(self.base_dir):
+            on_disk = [name for name in os.listdir(self.base_dir)
+                       if _NAME_PATTERN.match(name) and os.path.exists(f"{self._path(name)}.faiss")]
+        return sorted(set(on_disk) | set(self.loaded))
+
+    def _touch(self, name: str) -> Optional[BankingRAGProcessor]:
+        """Mark a loaded collection as most recently used (call with the manager lock held)."""
+        processor = self.loaded.get(name)
+        if processor is not None:
+            self.loaded.move_to_end(name)
+            self.last_used[name] = time.time()
+            self._enforce_budget(keep=name)
+        return processor
+
+    def get(self, name: str, create: bool = False) -> BankingRAGProcessor:
+        """Return a loaded collection, loading it from disk (or creating it) if needed.
+
+        Loading holds only that collection's load lock, so other collections stay available meanwhile.
+        """
+        path = self._path(name)
+        with self._lock:
+            processor = self._touch(name)
+            if processor is not None:
+                return processor
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                # Another request may have loaded it while this one waited
+                processor = self._touch(name)
+                if processor is not None:
+                    return processor
+            if not os.path.exists(f"{path}.faiss") and not create:
+                raise KeyError(f"Collection {name} does not exist")
+            processor = BankingRAGProcessor(search_only=self.search_only, embedder=self.embedder)
+            from_disk = os.path.exists(f"{path}.faiss")
+            if from_disk:
+                start = time.perf_counter()
+                processor.load_vector_store(path)
+                logger.info(f"Loaded collection {name} in {time.perf_counter() - start:.2f}s")
+            if self.binary_prefilter:
+                processor.vector_store.enable_binary_prefilter(self.binary_prefilter, self.candidate_pool)
+            with self._lock:
+                if from_disk:
+                    self.metrics["loads"] += 1
+                self.loaded[name] = processor
+                return self._touch(name)
+
+    def process_documents(self, name: str, documents: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Ingest documents into a collection (created on first use) and save it.
+
+        The manager lock is only held for bookkeeping; loading, chunking, embedding and saving run
+        under per-collection locks, so an ingest never blocks searches on other collections.
+        """
+        if self.search_only:
+            raise RuntimeError("Document ingestion is disabled in search-only mode")
+        with self._lock:
+            created = not self.exists(name)
+            ingest_lock = self._ingest_locks.setdefault(name, threading.Lock())
+            # Registered before loading so the budget never unloads it mid-ingest
+            self._ingesting[name] = self._ingesting.get(name, 0) + 1
+        try:
+            processor = self.get(name, create=True)
+            with ingest_lock:
+                if self.collection_limit_bytes:
+                    projected = collection_memory_bytes(processor) + self._ingest_bytes(processor, documents)
+                    if projected > self.collection_limit_bytes:
+                        if created:
+                            self.unload(name)
+                        raise CollectionLimitError(
+                            f"Collection {name} would grow to {projected} bytes, "
+                            f"over its limit of {self.collection_limit_bytes}"
+                        )
+
+                chunks_added = processor.process_banking_documents(documents)
+                processor.save_vector_store(self._path(name))
+        finally:
+            with self._lock:
+                self._ingesting[name] -= 1
+                if not self._ingesting[name]:
+                    del self._ingesting[name]
+        with self._lock:
+            self._enforce_budget(keep=name)
+        return {
+            "collection": name,
+            "documents_processed": len(documents),
+            "chunks_added": chunks_added,
+            "total_chunks": len(processor.vector_store.chunks)
+        }
+
+    def _ingest_bytes(self, processor: BankingRAGProcessor, documents: List[Dict[str, Any]]) -> int:
+        """Estimated memory the documents would add, from their text length (nothing is chunked or embedded)."""
+        embedder = processor.embedder
+        stride = embedder.chunk_size - embedder.chunk_overlap
+        added = 0
+        for doc in documents:
+            enhanced = processor.enhance_document(doc)
+            text_length = sum(len(str(enhanced.get(field) or "")) for field in ("title", "summary", "content"))
+            tokens = text_length // CHARS_PER_TOKEN + 1
+            chunks = -(-tokens // stride)
+            # Overlapping tokens are stored once per chunk they appear in
+            added += (tokens + chunks * embedder.chunk_overlap) * BYTES_PER_TOKEN
+            added += chunks * processor.vector_store.dimension * 4
+        return added
+
+    def stats(self, name: str) -> Dict[str, Any]:
+        """Collection statistics; unloaded collections are answered from their saved stats."""
+        path = self._path(name)
+        with self._lock:
+            processor = self.loaded.get(name)
+            if processor is not None:
+                return {
+                    **processor.vector_store.stats.summary(),
+                    "index_memory_bytes": processor.vector_store.index_memory_bytes(),
+                    "memory_bytes": collection_memory_bytes(processor),
+                    "loaded": True
+                }
+        if not os.path.exists(f"{path}.faiss"):
+            raise KeyError(f"Collection {name} does not exist")
+        summary = CorpusStats.load(f"{path}.stats.json").summary() if os.path.exists(f"{path}.stats.json") else {}
+        return {**summary, "model": read_store_metadata(path), "loaded": False}
+
+    def unload(self, name: str) -> bool:
+        """Drop a loaded collection from memory; it is reloaded from disk on next use."""
+        with self._lock:
+            processor = self.loaded.pop(name, None)
+            if processor is None:
+                return False
+            # Collections are saved after every ingest, so there is nothing to flush here
+            self.last_used.pop(name, None)
+            self.metrics["unloads"] += 1
+            logger.info(f"Unloaded collection {name}")
+            return True
+
+    def loaded_memory_bytes(self) -> int:
+        return sum(collection_memory_bytes(processor) for processor in self.loaded.values())
+
+    def _enforce_budget(self, keep: str):
+        """Unload least recently used collections until the loaded set fits the budget."""
+        if not self.memory_limit_bytes:
+            return
+        for name in list(self.loaded):
+            if self.loaded_memory_bytes() <= self.memory_limit_bytes:
+                break
+            if name != keep and name not in self._ingesting:
+                self.unload(name)
+
+    def status(self) -> Dict[str, Any]:
+        """Loaded collections, memory use and load/unload counts for /health."""
+        with self._lock:
+            return {
+                "loaded": {
+                    name: {"memory_bytes": collection_memory_bytes(processor), "last_used": self.last_used.get(name)}
+                    for name, processor in self.loaded.items()
+                },
+                "loaded_memory_bytes": self.loaded_memory_bytes(),
+                "memory_limit_bytes": self.memory_limit_bytes,
+                "collection_limit_bytes": self.collection_limit_bytes,
+                **self.metrics
+            }
@@ -0,0 +1,83 @@
+"""
+Context-window expansion for search hits.
+Grows each hit with neighbouring chunks of its document through the vector store's
+adjacency index, de-duplicating chunks across hits and trimming to a token budget.
+"""
+
+from typing import List, Dict, Any, Optional
+
+from diversification import join_overlapping
+
+def truncate_tokens(text: str, max_tokens: int, encoding, keep_end: bool = False) -> str:
+    """Keep the first (or last) max_tokens tokens of a text."""
+    tokens = encoding.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    kept = tokens[-max_tokens:] if keep_end else tokens[:max_tokens]
+    return encoding.decode(kept).strip()
+
+def expand_hits(results: List[Dict[str, Any]], vector_store, encoding, window: int = 1,
+                full_document: bool = False, token_budget: int = 2000,
+                overlap_tokens: int = 0) -> List[Dict[str, Any]]:
+    """Expand each hit to its neighbouring chunks (±window, or the whole document).
+
+    Hits are processed in rank order and share one token budget. Chunks already included
+    by a better-ranked hit are not repeated; hits fully covered by an earlier expansion are
+    dropped. Expanded hits get `text` replaced by the span and list `expanded_chunk_indices`.
+    """
+    used = set()
+    remaining = token_budget
+    expanded = []
+
+    for result in results:
+        doc_id = result.get("metadata", {}).get("document_id", "")
+        hit_index = result.get("chunk_index", 0)
+        if (doc_id, hit_index) in used or remaining <= 0:
+            continue
+
+        budget_before = remaining
+        text = result["text"]
+        cost = result.get("token_count", 0)
+        if cost > remaining:
+            text = truncate_tokens(text, remaining, encoding)
+            cost = remaining
+        pieces = {hit_index: text}
+        used.add((doc_id, hit_index))
+        remaining -= cost
+
+        # Alternate after/before the hit so the span stays centred on it
+        distance = 1
+        blocked = {1: False, -1: False}
+        while remaining > 0 and not all(blocked.values()) and (full_document or distance <= window):
+            for direction in (1, -1):
+                if blocked[direction] or remaining <= 0:
+                    continue
+                neighbour_index = hit_index + direction * distance
+                key = (doc_id, neighbour_index)
+                neighbour: Optional[Dict[str, Any]] = vector_store.get_chunk(doc_id, neighbour_index)
+                if neighbour is None or key in used:
+                    blocked[direction] = True
+                    continue
+
+                neighbour_text = neighbour["text"]
+                extra = max(neighbour.get("token_count", 0) - overlap_tokens, 0)
+                if extra > remaining:
+                    neighbour_text = truncate_tokens(neighbour_text, remaining, encoding, keep_end=direction < 0)
+                    extra = remaining
+                pieces[neighbour_index] = neighbour_text
+                used.add(key)
+                remaining -= extra
+            distance += 1
+
+        ordered = sorted(pieces)
+        span_text = pieces[ordered[0]]
+        for index in ordered[1:]:
+            span_text = join_overlapping(span_text, pieces[index])
+
+        item = result.copy()
+        item["text"] = span_text
+        item["expanded_chunk_indices"] = ordered
+        item["expanded_token_count"] = budget_before - remaining
+        expanded.append(item)
+
+    return expanded
@@ -0,0 +1,78 @@
+"""
+Token-budgeted context assembly for LLM prompts.
+Packs ranked, de-duplicated search hits into a single context string with numbered
+citations, counting tokens with the ingest-time token_count of each chunk.
+"""
+
+from typing import List, Dict, Any
+
+from context_expansion import truncate_tokens
+
+# Separator placed between packed chunks
+CHUNK_SEPARATOR = "\n\n---\n\n"
+
+# Do not bother truncating a chunk into less room than this
+MIN_PARTIAL_TOKENS = 64
+
+def _chunk_header(number: int, metadata: Dict[str, Any]) -> str:
+    return (
+        f"[{number}] {metadata.get('title', '')}\n"
+        f"Type: {metadata.get('type', '')} | Risk Type: {metadata.get('risk_type', '')} | Date: {metadata.get('date', '')}\n\n"
+    )
+
+def pack_context(results: List[Dict[str, Any]], token_budget: int, encoding,
+                 snippet_chars: int = 200) -> Dict[str, Any]:
+    """Pack results, best first, into a context string of at most token_budget tokens.
+
+    Chunks already covered by an earlier (merged) hit are skipped. A chunk that does not fit
+    is truncated to the remaining room if at least MIN_PARTIAL_TOKENS are left, which fills
+    the budget; otherwise it is skipped in favour of smaller ones.
+    Returns the context, its token count and one citation per packed chunk.
+    """
+    separator_tokens = len(encoding.encode(CHUNK_SEPARATOR))
+    remaining = token_budget
+    covered = set()
+    blocks = []
+    citations = []
+
+    for result in results:
+        metadata = result.get("metadata", {})
+        doc_id = metadata.get("document_id", "")
+        indices = result.get("chunk_indices") or [result.get("chunk_index", 0)]
+        if all((doc_id, index) in covered for index in indices):
+            continue
+
+        header = _chunk_header(len(citations) + 1, metadata)
+        overhead = len(encoding.encode(header)) + (separator_tokens if blocks else 0)
+        text = result["text"]
+        cost = result.get("token_count") or len(encoding.encode(text))
+        if overhead + cost > remaining:
+            room = remaining - overhead
+            if room < MIN_PARTIAL_TOKENS:
+                continue
+            text = truncate_tokens(text, room, encoding)
+            cost = room
+
+        blocks.append(header + text)
+        covered.update((doc_id, index) for index in indices)
+        remaining -= overhead + cost
+        citations.append({
+            "id": len(citations) + 1,
+            "document_id": doc_id,
+            "title": metadata.get("title", ""),
+            "source_link": metadata.get("source_link", ""),
+            "type": metadata.get("type", ""),
+            "level": metadata.get("level", ""),
+            "chunk_indices": indices,
+            "similarity_score": result.get("similarity_score"),
+            "token_count": cost,
+            "snippet": text[:snippet_chars]
+        })
+        if remaining < MIN_PARTIAL_TOKENS:
+            break
+
+    return {
+        "context": CHUNK_SEPARATOR.join(blocks),
+        "token_count": token_budget - remaining,
+        "citations": citations
+    }
@@ -0,0 +1,141 @@
+"""
+Incrementally maintained corpus statistics.
+Updated as chunks are added and documents deleted, and persisted next to the vector store,
+so /stats and /health never have to scan the chunk list.
+"""
+
+import json
+import os
+from collections import Counter
+from typing import List, Dict, Any
+
+# Metadata fields broken down in /stats
+BREAKDOWN_FIELDS = ("type", "risk_type", "region", "business_group")
+
+class CorpusStats:
+    """Running per-document and per-field counts for a vector store."""
+
+    def __init__(self):
+        self.total_chunks = 0
+        self.total_tokens = 0
+        # document_id -> {"chunks", "tokens", and the breakdown field values}
+        self.documents: Dict[str, Dict[str, Any]] = {}
+        self.document_counts = {field: Counter() for field in BREAKDOWN_FIELDS}
+        self.chunk_counts = {field: Counter() for field in BREAKDOWN_FIELDS}
+
+    def add_chunks(self, chunks: List[Dict[str, Any]]):
+        """Account for newly indexed chunks."""
+        for chunk in chunks:
+            metadata = chunk.get("metadata", {})
+            doc_id = metadata.get("document_id", "")
+            tokens = chunk.get("token_count", 0)
+
+            doc = self.documents.get(doc_id)
+            if doc is None:
+                doc = {"chunks": 0, "tokens": 0}
+                for field in BREAKDOWN_FIELDS:
+                    doc[field] = metadata.get(field, "Unknown")
+                    self.document_counts[field][doc[field]] += 1
+                self.documents[doc_id] = doc
+
+            doc["chunks"] += 1
+            doc["tokens"] += tokens
+            for field in BREAKDOWN_FIELDS:
+                self.chunk_counts[field][metadata.get(field, "Unknown")] += 1
+            self.total_chunks += 1
+            self.total_tokens += tokens
+
+    def remove_chunks(self, chunks: List[Dict[str, Any]]):
+        """Account for chunks removed from the index."""
+        for chunk in chunks:
+            metadata = chunk.get("metadata", {})
+            doc_id = metadata.get("document_id", "")
+            tokens = chunk.get("token_count", 0)
+
+            for field in BREAKDOWN_FIELDS:
+                _decrement(self.chunk_counts[field], metadata.get(field, "Unknown"))
+            self.total_chunks -= 1
+            self.total_tokens -= tokens
+
+            doc = self.documents.get(doc_id)
+            if doc is None:
+                continue
+            doc["chunks"] -= 1
+            doc["tokens"] -= tokens
+            if doc["chunks"] <= 0:
+                for field in BREAKDOWN_FIELDS:
+                    _decrement(self.document_counts[field], doc[field])
+                del self.documents[doc_id]
+
+    @property
+    def unique_documents(self) -> int:
+        return len(self.documents)
+
+    def summary(self) -> Dict[str, Any]:
+        """Statistics for /stats. Cost depends on distinct field values, not corpus size."""
+        return {
+            "total_chunks": self.total_chunks,
+            "unique_documents": self.unique_documents,
+            "total_tokens": self.total_tokens,
+            "document_types": sorted(self.document_counts["type"]),
+            "risk_types": sorted(self.document_counts["risk_type"]),
+            "breakdowns": {
+                field: {
+                    value: {"documents": self.document_counts[field][value], "chunks": self.chunk_counts[field][value]}
+                    for value in sorted(self.chunk_counts[field])
+                }
+                for field in BREAKDOWN_FIELDS
+            }
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total_chunks": self.total_chunks,
+            "total_tokens": self.total_tokens,
+            "documents": self.documents,
+            "chunk_counts": {field: dict(counts) for field, counts in self.chunk_counts.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CorpusStats":
+        stats = cls()
+        stats.total_chunks = data["total_chunks"]
+        stats.total_tokens = data["total_tokens"]
+        stats.documents = data["documents"]
+        for field in BREAKDOWN_FIELDS:
+            stats.chunk_counts[field] = Counter(data["chunk_counts"].get(field, {}))
+            stats.document_counts[field] = Counter(doc[field] for doc in stats.documents.values())
+        return stats
+
+    @classmethod
+    def from_chunks(cls, chunks: List[Dict[str, Any]]) -> "CorpusStats":
+        """Rebuild statistics with one pass over the chunks (stores saved without stats)."""
+        stats = cls()
+        stats.add_chunks(chunks)
+        return stats
+
+    def copy(self) -> "CorpusStats":
+        """Independent copy, so it can be written out while the original keeps changing."""
+        stats = CorpusStats()
+        stats.total_chunks = self.total_chunks
+        stats.total_tokens = self.total_tokens
+        stats.documents = {doc_id: dict(doc) for doc_id, doc in self.documents.items()}
+        stats.document_counts = {field: Counter(counts) for field, counts in self.document_counts.items()}
+        stats.chunk_counts = {field: Counter(counts) for field, counts in self.chunk_counts.items()}
+        return stats
+
+    def save(self, path: str):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "CorpusStats":
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+def _decrement(counter: Counter, key: Any):
+    counter[key] -= 1
+    if counter[key] <= 0:
+        del counter[key]
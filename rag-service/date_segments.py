@@ -0,0 +1,281 @@
+"""
+Date-partitioned index segments.
+Splits the store's vectors into per-quarter (or per-year) segments by each chunk's
+publication date, each with its own FAISS index, so date-bounded queries only scan the
+overlapping segments. Older segments can be compressed to 8-bit scalar quantization or
+unloaded to disk; their exact vectors are kept on disk so saving stays lossless.
+"""
+
+import datetime
+import logging
+import os
+import re
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+UNDATED = "undated"
+GRANULARITIES = ("quarter", "year")
+
+_DATE_PATTERN = re.compile(r"^(\d{4})(?:-(\d{1,2}))?(?:-(\d{1,2}))?")
+
+def parse_date(value: Any, end: bool = False) -> int:
+    """Parse "YYYY[-MM[-DD]]" into a YYYYMMDD integer (-1 if missing or malformed).
+
+    Missing parts default to the start of the period, or to its end when end is set,
+    so "2024" as an upper bound covers the whole year.
+    """
+    match = _DATE_PATTERN.match(str(value or "").strip())
+    if not match:
+        return -1
+    year, month, day = match.groups()
+    month = int(month) if month else (12 if end else 1)
+    day = int(day) if day else (31 if end else 1)
+    return int(year) * 10000 + month * 100 + day
+
+def segment_key(date: int, granularity: str = "quarter") -> str:
+    """Segment a YYYYMMDD date falls into, e.g. "2024Q4" or "2024"."""
+    if date < 0:
+        return UNDATED
+    year, month = date // 10000, (date // 100) % 100
+    if granularity == "year":
+        return str(year)
+    return f"{year}Q{(max(month, 1) - 1) // 3 + 1}"
+
+def segment_bounds(key: str) -> Optional[Tuple[int, int]]:
+    """First and last YYYYMMDD date covered by a segment (None for undated)."""
+    if key == UNDATED:
+        return None
+    if "Q" in key:
+        year, quarter = key.split("Q")
+        year, quarter = int(year), int(quarter)
+        return year * 10000 + (3 * quarter - 2) * 100 + 1, year * 10000 + 3 * quarter * 100 + 31
+    year = int(key)
+    return year * 10000 + 101, year * 10000 + 1231
+
+def periods_ago(periods: int, granularity: str = "quarter", today: Optional[datetime.date] = None) -> int:
+    """YYYYMMDD start of the period `periods` quarters (or years) before the current one."""
+    today = today or datetime.date.today()
+    if granularity == "year":
+        return (today.year - periods) * 10000 + 101
+    index = today.year * 4 + (today.month - 1) // 3 - periods
+    return (index // 4) * 10000 + (3 * (index % 4) + 1) * 100 + 1
+
+class _Segment:
+    """Vectors of one date bucket: global positions plus a local FAISS index."""
+
+    def __init__(self, key: str, index):
+        self.key = key
+        self.index = index
+        self.positions = np.zeros(0, dtype="int64")
+        # "hot" (exact, in memory), "compressed" (SQ8 in memory) or "unloaded"
+        self.state = "hot"
+        # Exact vectors on disk, written when the segment is compressed or unloaded
+        self.path: Optional[str] = None
+
+class SegmentedIndex:
+    """Index made of date segments, exposing the subset of the FAISS API the store uses."""
+
+    def __init__(self, d: int, granularity: str = "quarter", offload_dir: Optional[str] = None):
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown segment granularity {granularity!r}; expected one of {GRANULARITIES}")
+        import faiss
+        self._faiss = faiss
+        self.d = d
+        self.granularity = granularity
+        # Where compressed/unloaded segments keep their exact vectors (None disables both)
+        self.offload_dir = offload_dir
+        self.segments: Dict[str, _Segment] = {}
+        self.ntotal = 0
+        # Global position -> (segment key, local row), rebuilt after every mutation
+        self._owner = np.zeros(0, dtype=object)
+        self._local = np.zeros(0, dtype="int64")
+
+    def _rebuild_maps(self):
+        self._owner = np.empty(self.ntotal, dtype=object)
+        self._local = np.empty(self.ntotal, dtype="int64")
+        for segment in self.segments.values():
+            self._owner[segment.positions] = segment.key
+            self._local[segment.positions] = np.arange(len(segment.positions))
+
+    def _read(self, segment: _Segment):
+        return self._faiss.read_index(segment.path)
+
+    def _exact_vectors(self, segment: _Segment) -> np.ndarray:
+        index = segment.index if segment.state == "hot" else self._read(segment)
+        return index.reconstruct_n(0, index.ntotal)
+
+    def _make_hot(self, segment: _Segment):
+        """Bring a segment back to an exact in-memory index before modifying it."""
+        if segment.state == "hot":
+            return
+        segment.index = self._read(segment)
+        segment.state = "hot"
+        os.remove(segment.path)
+        segment.path = None
+
+    def add(self, x: np.ndarray, keys: List[str]):
+        """Append vectors at the next global positions, routed to their segments."""
+        keys = np.array(keys, dtype=object)
+        positions = np.arange(self.ntotal, self.ntotal + len(x), dtype="int64")
+        for key in dict.fromkeys(keys):
+            rows = np.nonzero(keys == key)[0]
+            segment = self.segments.get(key)
+            if segment is None:
+                segment = self.segments[key] = _Segment(key, self._faiss.IndexFlatIP(self.d))
+            self._make_hot(segment)
+            segment.index.add(x[rows])
+            segment.positions = np.concatenate([segment.positions, positions[rows]])
+        self.ntotal += len(x)
+        self._rebuild_maps()
+
+    def remove_ids(self, ids: np.ndarray) -> int:
+        """Remove global positions and compact the rest, like a flat index."""
+        ids = np.sort(np.asarray(ids, dtype="int64"))
+        for key in list(self.segments):
+            segment = self.segments[key]
+            mask = np.isin(segment.positions, ids)
+            if mask.any():
+                self._make_hot(segment)
+                segment.index.remove_ids(np.nonzero(mask)[0].astype("int64"))
+                segment.positions = segment.positions[~mask]
+                if not len(segment.positions):
+                    del self.segments[key]
+                    continue
+            segment.positions = segment.positions - np.searchsorted(ids, segment.positions)
+        self.ntotal -= len(ids)
+        self._rebuild_maps()
+        return len(ids)
+
+    def keys_overlapping(self, start: int, end: int) -> List[str]:
+        """Segments whose date span intersects [start, end]."""
+        keys = []
+        for key in self.segments:
+            bounds = segment_bounds(key)
+            if bounds and bounds[0] <= end and bounds[1] >= start:
+                keys.append(key)
+        return keys
+
+    def search(self, x: np.ndarray, k: int, keys: Optional[List[str]] = None,
+               mask: Optional[np.ndarray] = None, min_score: Optional[float] = None):
+        """Search the given segments (all by default) and merge to the global top k.
+
+        mask optionally restricts results to global positions where it is True; with min_score
+        each segment is range-searched for scores of at least min_score instead.
+        Unloaded segments are read from disk for the query and not kept.
+        """
+        all_scores, all_positions = [], []
+        for key in (keys if keys is not None else list(self.segments)):
+            segment = self.segments[key]
+            params = None
+            if mask is not None:
+                local = np.nonzero(mask[segment.positions])[0]
+                if not len(local):
+                    continue
+                if len(local) < len(segment.positions):
+                    params = self._faiss.SearchParameters()
+                    params.sel = self._faiss.IDSelectorBatch(local.astype("int64"))
+            index = segment.index if segment.index is not None else self._read(segment)
+            if min_score is None:
+                scores, local_ids = index.search(x, min(k, len(segment.positions)), params=params)
+                scores, local_ids = scores[0], local_ids[0]
+            else:
+                _, scores, local_ids = index.range_search(x, min_score, params=params)
+            valid = local_ids >= 0
+            all_scores.append(scores[valid])
+            all_positions.append(segment.positions[local_ids[valid]])
+
+        if not all_scores:
+            return np.zeros((1, 0), dtype="float32"), np.zeros((1, 0), dtype="int64")
+        scores = np.concatenate(all_scores)
+        positions = np.concatenate(all_positions)
+        order = np.argsort(-scores, kind="stable")[:k]
+        return scores[order][None, :], positions[order][None, :]
+
+    def reconstruct_batch(self, ids: np.ndarray) -> np.ndarray:
+        """Vectors for global positions (approximate for compressed segments)."""
+        ids = np.asarray(ids, dtype="int64")
+        out = np.empty((len(ids), self.d), dtype="float32")
+        owners = self._owner[ids]
+        for key in set(owners):
+            rows = np.nonzero(owners == key)[0]
+            segment = self.segments[key]
+            index = segment.index if segment.index is not None else self._read(segment)
+            out[rows] = index.reconstruct_batch(self._local[ids[rows]])
+        return out
+
+    def reconstruct_n(self, start: int, n: int) -> np.ndarray:
+        return self.reconstruct_batch(np.arange(start, start + n, dtype="int64"))
+
+    def to_flat(self):
+        """Exact IndexFlatIP of all vectors in global order, for saving the store."""
+        vectors = np.empty((self.ntotal, self.d), dtype="float32")
+        for segment in self.segments.values():
+            vectors[segment.positions] = self._exact_vectors(segment)
+        flat = self._faiss.IndexFlatIP(self.d)
+        flat.add(vectors)
+        return flat
+
+    def _offload(self, segment: _Segment):
+        """Write the segment's exact vectors to disk (once)."""
+        if segment.path is None:
+            os.makedirs(self.offload_dir, exist_ok=True)
+            segment.path = os.path.join(self.offload_dir, f"{segment.key}.faiss")
+            self._faiss.write_index(segment.index, segment.path)
+
+    def apply_retention(self, compress_before: Optional[int] = None, unload_before: Optional[int] = None):
+        """Compress segments ending before compress_before and unload those ending before unload_before."""
+        if not self.offload_dir:
+            return
+        for segment in self.segments.values():
+            bounds = segment_bounds(segment.key)
+            if bounds is None:
+                continue
+            if unload_before is not None and bounds[1] < unload_before:
+                if segment.state != "unloaded":
+                    if segment.state == "hot":
+                        self._offload(segment)
+                    segment.index = None
+                    segment.state = "unloaded"
+            elif compress_before is not None and bounds[1] < compress_before and segment.state == "hot":
+                self._offload(segment)
+                vectors = segment.index.reconstruct_n(0, segment.index.ntotal)
+                compressed = self._faiss.IndexScalarQuantizer(
+                    self.d, self._faiss.ScalarQuantizer.QT_8bit, self._faiss.METRIC_INNER_PRODUCT
+                )
+                compressed.train(vectors)
+                compressed.add(vectors)
+                segment.index = compressed
+                segment.state = "compressed"
+
+    def memory_bytes(self) -> int:
+        """Vector memory held in RAM: 4 bytes/dim hot, 1 byte/dim compressed, 0 unloaded."""
+        total = 0
+        for segment in self.segments.values():
+            if segment.state == "hot":
+                total += len(segment.positions) * self.d * 4
+            elif segment.state == "compressed":
+                total += len(segment.positions) * self.d
+        return total
+
+    def prefault(self):
+        """Touch every in-memory segment with one scan."""
+        probe = np.zeros((1, self.d), dtype="float32")
+        for segment in self.segments.values():
+            if segment.index is not None and segment.index.ntotal:
+                segment.index.search(probe, 1)
+
+    def status(self) -> List[Dict[str, Any]]:
+        """Per-segment size and state for /stats."""
+        bytes_per_vector = {"hot": self.d * 4, "compressed": self.d, "unloaded": 0}
+        return [
+            {
+                "segment": key,
+                "vectors": len(self.segments[key].positions),
+                "state": self.segments[key].state,
+                "memory_bytes": len(self.segments[key].positions) * bytes_per_vector[self.segments[key].state]
+            }
+            for key in sorted(self.segments)
+        ]
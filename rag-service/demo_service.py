@@ -8,6 +8,9 @@ from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
 import uvicorn
 import json
+import os
+import numpy as np
+from document_sources import load_documents
 
 app = FastAPI(title="Banking Document RAG Service - Demo", version="1.0.0")
 
@@ -366,49 +369,95 @@ DEMO_CHUNKS = [
     }
 ]
 
-def simple_search(query: str, top_k: int = 5) -> List[Dict[str, Any]]:
-    """Simple keyword-based search for demonstration"""
-    query_lower = query.lower()
+# Full document content from the markdown corpus, keyed by document ID
+SOURCE_DOCUMENTS = {doc["id"]: doc for doc in load_documents()}
+
+# Keyword weights used by the demo scorer
+KEYWORD_WEIGHTS = {
+    "capital": 0.3, "requirement": 0.3, "basel": 0.4, "tier": 0.3,
+    "fry": 0.5, "report": 0.2, "liquidity": 0.4, "lcr": 0.4,
+    "stress": 0.3, "test": 0.2, "regulation": 0.2, "prudential": 0.3,
+    "ratio": 0.2, "asset": 0.2, "buffer": 0.3, "risk": 0.2,
+    "aml": 0.5, "money": 0.3, "laundering": 0.4, "bsa": 0.4,
+    "suspicious": 0.4, "activity": 0.3, "ctr": 0.4, "sar": 0.4,
+    "cyber": 0.4, "security": 0.3, "authentication": 0.3, "breach": 0.4,
+    "incident": 0.3, "vulnerability": 0.3, "penetration": 0.3,
+    "fair": 0.3, "lending": 0.4, "discrimination": 0.4, "ecoa": 0.4,
+    "hmda": 0.4, "redlining": 0.4, "consumer": 0.3, "protection": 0.3,
+    "operational": 0.3, "continuity": 0.3, "model": 0.3, "validation": 0.4,
+    "credit": 0.3, "underwriting": 0.4, "portfolio": 0.3, "exposure": 0.3,
+    "interest": 0.3, "rate": 0.3, "duration": 0.3, "repricing": 0.3,
+    "vendor": 0.3, "third": 0.3, "party": 0.3, "due": 0.3, "diligence": 0.4
+}
+
+class KeywordIndex:
+    """Keyword -> chunk incidence matrices built once, scored with NumPy per query."""
     
-    # Score chunks based on keyword matches
-    scored_chunks = []
-    for chunk in DEMO_CHUNKS:
-        score = 0.5  # Base score
-        text_lower = chunk["text"].lower()
-        title_lower = chunk["metadata"]["title"].lower()
-          # Keyword scoring
-        keywords = {
-            "capital": 0.3, "requirement": 0.3, "basel": 0.4, "tier": 0.3,
-            "fry": 0.5, "report": 0.2, "liquidity": 0.4, "lcr": 0.4,
-            "stress": 0.3, "test": 0.2, "regulation": 0.2, "prudential": 0.3,
-            "ratio": 0.2, "asset": 0.2, "buffer": 0.3, "risk": 0.2,
-            "aml": 0.5, "money": 0.3, "laundering": 0.4, "bsa": 0.4,
-            "suspicious": 0.4, "activity": 0.3, "ctr": 0.4, "sar": 0.4,
-            "cyber": 0.4, "security": 0.3, "authentication": 0.3, "breach": 0.4,
-            "incident": 0.3, "vulnerability": 0.3, "penetration": 0.3,
-            "fair": 0.3, "lending": 0.4, "discrimination": 0.4, "ecoa": 0.4,
-            "hmda": 0.4, "redlining": 0.4, "consumer": 0.3, "protection": 0.3,
-            "operational": 0.3, "continuity": 0.3, "model": 0.3, "validation": 0.4,
-            "credit": 0.3, "underwriting": 0.4, "portfolio": 0.3, "exposure": 0.3,
-            "interest": 0.3, "rate": 0.3, "duration": 0.3, "repricing": 0.3,
-            "vendor": 0.3, "third": 0.3, "party": 0.3, "due": 0.3, "diligence": 0.4
-        }
+    def __init__(self, chunks: List[Dict[str, Any]], keywords: Dict[str, float] = KEYWORD_WEIGHTS):
+        self.chunks = chunks
+        self.keywords = list(keywords.items())
+        # Column j is True where keyword j occurs in the chunk text / title
+        self.text_incidence = np.zeros((len(chunks), len(self.keywords)), dtype=bool)
+        self.title_incidence = np.zeros((len(chunks), len(self.keywords)), dtype=bool)
+        
+        for i, chunk in enumerate(chunks):
+            text_lower = chunk["text"].lower()
+            title_lower = chunk["metadata"]["title"].lower()
+            for j, (keyword, _) in enumerate(self.keywords):
+                self.text_incidence[i, j] = keyword in text_lower
+                self.title_incidence[i, j] = keyword in title_lower
+    
+    def score(self, query: str) -> np.ndarray:
+        """Score every chunk for a query."""
+        query_lower = query.lower()
+        scores = np.full(len(self.chunks), 0.5)  # Base score
         
-        for keyword, weight in keywords.items():
+        # Accumulate column by column in keyword order so scores are bit-identical
+        # to summing the weights one keyword at a time
+        for j, (keyword, weight) in enumerate(self.keywords):
             if keyword in query_lower:
-                if keyword in text_lower:
-                    score += weight
-                if keyword in title_lower:
-                    score += weight * 0.5
+                scores += weight * self.text_incidence[:, j]
+                scores += (weight * 0.5) * self.title_incidence[:, j]
         
-        # Adjust similarity score
-        chunk_copy = chunk.copy()
-        chunk_copy["similarity_score"] = min(0.98, score)
-        scored_chunks.append(chunk_copy)
+        return np.minimum(0.98, scores)
     
-    # Sort by score and return top_k
-    scored_chunks.sort(key=lambda x: x["similarity_score"], reverse=True)
-    return scored_chunks[:top_k]
+    def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        """Return the top_k chunks, ties broken by corpus order like a stable sort."""
+        if top_k <= 0 or not self.chunks:
+            return []
+        
+        scores = self.score(query)
+        if top_k < len(scores):
+            # Keep every chunk tied with the k-th best score, then order exactly
+            kth_score = scores[np.argpartition(-scores, top_k - 1)[top_k - 1]]
+            candidates = np.flatnonzero(scores >= kth_score)
+        else:
+            candidates = np.arange(len(scores))
+        order = candidates[np.lexsort((candidates, -scores[candidates]))][:top_k]
+        
+        results = []
+        for idx in order:
+            chunk_copy = self.chunks[idx].copy()
+            chunk_copy["similarity_score"] = float(scores[idx])
+            results.append(chunk_copy)
+        return results
+
+def load_fixture_chunks(path: str) -> List[Dict[str, Any]]:
+    """Load demo chunks from a JSON array or JSONL file."""
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            return [json.loads(line) for line in f if line.strip()]
+        return json.load(f)
+
+# Fixture chunks can be loaded from disk for bigger load tests
+if os.getenv("DEMO_FIXTURES_PATH"):
+    DEMO_CHUNKS = load_fixture_chunks(os.getenv("DEMO_FIXTURES_PATH"))
+
+SEARCH_INDEX = KeywordIndex(DEMO_CHUNKS)
+
+def simple_search(query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+    """Simple keyword-based search for demonstration"""
+    return SEARCH_INDEX.search(query, top_k)
 
 @app.get("/")
 async def root():
@@ -479,126 +528,8 @@ async def get_documents():
             metadata = chunk["metadata"]
             
             # Read the actual document content from dummy documents
-            content = ""
-            if doc_id == "1":
-                content = """The FRY-9C is a comprehensive quarterly report that bank holding companies with total consolidated assets of $1 billion or more must file with the Federal Reserve. This report provides detailed consolidated financial information including:
-
-• Balance Sheet Information: Assets, liabilities, and equity components
-• Income Statement Data: Revenue, expenses, and net income details  
-• Off-Balance Sheet Items: Commitments, guarantees, and derivatives
-• Regulatory Capital Information: Tier 1 and Tier 2 capital calculations
-
-Key Requirements:
-- Filed within 40 days after quarter-end
-- Must be certified by the chief financial officer
-- Subject to Federal Reserve review and examination
-- Used for supervisory monitoring and regulatory analysis
-
-The report includes detailed schedules covering:
-- Loan and lease portfolios by type and geographic distribution
-- Securities holdings and their fair values
-- Trading assets and liabilities
-- Allowance for credit losses calculations
-- Regulatory capital components and ratios
-
-Schedule HC-A provides detailed information about securities holdings including available-for-sale securities, held-to-maturity securities, and trading securities. Banks must report fair values, unrealized gains and losses, and maturity distributions. Municipal securities require separate reporting by state of issuer.
-
-Compliance with FRY-9C requirements is essential for maintaining good standing with federal regulators and ensures transparency in financial reporting for large banking organizations."""
-
-            elif doc_id == "2":
-                content = """Annual report filed by bank holding companies to report changes in organizational structure, including acquisitions, divestitures, and other corporate changes. This report captures significant organizational events and helps regulators track the evolution of banking organizations.
-
-Key Components:
-- Acquisition and merger activities
-- Subsidiary formations and dissolutions
-- Changes in ownership structure
-- Regulatory approvals and notifications
-
-Filing requirements include detailed documentation of all organizational changes, their regulatory impact, and compliance with applicable banking laws and regulations."""
-
-            elif doc_id == "3":
-                content = """Regulation YY establishes enhanced prudential standards for large bank holding companies (BHCs) and foreign banking organizations (FBOs) operating in the United States. This regulation implements key provisions of the Dodd-Frank Act designed to strengthen the resilience of large financial institutions.
-
-Key Components:
-
-1. Capital Planning and Stress Testing:
-• Annual capital plans required for BHCs with $100+ billion in assets
-• Forward-looking stress testing scenarios
-• Capital distribution restrictions during stress periods
-
-2. Risk Management Requirements:
-• Independent risk management function
-• Chief Risk Officer reporting directly to board
-• Comprehensive risk appetite framework
-• Regular risk assessments and reporting
-
-3. Liquidity Requirements:
-• Liquidity buffer requirements
-• Contingency funding plans
-• Liquidity stress testing
-• Internal liquidity risk limits
-
-4. Single-Counterparty Credit Limits:
-• Exposure limits to prevent concentration risk
-• Aggregate exposure calculations
-• Board-approved credit policies
-
-5. Recovery and Resolution Planning:
-• 'Living wills' for orderly resolution
-• Critical operations identification
-• Resolution strategies and capabilities
-
-Applicability thresholds vary by asset size, with the most stringent requirements applying to globally systemically important banks (G-SIBs). Compliance is monitored through ongoing supervision and annual assessments."""
-
-            elif doc_id == "4":
-                content = """Basel III capital requirements establish enhanced capital standards for banking organizations. The framework introduces more stringent capital requirements, better risk coverage, and enhanced supervision and market discipline.
-
-Core Capital Components:
-• Common Equity Tier 1 (CET1) Capital: Minimum ratio of 4.5% of risk-weighted assets
-• Tier 1 Capital: Minimum ratio of 6% of risk-weighted assets  
-• Total Capital: Minimum ratio of 8% of risk-weighted assets
-
-Capital Conservation Buffer:
-• Additional 2.5% CET1 requirement above minimum ratios
-• Restricts capital distributions when buffer is breached
-• Designed to ensure banks maintain capital above regulatory minimums
-
-Countercyclical Capital Buffer:
-• Variable buffer of 0-2.5% based on economic conditions
-• Applied to domestic credit exposures
-• Helps reduce systemic risk during credit booms
-
-The implementation includes phase-in periods and transition arrangements to ensure smooth adoption while maintaining lending capacity to support economic growth."""
-
-            elif doc_id == "5":
-                content = """Bank Secrecy Act (BSA) and Anti-Money Laundering (AML) compliance requirements establish comprehensive frameworks for detecting and preventing money laundering and terrorist financing. Financial institutions must implement robust compliance programs.
-
-Key Requirements:
-
-1. Customer Identification Program (CIP):
-• Verify customer identity using documents, non-documentary methods, or both
-• Maintain records of verification methods used
-• Check customer names against government watch lists
-
-2. Customer Due Diligence (CDD):
-• Understand the nature and purpose of customer relationships
-• Conduct ongoing monitoring for suspicious activities
-• Enhanced due diligence for higher-risk customers
-
-3. Suspicious Activity Reporting (SAR):
-• File reports for transactions of $5,000 or more that appear suspicious
-• Report within 30 days of initial detection
-• Maintain confidentiality of SAR filings
-
-4. Currency Transaction Reporting (CTR):
-• Report cash transactions over $10,000
-• File within 15 days of transaction
-• Include complete customer information
-
-The program must include ongoing employee training, independent testing, and designation of a BSA compliance officer. Regular risk assessments help ensure the program remains effective against evolving threats."""
-
-            else:
-                content = f"Content for document {doc_id} - Banking document with regulatory information."
+            source_doc = SOURCE_DOCUMENTS.get(doc_id, {})
+            content = source_doc.get("content") or f"Content for document {doc_id} - Banking document with regulatory information."
             
             documents[doc_id] = {
                 "id": doc_id,
@@ -611,7 +542,7 @@ The program must include ongoing employee training, independent testing, and des
                 "region": metadata["region"],
                 "riskType": metadata["risk_type"],
                 "sourceUrl": metadata["source_link"],
-                "summary": f"Banking regulatory document covering {metadata['risk_type'].lower()} requirements and compliance procedures.",
+                "summary": source_doc.get("summary") or f"Banking regulatory document covering {metadata['risk_type'].lower()} requirements and compliance procedures.",
                 "isBookmarked": False
             }
     
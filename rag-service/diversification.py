@@ -0,0 +1,126 @@
+"""
+Result diversification for retrieval.
+Maximal marginal relevance over candidate embeddings, a per-document cap, and merging of
+adjacent chunks from the same document into a single span.
+"""
+
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+def mmr_select(candidate_embeddings: np.ndarray, relevance: np.ndarray, k: int,
+               mmr_lambda: float = 0.5, document_ids: Optional[List[str]] = None,
+               max_per_document: Optional[int] = None) -> List[int]:
+    """Pick k candidates by maximal marginal relevance.
+
+    candidate_embeddings must be L2-normalized (rows), relevance holds each candidate's
+    cosine similarity to the query. Returns candidate positions in selection order.
+    """
+    n = len(relevance)
+    if n == 0 or k <= 0:
+        return []
+
+    # Pairwise cosine similarity between candidates, computed once
+    similarity = candidate_embeddings @ candidate_embeddings.T
+    max_similarity = np.full(n, -np.inf)
+    available = np.ones(n, dtype=bool)
+    per_document: Dict[str, int] = {}
+    document_array = np.array(document_ids) if document_ids is not None else None
+    selected = []
+
+    while len(selected) < k and available.any():
+        redundancy = np.where(np.isfinite(max_similarity), max_similarity, 0.0)
+        scores = mmr_lambda * relevance - (1 - mmr_lambda) * redundancy
+        scores[~available] = -np.inf
+        choice = int(np.argmax(scores))
+
+        selected.append(choice)
+        available[choice] = False
+        max_similarity = np.maximum(max_similarity, similarity[:, choice])
+
+        if document_array is not None and max_per_document:
+            doc_id = document_ids[choice]
+            per_document[doc_id] = per_document.get(doc_id, 0) + 1
+            if per_document[doc_id] >= max_per_document:
+                available &= document_array != doc_id
+
+    return selected
+
+def cap_per_document(results: List[Dict[str, Any]], max_per_document: int) -> List[Dict[str, Any]]:
+    """Keep at most max_per_document results from each document, preserving order."""
+    counts: Dict[str, int] = {}
+    capped = []
+    for result in results:
+        doc_id = result.get("metadata", {}).get("document_id", "")
+        if counts.get(doc_id, 0) < max_per_document:
+            counts[doc_id] = counts.get(doc_id, 0) + 1
+            capped.append(result)
+    return capped
+
+def _join(first: str, second: str) -> Tuple[str, bool]:
+    """Join two chunk texts; the flag says whether an overlap was found and dropped."""
+    probe = second[:64]
+    position = first.find(probe, max(0, len(first) - 4000)) if probe else -1
+    while position >= 0:
+        if second.startswith(first[position:]):
+            return first[:position] + second, True
+        position = first.find(probe, position + 1)
+    return f"{first}\n{second}", False
+
+def join_overlapping(first: str, second: str) -> str:
+    """Concatenate two chunk texts, dropping the token overlap chunk_text leaves between them."""
+    return _join(first, second)[0]
+
+def merge_adjacent_chunks(results: List[Dict[str, Any]], overlap_tokens: int = 0) -> List[Dict[str, Any]]:
+    """Merge results that are neighbouring chunks of the same document into one span.
+
+    Spans keep the position of their best-ranked chunk, the highest similarity score,
+    and list the merged chunk indexes in `chunk_indices`. overlap_tokens is subtracted
+    from the summed token count for each join that actually dropped an overlap.
+    """
+    by_document: Dict[str, List[int]] = {}
+    for position, result in enumerate(results):
+        doc_id = result.get("metadata", {}).get("document_id", "")
+        by_document.setdefault(doc_id, []).append(position)
+
+    # Map each result to the first result of its run of consecutive chunk indexes
+    span_of: Dict[int, int] = {}
+    spans: Dict[int, List[int]] = {}
+    for positions in by_document.values():
+        positions = sorted(positions, key=lambda p: results[p].get("chunk_index", 0))
+        run = [positions[0]]
+        for position in positions[1:]:
+            if results[position].get("chunk_index", 0) == results[run[-1]].get("chunk_index", 0) + 1:
+                run.append(position)
+            else:
+                spans[min(run)] = run
+                run = [position]
+        spans[min(run)] = run
+    for head, run in spans.items():
+        for position in run:
+            span_of[position] = head
+
+    merged = []
+    for position, result in enumerate(results):
+        head = span_of[position]
+        if head != position:
+            continue
+        run = spans[head]
+        if len(run) == 1:
+            merged.append(result)
+            continue
+
+        span = result.copy()
+        text = results[run[0]]["text"]
+        overlaps = 0
+        for part in run[1:]:
+            text, overlapped = _join(text, results[part]["text"])
+            overlaps += overlapped
+        span["text"] = text
+        span["chunk_index"] = results[run[0]].get("chunk_index", 0)
+        span["chunk_indices"] = [results[part].get("chunk_index", 0) for part in run]
+        span["token_count"] = sum(results[part].get("token_count", 0) for part in run) - overlap_tokens * overlaps
+        span["similarity_score"] = max(results[part].get("similarity_score", 0.0) for part in run)
+        merged.append(span)
+
+    return merged
@@ -0,0 +1,149 @@
+"""
+Document catalog built at ingest time from chunk metadata.
+Serves cursor-paginated, filterable document listings without touching the chunk list,
+and exposes a version token for ETag support.
+"""
+
+import base64
+import bisect
+import hashlib
+import json
+import os
+import uuid
+from typing import List, Dict, Any, Optional, Tuple
+
+# Catalog entry fields, named like the frontend Document model, and the chunk metadata they come from
+CATALOG_FIELDS = {
+    "id": "document_id",
+    "title": "title",
+    "category": "type",
+    "publicationDate": "date",
+    "level": "level",
+    "owningBusinessGroup": "business_group",
+    "region": "region",
+    "riskType": "risk_type",
+    "sourceUrl": "source_link",
+}
+
+# Metadata fields that listings can be filtered on
+FILTER_FIELDS = ("type", "risk_type", "region", "business_group", "level")
+
+class DocumentCatalog:
+    """Per-document entries maintained as chunks are added and removed."""
+
+    def __init__(self):
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        # Document IDs in sorted order, for cursor pagination
+        self.sorted_ids: List[str] = []
+        # Changes on every mutation; used to build ETags
+        self.version = uuid.uuid4().hex
+
+    def add_chunks(self, chunks: List[Dict[str, Any]]):
+        """Register documents for newly indexed chunks."""
+        for chunk in chunks:
+            metadata = chunk.get("metadata", {})
+            # IDs are kept sorted, so they must all be strings (JSONL sources may use numbers)
+            doc_id = str(metadata.get("document_id", ""))
+            entry = self.entries.get(doc_id)
+            if entry is None:
+                entry = {name: metadata.get(field, "") for name, field in CATALOG_FIELDS.items()}
+                entry["id"] = doc_id
+                entry["chunkCount"] = 0
+                entry["tokenCount"] = 0
+                self.entries[doc_id] = entry
+                bisect.insort(self.sorted_ids, doc_id)
+            entry["chunkCount"] += 1
+            entry["tokenCount"] += chunk.get("token_count", 0)
+        if chunks:
+            self.version = uuid.uuid4().hex
+
+    def remove_chunks(self, chunks: List[Dict[str, Any]]):
+        """Drop chunk counts and documents whose last chunk was removed."""
+        for chunk in chunks:
+            metadata = chunk.get("metadata", {})
+            doc_id = str(metadata.get("document_id", ""))
+            entry = self.entries.get(doc_id)
+            if entry is None:
+                continue
+            entry["chunkCount"] -= 1
+            entry["tokenCount"] -= chunk.get("token_count", 0)
+            if entry["chunkCount"] <= 0:
+                del self.entries[doc_id]
+                position = bisect.bisect_left(self.sorted_ids, doc_id)
+                del self.sorted_ids[position]
+        if chunks:
+            self.version = uuid.uuid4().hex
+
+    def _matches(self, entry: Dict[str, Any], filters: Dict[str, List[str]]) -> bool:
+        for field, values in filters.items():
+            name = next(name for name, source in CATALOG_FIELDS.items() if source == field)
+            if (entry.get(name) or "").lower() not in values:
+                return False
+        return True
+
+    def page(self, cursor: Optional[str] = None, limit: int = 50,
+             filters: Optional[Dict[str, List[str]]] = None,
+             fields: Optional[List[str]] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Return one page of entries after the cursor and the cursor for the next page."""
+        filters = {field: [v.lower() for v in values] for field, values in (filters or {}).items() if values}
+        start = bisect.bisect_right(self.sorted_ids, decode_cursor(cursor)) if cursor else 0
+
+        documents = []
+        last_id = None
+        for doc_id in self.sorted_ids[start:]:
+            entry = self.entries[doc_id]
+            if filters and not self._matches(entry, filters):
+                continue
+            if len(documents) == limit:
+                return documents, encode_cursor(last_id)
+            documents.append({name: entry.get(name) for name in fields} if fields else dict(entry))
+            last_id = doc_id
+        return documents, None
+
+    def etag(self, *params: Any) -> str:
+        """ETag for a listing: the catalog version plus the request parameters."""
+        digest = hashlib.sha1(json.dumps([self.version, *params], sort_keys=True, default=str).encode()).hexdigest()
+        return f'"{digest}"'
+
+    def copy(self) -> "DocumentCatalog":
+        """Independent copy, so it can be written out while the original keeps changing."""
+        catalog = DocumentCatalog()
+        catalog.entries = {doc_id: dict(entry) for doc_id, entry in self.entries.items()}
+        catalog.sorted_ids = list(self.sorted_ids)
+        catalog.version = self.version
+        return catalog
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def save(self, path: str):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": self.version, "entries": self.entries}, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "DocumentCatalog":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        catalog = cls()
+        catalog.version = data["version"]
+        catalog.entries = data["entries"]
+        catalog.sorted_ids = sorted(catalog.entries)
+        return catalog
+
+    @classmethod
+    def from_chunks(cls, chunks: List[Dict[str, Any]]) -> "DocumentCatalog":
+        """Rebuild the catalog with one pass over the chunks (stores saved without one)."""
+        catalog = cls()
+        catalog.add_chunks(chunks)
+        return catalog
+
+def encode_cursor(doc_id: str) -> str:
+    return base64.urlsafe_b64encode(doc_id.encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        return base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+    except (ValueError, UnicodeError):
+        raise ValueError("Invalid cursor")
@@ -0,0 +1,113 @@
+"""
+Document-level summary index for two-stage (hierarchical) retrieval.
+Holds one normalized embedding per document (its title and summary) in a small flat
+index, with each document's date and filter values, so a query can pick the best
+documents first and score only their chunks.
+"""
+
+import json
+import os
+from typing import List, Dict, Optional
+
+import numpy as np
+
+class DocumentIndex:
+    """One vector per document ID, replaced when a document is re-ingested."""
+
+    def __init__(self, dimension: int):
+        import faiss
+        self._faiss = faiss
+        self.dimension = dimension
+        self.index = faiss.IndexFlatIP(dimension)
+        self.document_ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        # Per-row publication date (YYYYMMDD) and lower-cased filter values, for document-level filtering
+        self.dates = np.zeros(0, dtype="int64")
+        self.filter_values: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.document_ids)
+
+    def __contains__(self, document_id: str) -> bool:
+        return document_id in self.rows
+
+    def upsert(self, document_ids: List[str], embeddings: np.ndarray, dates: np.ndarray,
+               filter_values: Dict[str, np.ndarray]):
+        """Add normalized document vectors, replacing any existing rows for the same IDs."""
+        self.remove([doc_id for doc_id in document_ids if doc_id in self.rows])
+        self.index.add(embeddings.astype("float32"))
+        self.document_ids.extend(document_ids)
+        self.dates = np.concatenate([self.dates, dates])
+        for field, values in filter_values.items():
+            self.filter_values[field] = np.concatenate([self.filter_values.get(field, np.zeros(0, dtype=object)), values])
+        self.rows = {doc_id: row for row, doc_id in enumerate(self.document_ids)}
+
+    def remove(self, document_ids: List[str]) -> int:
+        """Drop the rows of the given documents (unknown IDs are ignored)."""
+        rows = sorted(self.rows[doc_id] for doc_id in set(document_ids) if doc_id in self.rows)
+        if not rows:
+            return 0
+        self.index.remove_ids(np.array(rows, dtype="int64"))
+        removed = set(rows)
+        self.document_ids = [doc_id for row, doc_id in enumerate(self.document_ids) if row not in removed]
+        self.dates = np.delete(self.dates, rows)
+        self.filter_values = {field: np.delete(values, rows) for field, values in self.filter_values.items()}
+        self.rows = {doc_id: row for row, doc_id in enumerate(self.document_ids)}
+        return len(rows)
+
+    def search(self, query_embedding: np.ndarray, top_documents: int,
+               mask: Optional[np.ndarray] = None) -> List[tuple]:
+        """(document_id, score) of the best documents, restricted to rows where mask is True."""
+        params = None
+        if mask is not None:
+            rows = np.nonzero(mask)[0].astype("int64")
+            if not len(rows):
+                return []
+            params = self._faiss.SearchParameters()
+            params.sel = self._faiss.IDSelectorBatch(rows)
+        scores, rows = self.index.search(query_embedding, top_documents, params=params)
+        return [(self.document_ids[row], float(score)) for score, row in zip(scores[0], rows[0]) if row >= 0]
+
+    def copy(self) -> "DocumentIndex":
+        """Independent copy, so it can be written out while the original keeps changing."""
+        document_index = DocumentIndex(self.dimension)
+        document_index.index = self._faiss.clone_index(self.index)
+        document_index.document_ids = list(self.document_ids)
+        document_index.rows = dict(self.rows)
+        # Row arrays are replaced, never modified in place, so they can be shared
+        document_index.dates = self.dates
+        document_index.filter_values = dict(self.filter_values)
+        return document_index
+
+    def memory_bytes(self) -> int:
+        return len(self.document_ids) * self.dimension * 4
+
+    def save(self, path: str):
+        """Write the vectors to <path>.docs.faiss and the row metadata to <path>.docs.json."""
+        self._faiss.write_index(self.index, f"{path}.docs.faiss")
+        tmp_path = f"{path}.docs.json.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "document_ids": self.document_ids,
+                "dates": self.dates.tolist(),
+                "filter_values": {field: values.tolist() for field, values in self.filter_values.items()}
+            }, f)
+        os.replace(tmp_path, f"{path}.docs.json")
+
+    @classmethod
+    def load(cls, path: str, dimension: int) -> Optional["DocumentIndex"]:
+        """Read a saved document index, or None if it is missing or has another dimension."""
+        if not (os.path.exists(f"{path}.docs.faiss") and os.path.exists(f"{path}.docs.json")):
+            return None
+        document_index = cls(dimension)
+        index = document_index._faiss.read_index(f"{path}.docs.faiss")
+        if index.d != dimension:
+            return None
+        with open(f"{path}.docs.json", encoding="utf-8") as f:
+            data = json.load(f)
+        document_index.index = index
+        document_index.document_ids = data["document_ids"]
+        document_index.rows = {doc_id: row for row, doc_id in enumerate(document_index.document_ids)}
+        document_index.dates = np.array(data["dates"], dtype="int64")
+        document_index.filter_values = {field: np.array(values, dtype=object) for field, values in data["filter_values"].items()}
+        return document_index
@@ -0,0 +1,257 @@
+"""
+Document sources for RAG ingestion.
+Scans document directories in parallel, parses markdown front-matter into the fields
+process_documents expects, and tracks file mtimes and hashes so only changed files are re-read.
+Documents are yielded lazily so large trees never sit in memory.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Any, Iterator, Iterable, Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MARKDOWN_SUFFIXES = (".md", ".markdown")
+JSONL_SUFFIXES = (".jsonl",)
+# Read granularity when hashing a file without parsing it
+HASH_BUFFER_SIZE = 1024 * 1024
+
+# Directory shipped with the service
+DEFAULT_DOCUMENT_DIRS = [str(Path(__file__).parent / "dummy-documents")]
+
+# Front-matter keys accepted as aliases of the fields process_documents reads
+# (the frontend document model uses camelCase names)
+FIELD_ALIASES = {
+    "category": "type",
+    "publicationDate": "date",
+    "publication_date": "date",
+    "owningBusinessGroup": "business_group",
+    "riskType": "risk_type",
+    "sourceUrl": "source_link",
+    "source_url": "source_link",
+}
+
+def parse_front_matter(text: str) -> Tuple[Dict[str, str], str]:
+    """Split simple `key: value` front-matter from a markdown body."""
+    if not text.startswith("---"):
+        return {}, text
+
+    lines = text.splitlines(keepends=True)
+    fields = {}
+    for i, line in enumerate(lines[1:], 1):
+        if line.strip() == "---":
+            return fields, "".join(lines[i + 1:]).lstrip("\n")
+        key, sep, value = line.partition(":")
+        if sep and key.strip():
+            value = value.strip()
+            if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+                value = value[1:-1].replace('\\"', '"')
+            fields[key.strip()] = value
+
+    # No closing delimiter: treat the whole file as body
+    return {}, text
+
+def parse_markdown_document(text: str, path: Path) -> Dict[str, Any]:
+    """Turn a markdown file into a document dict for process_documents."""
+    fields, body = parse_front_matter(text)
+    doc = {FIELD_ALIASES.get(key, key): value for key, value in fields.items()}
+
+    if not doc.get("title"):
+        doc["title"] = path.stem.replace("-", " ").title()
+        for line in body.splitlines():
+            if line.startswith("# "):
+                doc["title"] = line[2:].strip()
+                break
+    doc.setdefault("id", path.stem)
+    doc["content"] = body
+    return doc
+
+def parse_jsonl_documents(lines: Iterable[str], path: Path) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Parse JSONL lines into (key, document) pairs, one per non-empty line, as they are read."""
+    for line_number, line in enumerate(lines, 1):
+        if line.strip():
+            doc = json.loads(line)
+            doc.setdefault("id", f"{path.stem}-{line_number}")
+            yield f"{path}:{line_number}", doc
+
+def _sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BUFFER_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def bounded_map(executor: ThreadPoolExecutor, fn: Callable, items: Iterable, window: int) -> Iterator:
+    """Like executor.map, but keeps at most `window` tasks in flight."""
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+class DocumentSource:
+    """Reads documents from one or more directories, re-reading only changed files.
+
+    A manifest of path -> (mtime, size, sha256, document ids) is kept in memory and,
+    when manifest_path is set, persisted by commit() once the caller has ingested
+    the yielded documents.
+    """
+
+    def __init__(self, directories: List[str], manifest_path: Optional[str] = None, max_workers: int = 8):
+        self.directories = [str(d) for d in directories]
+        self.manifest_path = manifest_path
+        self.max_workers = max_workers
+        self.manifest: Dict[str, Dict[str, Any]] = {}
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._seen: set = set()
+        if manifest_path and os.path.exists(manifest_path):
+            with open(manifest_path, encoding="utf-8") as f:
+                self.manifest = json.load(f)
+
+    def _walk(self, directory: str) -> List[str]:
+        """List supported files under a directory (or the path itself if it is a file)."""
+        if os.path.isfile(directory):
+            return [directory]
+        files = []
+        for root, _, names in os.walk(directory):
+            for name in names:
+                if name.lower().endswith(MARKDOWN_SUFFIXES + JSONL_SUFFIXES):
+                    files.append(os.path.join(root, name))
+        return sorted(files)
+
+    def iter_files(self) -> Iterator[str]:
+        """Yield supported files from all directories, walking directories in parallel."""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for files in executor.map(self._walk, self.directories):
+                yield from files
+
+    def _read_if_changed(self, path: str) -> Optional[Tuple[str, Optional[Dict[str, Any]], Optional[List[Tuple[str, Dict[str, Any]]]]]]:
+        """Stat a file and, if it changed since the manifest entry, read and parse it.
+
+        Returns None if unchanged and (path, None, None) if it vanished. JSONL files come back
+        with documents=None: they are streamed by the consumer rather than read whole here.
+        """
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            # Deleted between the directory walk and the stat
+            return path, None, None
+        entry = self.manifest.get(path)
+        if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+            return None
+        new_entry = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+        if path.lower().endswith(JSONL_SUFFIXES):
+            if entry and entry["size"] == stat.st_size:
+                # Possibly touched but not modified: hash it without parsing before streaming it
+                sha256 = _sha256_file(path)
+                if sha256 == entry["sha256"]:
+                    return path, {**entry, **new_entry, "sha256": sha256}, []
+            return path, new_entry, None
+
+        data = Path(path).read_bytes()
+        new_entry["sha256"] = hashlib.sha256(data).hexdigest()
+        if entry and entry["sha256"] == new_entry["sha256"]:
+            # Touched but not modified: refresh the stat fields only
+            return path, {**entry, **new_entry}, []
+        doc = parse_markdown_document(data.decode("utf-8"), Path(path))
+        new_entry["document_ids"] = [doc["id"]]
+        return path, new_entry, [(path, doc)]
+
+    def _stream_jsonl(self, path: str, new_entry: Dict[str, Any]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield a JSONL file's documents line by line, hashing it as it is read.
+
+        The manifest entry is only staged once the whole file has been consumed.
+        """
+        digest = hashlib.sha256()
+        document_ids = []
+
+        def lines(f):
+            for raw in f:
+                digest.update(raw)
+                yield raw.decode("utf-8")
+
+        with open(path, "rb") as f:
+            for key, doc in parse_jsonl_documents(lines(f), Path(path)):
+                document_ids.append(doc["id"])
+                yield key, doc
+        self._pending[path] = {**new_entry, "sha256": digest.hexdigest(), "document_ids": document_ids}
+
+    def iter_changes(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (source key, document) for every new or modified document.
+
+        Files are stat'ed (and markdown files read and hashed) on a thread pool with a bounded
+        number in flight; JSONL files are streamed line by line on the calling thread.
+        Call removed_paths() after iterating, and commit() once the documents are ingested.
+        """
+        self._pending = {}
+        self._seen = set()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            files = self.iter_files()
+            for result in bounded_map(executor, self._read_if_changed, self._track(files), self.max_workers * 4):
+                if result is None:
+                    continue
+                path, entry, documents = result
+                if entry is None:
+                    self._seen.discard(path)
+                elif documents is None:
+                    yield from self._stream_jsonl(path, entry)
+                else:
+                    self._pending[path] = entry
+                    yield from documents
+
+    def iter_documents(self) -> Iterator[Dict[str, Any]]:
+        """Yield new or modified documents without their source keys."""
+        for _, doc in self.iter_changes():
+            yield doc
+
+    def _track(self, files: Iterable[str]) -> Iterator[str]:
+        for path in files:
+            self._seen.add(path)
+            yield path
+
+    def removed_paths(self) -> List[str]:
+        """Files recorded in the manifest that the last scan no longer found."""
+        return sorted(path for path in self.manifest if path not in self._seen)
+
+    def pending_changes(self) -> Dict[str, Dict[str, Any]]:
+        """Manifest entries for files changed in the last scan that are not committed yet."""
+        return dict(self._pending)
+
+    def document_ids_for(self, path: str) -> List[str]:
+        """Document IDs previously ingested from a file, according to the manifest."""
+        return self.manifest.get(path, {}).get("document_ids", [])
+
+    def commit(self, persist: bool = True):
+        """Record the last scan in the manifest and persist it if a path was given.
+
+        Callers that save their index later pass persist=False and call save_manifest()
+        once the index is on disk, so the manifest never gets ahead of it.
+        """
+        for path in self.removed_paths():
+            del self.manifest[path]
+        self.manifest.update(self._pending)
+        self._pending = {}
+        if persist:
+            self.save_manifest()
+
+    def save_manifest(self):
+        """Write the in-memory manifest to manifest_path (if set)."""
+        if self.manifest_path:
+            os.makedirs(os.path.dirname(self.manifest_path) or ".", exist_ok=True)
+            tmp_path = f"{self.manifest_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.manifest, f)
+            os.replace(tmp_path, self.manifest_path)
+
+def load_documents(directories: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Read every document under the given directories (defaults to the bundled corpus)."""
+    source = DocumentSource(directories or DEFAULT_DOCUMENT_DIRS)
+    return list(source.iter_documents())
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Watch mode for continuous incremental indexing.
+Polls document directories, debounces bursts of changes, re-chunks and re-embeds only
+changed or added files, removes vectors for deleted files, and commits index generations
+to disk at a configurable cadence.
+"""
+
+import argparse
+import logging
+import os
+import threading
+import time
+from typing import List, Dict, Any, Optional
+
+from rag_processor import BankingRAGProcessor, DEFAULT_VECTOR_STORE_PATH, DEFAULT_EMBEDDING_MODEL
+from document_sources import DocumentSource
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class DocumentWatcher:
+    """Keeps a processor's vector store in sync with a set of document directories."""
+
+    def __init__(self, processor: BankingRAGProcessor, directories: List[str],
+                 store_path: str = DEFAULT_VECTOR_STORE_PATH, poll_interval: float = 2.0,
+                 debounce_seconds: float = 2.0, commit_interval: float = 30.0):
+        self.processor = processor
+        self.store_path = store_path
+        self.poll_interval = poll_interval
+        self.debounce_seconds = debounce_seconds
+        self.commit_interval = commit_interval
+        self.source = DocumentSource(directories, manifest_path=f"{store_path}.manifest.json")
+
+        self._signature = None
+        self._quiet_since = 0.0
+        self._committed_generation = processor.vector_store.generation
+        self._manifest_dirty = False
+        self._last_commit = time.monotonic()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.stats = {
+            "updates_applied": 0,
+            "documents_indexed": 0,
+            "documents_removed": 0,
+            "last_update_at": None,
+            "last_commit_at": None,
+            "last_error": None
+        }
+
+    def poll_once(self) -> Optional[Dict[str, Any]]:
+        """Scan once and apply changes if they have been stable for the debounce window."""
+        documents = [doc for _, doc in self.source.iter_changes()]
+        removed = self.source.removed_paths()
+        pending = self.source.pending_changes()
+
+        if not pending and not removed:
+            self._signature = None
+            return None
+
+        # Wait until the same change set has been seen for debounce_seconds
+        signature = (tuple(sorted((path, entry["sha256"]) for path, entry in pending.items())), tuple(removed))
+        now = time.monotonic()
+        if signature != self._signature:
+            self._signature = signature
+            self._quiet_since = now
+            return None
+        if now - self._quiet_since < self.debounce_seconds:
+            return None
+
+        self._signature = None
+        return self._apply(documents, pending, removed)
+
+    def _apply(self, documents: List[Dict[str, Any]], pending: Dict[str, Dict[str, Any]],
+               removed: List[str]) -> Dict[str, Any]:
+        """Replace the vectors of changed files and drop those of removed files."""
+        stale_ids = set()
+        for path, entry in pending.items():
+            previous = self.source.manifest.get(path)
+            if previous is None or previous["sha256"] != entry["sha256"]:
+                stale_ids.update(self.source.document_ids_for(path))
+        for path in removed:
+            stale_ids.update(self.source.document_ids_for(path))
+        # Re-ingested documents replace any earlier copy with the same ID
+        stale_ids.update(doc["id"] for doc in documents)
+
+        chunks_removed = self.processor.delete_documents(list(stale_ids)) if stale_ids else 0
+        if documents:
+            self.processor.process_banking_documents(documents)
+        # Persisted by commit(), never ahead of the store; a crash before then re-applies these files
+        self.source.commit(persist=False)
+        self._manifest_dirty = True
+
+        self.stats["updates_applied"] += 1
+        self.stats["documents_indexed"] += len(documents)
+        self.stats["documents_removed"] += len(removed)
+        self.stats["last_update_at"] = time.time()
+        summary = {
+            "documents_indexed": len(documents),
+            "files_removed": len(removed),
+            "chunks_removed": chunks_removed,
+            "total_chunks": len(self.processor.vector_store.chunks)
+        }
+        logger.info(f"Applied document changes: {summary}")
+        return summary
+
+    def commit(self, force: bool = False) -> bool:
+        """Save the store if it changed and the commit interval elapsed (or force is set).
+
+        Manifest changes that left the store untouched (e.g. only empty or unparseable files
+        changed) are persisted straight away, since the store on disk is already current.
+        """
+        generation = self.processor.vector_store.generation
+        if generation == self._committed_generation:
+            if self._manifest_dirty:
+                self.source.save_manifest()
+                self._manifest_dirty = False
+            return False
+        if not force and time.monotonic() - self._last_commit < self.commit_interval:
+            return False
+
+        self.processor.save_vector_store(self.store_path)
+        self.source.save_manifest()
+        self._manifest_dirty = False
+        self._committed_generation = generation
+        self._last_commit = time.monotonic()
+        self.stats["last_commit_at"] = time.time()
+        return True
+
+    def run(self):
+        """Poll until stop() is called, committing on the configured cadence."""
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+                self.commit()
+            except Exception as e:
+                self.stats["last_error"] = str(e)
+                logger.error(f"Error applying document changes: {e}")
+            self._stop.wait(self.poll_interval)
+        self.commit(force=True)
+
+    def start(self):
+        """Run the watcher on a background thread."""
+        self._thread = threading.Thread(target=self.run, name="document-watcher", daemon=True)
+        self._thread.start()
+        logger.info(f"Watching {self.source.directories} for document changes")
+
+    def stop(self):
+        """Stop the background thread and commit any uncommitted changes."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def status(self) -> Dict[str, Any]:
+        """Watcher state for /health."""
+        return {
+            "directories": self.source.directories,
+            "running": self._thread is not None and self._thread.is_alive(),
+            "uncommitted": self.processor.vector_store.generation != self._committed_generation,
+            **self.stats
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description="Continuously index changed documents")
+    parser.add_argument("directories", nargs="+", help="Document directories to watch")
+    parser.add_argument("--store", default=DEFAULT_VECTOR_STORE_PATH, help="Vector store path (without extension)")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="Seconds between scans")
+    parser.add_argument("--debounce", type=float, default=2.0, help="Seconds a change set must be stable")
+    parser.add_argument("--commit-interval", type=float, default=30.0, help="Seconds between store commits")
+    parser.add_argument("--model", default=DEFAULT_EMBEDDING_MODEL, help="Embedding model name")
+    args = parser.parse_args()
+
+    processor = BankingRAGProcessor(model_name=args.model)
+    if os.path.exists(f"{args.store}.faiss"):
+        processor.load_vector_store(args.store)
+
+    watcher = DocumentWatcher(
+        processor, args.directories, store_path=args.store, poll_interval=args.poll_interval,
+        debounce_seconds=args.debounce, commit_interval=args.commit_interval
+    )
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        watcher.commit(force=True)
+
+if __name__ == "__main__":
+    main()
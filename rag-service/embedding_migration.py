@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Online re-embedding migration.
+Re-embeds the stored chunks with a new model into a fresh index, in throttled batches
+while the old index keeps serving, catches up with documents changed in the meantime,
+then cuts the processor over to the new model and index in one step. The saved store
+records the model change, so a restart still configured with the old model adopts the
+migrated one (see serving_model).
+"""
+
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from typing import List, Dict, Any, Optional
+
+from rag_processor import (
+    RAGDocumentProcessor, BankingRAGProcessor, DocumentEmbedder, FAISSVectorStore,
+    DEFAULT_VECTOR_STORE_PATH, DEFAULT_EMBEDDING_MODEL, read_store_metadata
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Catch-up passes (embedded outside the store lock) before the remainder is finished under it
+MAX_CATCH_UP_ROUNDS = 5
+
+# Written next to a store whose model was changed online: the new model and the ones it replaced
+MODEL_CHANGE_SUFFIX = ".model_change.json"
+
+def read_model_change(store_path: str) -> Optional[Dict[str, Any]]:
+    path = f"{store_path}{MODEL_CHANGE_SUFFIX}"
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def record_model_change(store_path: str, from_model: str, to_model: str):
+    """Note that the store at store_path moved from from_model to to_model while serving."""
+    previous = read_model_change(store_path)
+    replaced = previous["replaced"] if previous and previous["model_name"] == from_model else []
+    record = {
+        "model_name": to_model,
+        "replaced": [model for model in replaced + [from_model] if model != to_model],
+        "changed_at": time.time()
+    }
+    os.makedirs(os.path.dirname(store_path) or ".", exist_ok=True)
+    tmp_path = f"{store_path}{MODEL_CHANGE_SUFFIX}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(record, f)
+    os.replace(tmp_path, f"{store_path}{MODEL_CHANGE_SUFFIX}")
+
+def serving_model(store_path: str, configured_model: str) -> str:
+    """Model to load the saved store with: the configured one, unless the store was migrated away from it.
+
+    Any other mismatch is left to the store's own model check, which refuses to load.
+    """
+    metadata = read_store_metadata(store_path)
+    change = read_model_change(store_path)
+    if metadata and change and metadata["model_name"] == change["model_name"] != configured_model \
+            and configured_model in change["replaced"]:
+        logger.warning(
+            f"Store {store_path} was migrated from {configured_model} to {change['model_name']}; "
+            f"serving it with {change['model_name']}"
+        )
+        return change["model_name"]
+    return configured_model
+
+def _document_signatures(chunks: List[Dict[str, Any]]) -> Dict[str, List[tuple]]:
+    """Group chunk (index, text) pairs by document, to detect documents changed since a pass."""
+    signatures: Dict[str, List[tuple]] = {}
+    for chunk in chunks:
+        doc_id = chunk.get("metadata", {}).get("document_id", "")
+        signatures.setdefault(doc_id, []).append((chunk.get("chunk_index", 0), chunk["text"]))
+    return signatures
+
+class EmbeddingMigration:
+    """Re-embeds a processor's corpus with another model and swaps it in when done."""
+
+    def __init__(self, processor: RAGDocumentProcessor, model_name: str, batch_size: int = 64,
+                 pause_seconds: float = 0.05, store_path: Optional[str] = None):
+        if processor.search_only:
+            raise RuntimeError("Embedding migration is disabled in search-only mode")
+        self.processor = processor
+        self.batch_size = batch_size
+        # Sleep between batches so re-embedding does not starve live queries
+        self.pause_seconds = pause_seconds
+        # Where to save the migrated store after cutover (None to leave saving to the caller)
+        self.store_path = store_path
+        self.embedder = DocumentEmbedder(model_name)
+        # Re-embedding yields to interactive traffic like any ingest, and keeps doing so after cutover
+        self.embedder.batch_gate = processor.embedder.batch_gate
+        self.store = FAISSVectorStore(self.embedder.dimension, model_name)
+
+        self._cancel = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {
+            "state": "pending",
+            "from_model": processor.embedder.model_name,
+            "to_model": model_name,
+            "chunks_embedded": 0,
+            "chunks_total": 0,
+            "catch_up_rounds": 0,
+            "started_at": None,
+            "finished_at": None,
+            "error": None
+        }
+
+    def _sync(self, chunks: List[Dict[str, Any]], locked: bool = False):
+        """Bring the new store in line with a snapshot of the old store's chunks.
+
+        With locked=True the caller holds the old store's lock: batches skip the ingest gate
+        and the pause, since both would stall every writer waiting on that lock.
+        """
+        old_docs = _document_signatures(chunks)
+        new_docs = _document_signatures(self.store.chunks)
+        stale = [doc_id for doc_id, signature in new_docs.items() if old_docs.get(doc_id) != signature]
+        if stale:
+            self.store.delete_documents(stale)
+        indexed = set(new_docs) - set(stale)
+        missing = [chunk for chunk in chunks if chunk.get("metadata", {}).get("document_id", "") not in indexed]
+        self.stats["chunks_total"] += len(missing)
+
+        for start in range(0, len(missing), self.batch_size):
+            if self._cancel.is_set():
+                raise RuntimeError("Migration cancelled")
+            batch = missing[start:start + self.batch_size]
+            self.store.add_documents(batch, self.embedder.embed_chunks(batch, gated=not locked))
+            self.stats["chunks_embedded"] += len(batch)
+            if self.pause_seconds and not locked:
+                time.sleep(self.pause_seconds)
+
+    def run(self):
+        """Re-embed the corpus, catch up with concurrent changes and cut over."""
+        old_store = self.processor.vector_store
+        self.stats["state"] = "running"
+        self.stats["started_at"] = time.time()
+        try:
+            for _ in range(MAX_CATCH_UP_ROUNDS):
+                generation = old_store.generation
+                with old_store._lock:
+                    chunks = list(old_store.chunks)
+                self._sync(chunks)
+                self.stats["catch_up_rounds"] += 1
+                if old_store.generation == generation:
+                    break
+
+            with old_store._lock:
+                # Only reached with a remainder if writes outpaced every catch-up pass; it is
+                # small, so finish it while writers wait
+                if old_store.generation != generation:
+                    self._sync(list(old_store.chunks), locked=True)
+                old_store.replace_with(self.store)
+                self.processor.embedder = self.embedder
+
+            if self.store_path:
+                # Recorded first: the record is only acted on once the saved store carries the new model
+                record_model_change(self.store_path, self.stats["from_model"], self.stats["to_model"])
+                self.processor.save_vector_store(self.store_path)
+            self.stats["state"] = "completed"
+            logger.info(
+                f"Migrated {len(old_store.chunks)} chunks from {self.stats['from_model']} "
+                f"to {self.stats['to_model']}"
+            )
+        except Exception as e:
+            self.stats["state"] = "cancelled" if self._cancel.is_set() else "failed"
+            self.stats["error"] = str(e)
+            logger.error(f"Embedding migration failed: {e}")
+        finally:
+            self.stats["finished_at"] = time.time()
+
+    def start(self):
+        """Run the migration on a background thread."""
+        self._thread = threading.Thread(target=self.run, name="embedding-migration", daemon=True)
+        self._thread.start()
+        logger.info(f"Started embedding migration to {self.stats['to_model']}")
+
+    def cancel(self):
+        """Stop re-embedding; the old index keeps serving."""
+        self._cancel.set()
+        if self._thread:
+            self._thread.join()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def status(self) -> Dict[str, Any]:
+        """Migration progress for /health."""
+        return {"running": self.running, **self.stats}
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-embed a saved vector store with another model")
+    parser.add_argument("model", help="New embedding model name")
+    parser.add_argument("--store", default=DEFAULT_VECTOR_STORE_PATH, help="Vector store path (without extension)")
+    parser.add_argument("--output", help="Where to save the migrated store (defaults to --store)")
+    parser.add_argument("--batch-size", type=int, default=256, help="Chunks per embedding batch")
+    args = parser.parse_args()
+
+    if not os.path.exists(f"{args.store}.faiss"):
+        parser.error(f"No vector store at {args.store}")
+    metadata = read_store_metadata(args.store) or {}
+    processor = BankingRAGProcessor(model_name=metadata.get("model_name", DEFAULT_EMBEDDING_MODEL))
+    processor.load_vector_store(args.store)
+
+    migration = EmbeddingMigration(
+        processor, args.model, batch_size=args.batch_size, pause_seconds=0,
+        store_path=args.output or args.store
+    )
+    migration.run()
+    print(json.dumps(migration.status(), indent=2))
+
+if __name__ == "__main__":
+    main()
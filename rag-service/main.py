@@ -1,11 +1,34 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, FileResponse
+from fastapi.concurrency import run_in_threadpool
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
 import os
 import json
-from rag_processor import BankingRAGProcessor
+import time
+import asyncio
+import functools
 import logging
+import tempfile
+import threading
+
+_import_start = time.perf_counter()
+from rag_processor import BankingRAGProcessor, STARTUP_TIMINGS, DEFAULT_VECTOR_STORE_PATH, DEFAULT_EMBEDDING_MODEL
+STARTUP_TIMINGS["import_rag_processor"] = round(time.perf_counter() - _import_start, 4)
+from document_watcher import DocumentWatcher
+from semantic_cache import SemanticQueryCache
+from embedding_migration import EmbeddingMigration, serving_model
+from warmup import SearchWarmUp, load_warmup_queries
+from query_log import QueryLog
+from snapshot import export_snapshot_file, load_snapshot, SnapshotError
+from replication import ChangeLog, ReplicationLeader, ReplicationFollower, ReplicationGap
+from request_scheduler import RequestScheduler, SchedulerOverloaded, parse_class_map
+from collection_manager import CollectionManager, CollectionLimitError, DEFAULT_COLLECTIONS_DIR
+from response_formats import (
+    negotiate_format, project_results, encode_msgpack, msgpack_available, MSGPACK_MEDIA_TYPE
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -25,14 +48,138 @@ app.add_middleware(
 # Global RAG processor
 rag_processor = None
 
+# Embedding model; must match the model recorded in the saved store, except that a store
+# migrated online away from this model is served with its new model (embedding_migration.serving_model)
+EMBEDDING_MODEL = os.getenv("RAG_EMBEDDING_MODEL", DEFAULT_EMBEDDING_MODEL)
+embedding_migration = None
+
+# Replication: a leader logs index changes to RAG_REPLICATION_DIR; followers tail that directory
+# (or the leader's /replication/changes endpoint when RAG_REPLICATION_LEADER_URL is set)
+REPLICATION_ROLE = os.getenv("RAG_REPLICATION_ROLE") or None
+REPLICATION_DIR = os.getenv("RAG_REPLICATION_DIR", "./data/replication")
+REPLICATION_LEADER_URL = os.getenv("RAG_REPLICATION_LEADER_URL") or None
+REPLICATION_POLL_SECONDS = float(os.getenv("RAG_REPLICATION_POLL_SECONDS", "0.5"))
+REPLICATION_SNAPSHOT_EVERY = int(os.getenv("RAG_REPLICATION_SNAPSHOT_EVERY", "1000"))
+if REPLICATION_ROLE not in (None, "leader", "follower"):
+    raise ValueError(f"RAG_REPLICATION_ROLE must be 'leader' or 'follower', not {REPLICATION_ROLE!r}")
+replication_leader = None
+replication_follower = None
+
+# Search-only processes serve a pre-built store and refuse ingestion (followers always are)
+SEARCH_ONLY = os.getenv("RAG_SEARCH_ONLY", "false").lower() in ("1", "true", "yes") or REPLICATION_ROLE == "follower"
+
+# Saves after /process_documents are coalesced: at most one every RAG_SAVE_DEBOUNCE_SECONDS
+# (0 saves after every request). Changes made since the last save are lost on a crash.
+SAVE_DEBOUNCE_SECONDS = float(os.getenv("RAG_SAVE_DEBOUNCE_SECONDS", "2"))
+_save_timer = None
+_save_timer_lock = threading.Lock()
+_save_lock = threading.Lock()
+_saved_generation = None
+
+# Watch mode: directories (os.pathsep-separated) to index continuously
+WATCH_DIRS = [d for d in os.getenv("RAG_WATCH_DIRS", "").split(os.pathsep) if d]
+WATCH_DEBOUNCE_SECONDS = float(os.getenv("RAG_WATCH_DEBOUNCE_SECONDS", "2"))
+WATCH_COMMIT_INTERVAL = float(os.getenv("RAG_WATCH_COMMIT_INTERVAL", "30"))
+document_watcher = None
+
+# Semantic query cache: reuse results for near-duplicate queries (cosine >= threshold)
+SEMANTIC_CACHE_ENABLED = os.getenv("RAG_SEMANTIC_CACHE", "false").lower() in ("1", "true", "yes")
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("RAG_SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_SIZE = int(os.getenv("RAG_SEMANTIC_CACHE_SIZE", "1024"))
+SEMANTIC_CACHE_VERIFY_RATE = float(os.getenv("RAG_SEMANTIC_CACHE_VERIFY_RATE", "0.05"))
+
+# Optional two-stage search: binary (sign-bit) prefilter "flat" or "hnsw", then exact re-scoring
+BINARY_PREFILTER = os.getenv("RAG_BINARY_PREFILTER") or None
+BINARY_CANDIDATES = int(os.getenv("RAG_BINARY_CANDIDATES", "200"))
+
+# Date segments: "quarter" or "year" partitions by publication date; segments older than
+# COMPRESS_AFTER periods are held as 8-bit SQ and those older than UNLOAD_AFTER stay on disk
+DATE_SEGMENTS = os.getenv("RAG_DATE_SEGMENTS") or None
+SEGMENT_COMPRESS_AFTER = int(os.getenv("RAG_SEGMENT_COMPRESS_AFTER")) if os.getenv("RAG_SEGMENT_COMPRESS_AFTER") else None
+SEGMENT_UNLOAD_AFTER = int(os.getenv("RAG_SEGMENT_UNLOAD_AFTER")) if os.getenv("RAG_SEGMENT_UNLOAD_AFTER") else None
+
+# Named collections: separate stores sharing the embedding model, LRU-unloaded past the budget
+COLLECTIONS_DIR = os.getenv("RAG_COLLECTIONS_DIR", DEFAULT_COLLECTIONS_DIR)
+COLLECTIONS_MEMORY_MB = float(os.getenv("RAG_COLLECTIONS_MEMORY_MB", "0"))
+COLLECTION_MEMORY_MB = float(os.getenv("RAG_COLLECTION_MEMORY_MB", "0"))
+collection_manager = None
+
+# Warm-up: replay representative (or logged) queries before /health reports ready
+WARMUP_ENABLED = os.getenv("RAG_WARMUP", "true").lower() in ("1", "true", "yes")
+WARMUP_QUERIES_FILE = os.getenv("RAG_WARMUP_QUERIES_FILE")
+WARMUP_MAX_QUERIES = int(os.getenv("RAG_WARMUP_MAX_QUERIES", "50"))
+search_warmup = None
+
+# Query capture: append /search requests (filters, top_k, latency) to a rotating JSONL log
+QUERY_LOG_PATH = os.getenv("RAG_QUERY_LOG") or None
+QUERY_LOG_MAX_MB = float(os.getenv("RAG_QUERY_LOG_MAX_MB", "50"))
+QUERY_LOG_BACKUPS = int(os.getenv("RAG_QUERY_LOG_BACKUPS", "5"))
+query_log = None
+
+# Request scheduling: interactive/batch/ingest classes (X-Request-Class header or API key) share the
+# search and embedding thread pools by weighted fair queueing; ingestion yields while interactive
+# p95 latency is over RAG_INTERACTIVE_SLO_MS. RAG_SCHEDULER=false runs requests inline as before.
+SCHEDULER_ENABLED = os.getenv("RAG_SCHEDULER", "true").lower() in ("1", "true", "yes")
+SEARCH_WORKERS = int(os.getenv("RAG_SEARCH_WORKERS", "4"))
+EMBEDDING_WORKERS = int(os.getenv("RAG_EMBEDDING_WORKERS", "1"))
+SCHEDULER_WEIGHTS = parse_class_map(os.getenv("RAG_SCHEDULER_WEIGHTS"), float)
+SCHEDULER_CONCURRENCY = parse_class_map(os.getenv("RAG_SCHEDULER_CONCURRENCY"), int)
+SCHEDULER_MAX_QUEUE = int(os.getenv("RAG_SCHEDULER_MAX_QUEUE", "256"))
+INTERACTIVE_SLO_MS = float(os.getenv("RAG_INTERACTIVE_SLO_MS", "500"))
+INGEST_MAX_PAUSE_SECONDS = float(os.getenv("RAG_INGEST_MAX_PAUSE_SECONDS", "10"))
+# "key=class,key=class": API keys (X-API-Key) whose requests always get that class
+API_KEY_CLASSES = parse_class_map(os.getenv("RAG_API_KEY_CLASSES"))
+request_scheduler = None
+
 class DocumentQuery(BaseModel):
     query: str
     risk_type: Optional[str] = None
     document_type: Optional[str] = None
     top_k: int = 5
+    # Optional publication date bounds, "YYYY", "YYYY-MM" or "YYYY-MM-DD" (inclusive)
+    date_from: Optional[str] = None
+    date_to: Optional[str] = None
+    # Threshold mode: every chunk with cosine similarity >= min_score, at most max_results (top_k is ignored)
+    min_score: Optional[float] = None
+    max_results: int = 50
+    # Hierarchical mode: pick the top_documents documents by summary, then search only their chunks
+    top_documents: Optional[int] = None
+    # Optional projection: result fields to return (metadata keys allowed) and text truncation
+    fields: Optional[List[str]] = None
+    text_chars: Optional[int] = None
+    # Optional diversification: MMR re-ranking, per-document cap and adjacent-chunk merging
+    diversify: bool = False
+    mmr_lambda: float = 0.5
+    max_per_document: Optional[int] = None
+    merge_adjacent: bool = False
+    # Optional context expansion: ±expand_window neighbouring chunks (or the whole document)
+    expand_window: int = 0
+    expand_full_document: bool = False
+    expand_token_budget: int = 2000
+
+class ContextRequest(BaseModel):
+    query: str
+    token_budget: int = 2000
+    risk_type: Optional[str] = None
+    document_type: Optional[str] = None
+    # Ranked, diversified hits considered for packing
+    candidates: int = 20
+    max_per_document: Optional[int] = 2
+    mmr_lambda: float = 0.5
+    date_from: Optional[str] = None
+    date_to: Optional[str] = None
+    # Only consider chunks with cosine similarity >= min_score (candidates is then the cap)
+    min_score: Optional[float] = None
 
 class DocumentProcessRequest(BaseModel):
     documents: List[Dict[str, Any]]
+    # Remove existing chunks of these document IDs first (makes retried uploads idempotent)
+    replace: bool = False
+
+class EmbeddingMigrationRequest(BaseModel):
+    model_name: str
+    batch_size: int = 64
+    pause_seconds: float = 0.05
 
 class SearchResponse(BaseModel):
     results: List[Dict[str, Any]]
@@ -42,21 +189,125 @@ class SearchResponse(BaseModel):
 @app.on_event("startup")
 async def startup_event():
     """Initialize RAG processor on startup."""
-    global rag_processor
-    logger.info("Initializing Banking RAG Processor...")
-    rag_processor = BankingRAGProcessor()
+    global rag_processor, request_scheduler
+    startup_start = time.perf_counter()
+    logger.info(f"Initializing Banking RAG Processor (search_only={SEARCH_ONLY})...")
+    vector_store_path = DEFAULT_VECTOR_STORE_PATH
+    rag_processor = BankingRAGProcessor(
+        search_only=SEARCH_ONLY, model_name=serving_model(vector_store_path, EMBEDDING_MODEL)
+    )
     
     # Try to load existing vector store
-    vector_store_path = "./data/banking_vector_store"
     if os.path.exists(f"{vector_store_path}.faiss"):
         try:
             rag_processor.load_vector_store(vector_store_path)
             logger.info("Loaded existing vector store")
+        except ValueError as e:
+            # Model mismatch: refuse to start rather than serve (or overwrite) an incompatible store
+            logger.error(f"Refusing to load vector store: {e}")
+            raise
         except Exception as e:
             logger.error(f"Failed to load vector store: {e}")
             logger.info("Will create new vector store when documents are processed")
     else:
         logger.info("No existing vector store found. Will create new one when documents are processed")
+    
+    if SCHEDULER_ENABLED:
+        request_scheduler = RequestScheduler(
+            executors={"search": SEARCH_WORKERS, "embedding": EMBEDDING_WORKERS},
+            weights=SCHEDULER_WEIGHTS, concurrency=SCHEDULER_CONCURRENCY, max_queue=SCHEDULER_MAX_QUEUE,
+            interactive_slo_ms=INTERACTIVE_SLO_MS, max_ingest_pause=INGEST_MAX_PAUSE_SECONDS,
+            api_key_classes=API_KEY_CLASSES
+        )
+        # Covers every ingest path sharing the embedder (requests, collections and the watcher) and
+        # embedding migrations, which carry the gate over to the embedder they cut over to
+        rag_processor.embedder.batch_gate = request_scheduler.ingest_gate
+    
+    if DATE_SEGMENTS:
+        rag_processor.vector_store.enable_date_segments(
+            DATE_SEGMENTS, compress_after=SEGMENT_COMPRESS_AFTER, unload_after=SEGMENT_UNLOAD_AFTER,
+            offload_dir=f"{vector_store_path}.segments"
+        )
+        logger.info(f"Date segments enabled ({DATE_SEGMENTS}): {rag_processor.vector_store.segment_status()}")
+    
+    if BINARY_PREFILTER:
+        rag_processor.vector_store.enable_binary_prefilter(BINARY_PREFILTER, BINARY_CANDIDATES)
+        logger.info(f"Binary prefilter enabled ({BINARY_PREFILTER}, {BINARY_CANDIDATES} candidates)")
+    
+    global collection_manager
+    collection_manager = CollectionManager(
+        rag_processor.embedder, base_dir=COLLECTIONS_DIR,
+        memory_limit_bytes=int(COLLECTIONS_MEMORY_MB * 1024 * 1024),
+        collection_limit_bytes=int(COLLECTION_MEMORY_MB * 1024 * 1024),
+        search_only=SEARCH_ONLY, binary_prefilter=BINARY_PREFILTER,
+        candidate_pool=BINARY_CANDIDATES
+    )
+    
+    if SEMANTIC_CACHE_ENABLED:
+        rag_processor.query_cache = SemanticQueryCache(
+            rag_processor.vector_store.dimension, threshold=SEMANTIC_CACHE_THRESHOLD,
+            max_entries=SEMANTIC_CACHE_SIZE, verify_rate=SEMANTIC_CACHE_VERIFY_RATE
+        )
+    
+    if WARMUP_ENABLED:
+        global search_warmup
+        try:
+            queries = load_warmup_queries(WARMUP_QUERIES_FILE, WARMUP_MAX_QUERIES)
+        except Exception as e:
+            logger.error(f"Failed to read warm-up queries from {WARMUP_QUERIES_FILE}: {e}")
+            queries = load_warmup_queries(None, WARMUP_MAX_QUERIES)
+        # Runs after the semantic cache is attached so replayed queries populate it
+        search_warmup = SearchWarmUp(rag_processor, queries)
+        search_warmup.start()
+    
+    if QUERY_LOG_PATH:
+        global query_log
+        query_log = QueryLog(
+            QUERY_LOG_PATH, max_bytes=int(QUERY_LOG_MAX_MB * 1024 * 1024), backup_count=QUERY_LOG_BACKUPS
+        )
+        logger.info(f"Capturing search requests to {QUERY_LOG_PATH}")
+    
+    # Attached after the store is loaded and configured, so the leader's initial reset snapshots it
+    if REPLICATION_ROLE == "leader":
+        global replication_leader
+        replication_leader = ReplicationLeader(
+            rag_processor.vector_store, ChangeLog(REPLICATION_DIR), snapshot_every=REPLICATION_SNAPSHOT_EVERY
+        )
+        replication_leader.start()
+    elif REPLICATION_ROLE == "follower":
+        global replication_follower
+        replication_follower = ReplicationFollower(
+            rag_processor, REPLICATION_LEADER_URL or REPLICATION_DIR, store_path=vector_store_path,
+            poll_seconds=REPLICATION_POLL_SECONDS
+        )
+        replication_follower.start()
+    
+    if WATCH_DIRS and not SEARCH_ONLY:
+        global document_watcher
+        document_watcher = DocumentWatcher(
+            rag_processor, WATCH_DIRS, store_path=vector_store_path,
+            debounce_seconds=WATCH_DEBOUNCE_SECONDS, commit_interval=WATCH_COMMIT_INTERVAL
+        )
+        document_watcher.start()
+    
+    STARTUP_TIMINGS["startup_total"] = round(time.perf_counter() - startup_start, 4)
+    logger.info(f"Startup timings: {STARTUP_TIMINGS}")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background workers and commit pending index changes."""
+    if rag_processor:
+        _flush_save()
+    if document_watcher:
+        document_watcher.stop()
+    if query_log:
+        query_log.close()
+    if replication_follower:
+        replication_follower.stop()
+    if replication_leader:
+        replication_leader.stop()
+    if request_scheduler:
+        request_scheduler.shutdown()
 
 @app.get("/")
 async def root():
@@ -65,43 +316,276 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Detailed health check."""
+    """Detailed health check. Returns 503 until the startup warm-up has finished."""
     global rag_processor
-    return {
-        "status": "healthy",
+    ready = search_warmup.ready if search_warmup else True
+    health = {
+        "status": "healthy" if ready else "warming_up",
+        "ready": ready,
         "rag_processor_initialized": rag_processor is not None,
-        "total_chunks": len(rag_processor.vector_store.chunks) if rag_processor else 0
+        "search_only": SEARCH_ONLY,
+        "model_loaded": rag_processor.embedder.model_loaded if rag_processor else False,
+        "embedding_model": rag_processor.embedder.model_name if rag_processor else None,
+        "total_chunks": rag_processor.vector_store.stats.total_chunks if rag_processor else 0,
+        "startup_timings": STARTUP_TIMINGS,
+        "watcher": document_watcher.status() if document_watcher else None,
+        "semantic_cache": rag_processor.query_cache.status() if rag_processor and rag_processor.query_cache else None,
+        "embedding_migration": embedding_migration.status() if embedding_migration else None,
+        "collections": collection_manager.status() if collection_manager else None,
+        "warmup": search_warmup.status() if search_warmup else None,
+        "query_log": query_log.status() if query_log else None,
+        "scheduler": request_scheduler.status() if request_scheduler else None,
+        "replication": (replication_leader or replication_follower).status()
+        if replication_leader or replication_follower else None
     }
+    if not ready:
+        return JSONResponse(status_code=503, content=health)
+    return health
+
+async def _schedule(http_request: Request, default_class: str, executor: str, fn, *args, **kwargs):
+    """Run fn on a scheduler pool under the request's class (inline when scheduling is disabled)."""
+    if kwargs:
+        fn = functools.partial(fn, **kwargs)
+    if not request_scheduler:
+        return fn(*args)
+    try:
+        request_class = request_scheduler.classify(
+            http_request.headers.get("x-request-class"), http_request.headers.get("x-api-key"), default_class
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        return await request_scheduler.run(request_class, executor, fn, *args)
+    except SchedulerOverloaded as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+def _save_main_store():
+    """Save the main store if it changed since the last save."""
+    global _save_timer, _saved_generation
+    with _save_timer_lock:
+        _save_timer = None
+    with _save_lock:
+        generation = rag_processor.vector_store.generation
+        if generation == _saved_generation:
+            return
+        os.makedirs("./data", exist_ok=True)
+        rag_processor.save_vector_store(DEFAULT_VECTOR_STORE_PATH)
+        _saved_generation = generation
+
+def _schedule_save():
+    """Save the main store after the debounce delay, coalescing the ingests that land meanwhile."""
+    global _save_timer
+    if SAVE_DEBOUNCE_SECONDS <= 0:
+        _save_main_store()
+        return
+    with _save_timer_lock:
+        if _save_timer is None:
+            _save_timer = threading.Timer(SAVE_DEBOUNCE_SECONDS, _save_main_store)
+            _save_timer.daemon = True
+            _save_timer.start()
+
+def _flush_save():
+    """Save now if a debounced save is pending."""
+    with _save_timer_lock:
+        timer = _save_timer
+    if timer is not None:
+        timer.cancel()
+        _save_main_store()
+
+def _ingest_documents(request: DocumentProcessRequest) -> int:
+    """Index (or replace) documents in the main store and schedule a save."""
+    if request.replace:
+        chunks_added = rag_processor.replace_banking_documents(request.documents)
+    else:
+        chunks_added = rag_processor.process_banking_documents(request.documents)
+    _schedule_save()
+    return chunks_added
 
 @app.post("/process_documents")
-async def process_documents(request: DocumentProcessRequest):
+async def process_documents(request: DocumentProcessRequest, http_request: Request):
     """Process and index banking documents."""
     global rag_processor
     
     if not rag_processor:
         raise HTTPException(status_code=500, detail="RAG processor not initialized")
     
+    if rag_processor.search_only:
+        raise HTTPException(status_code=403, detail="Document ingestion is disabled in search-only mode")
+    
     try:
         logger.info(f"Processing {len(request.documents)} documents...")
-        rag_processor.process_banking_documents(request.documents)
-        
-        # Save the vector store
-        vector_store_path = "./data/banking_vector_store"
-        os.makedirs("./data", exist_ok=True)
-        rag_processor.save_vector_store(vector_store_path)
+        chunks_added = await _schedule(http_request, "ingest", "embedding", _ingest_documents, request)
         
         return {
             "message": "Documents processed successfully",
             "documents_processed": len(request.documents),
+            "chunks_added": chunks_added,
             "total_chunks": len(rag_processor.vector_store.chunks)
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing documents: {e}")
         raise HTTPException(status_code=500, detail=f"Error processing documents: {str(e)}")
 
+@app.post("/admin/migrate_embeddings")
+async def migrate_embeddings(request: EmbeddingMigrationRequest):
+    """Re-embed the corpus with another model in the background, then cut over."""
+    global rag_processor, embedding_migration
+    
+    if not rag_processor:
+        raise HTTPException(status_code=500, detail="RAG processor not initialized")
+    
+    if rag_processor.search_only:
+        raise HTTPException(status_code=403, detail="Embedding migration is disabled in search-only mode")
+    
+    if embedding_migration and embedding_migration.running:
+        raise HTTPException(status_code=409, detail="An embedding migration is already running")
+    
+    if request.model_name == rag_processor.embedder.model_name:
+        raise HTTPException(status_code=400, detail=f"Store already uses {request.model_name}")
+    
+    try:
+        embedding_migration = EmbeddingMigration(
+            rag_processor, request.model_name, batch_size=request.batch_size,
+            pause_seconds=request.pause_seconds, store_path=DEFAULT_VECTOR_STORE_PATH
+        )
+        embedding_migration.start()
+    except Exception as e:
+        logger.error(f"Error starting embedding migration: {e}")
+        raise HTTPException(status_code=500, detail=f"Error starting embedding migration: {str(e)}")
+    
+    return {"message": "Embedding migration started", **embedding_migration.status()}
+
+@app.get("/admin/snapshot")
+async def export_snapshot():
+    """Download a versioned, checksummed snapshot of the vector store (gzip tar)."""
+    global rag_processor
+    
+    if not rag_processor:
+        raise HTTPException(status_code=500, detail="RAG processor not initialized")
+    
+    fd, path = tempfile.mkstemp(suffix=".tar.gz")
+    os.close(fd)
+    try:
+        # Serialising the store is slow; keep the event loop serving searches meanwhile
+        manifest = await run_in_threadpool(export_snapshot_file, rag_processor.vector_store, path)
+    except Exception as e:
+        os.remove(path)
+        logger.error(f"Error exporting snapshot: {e}")
+        raise HTTPException(status_code=500, detail=f"Error exporting snapshot: {str(e)}")
+    
+    return FileResponse(
+        path,
+        media_type="application/gzip",
+        filename=f"banking-rag-snapshot-{manifest['created_at'].replace(':', '')}.tar.gz",
+        headers={"X-Snapshot-SHA256": manifest["archive_sha256"]},
+        background=BackgroundTask(os.remove, path)
+    )
+
+def _activate_snapshot(spool) -> Dict[str, Any]:
+    """Verify a spooled snapshot, swap it in as the main store and save it. Returns its manifest."""
+    store, manifest = load_snapshot(spool, model_name=rag_processor.embedder.model_name)
+    rag_processor.vector_store.replace_with(store)
+    os.makedirs("./data", exist_ok=True)
+    rag_processor.save_vector_store(DEFAULT_VECTOR_STORE_PATH)
+    return manifest
+
+@app.post("/admin/snapshot")
+async def import_snapshot(request: Request):
+    """Upload a snapshot (request body), verify it and make it the active store."""
+    global rag_processor
+    
+    if not rag_processor:
+        raise HTTPException(status_code=500, detail="RAG processor not initialized")
+    
+    if embedding_migration and embedding_migration.running:
+        raise HTTPException(status_code=409, detail="An embedding migration is running")
+    
+    if replication_follower:
+        raise HTTPException(status_code=403, detail="Followers are updated by replication; import on the leader")
+    
+    # Spool the upload to disk as it arrives; the store is only touched after verification
+    with tempfile.TemporaryFile() as spool:
+        async for block in request.stream():
+            spool.write(block)
+        spool.seek(0)
+        try:
+            manifest = await run_in_threadpool(_activate_snapshot, spool)
+        except SnapshotError as e:
+            raise HTTPException(status_code=400, detail=f"Snapshot rejected: {str(e)}")
+        except Exception as e:
+            logger.error(f"Error importing snapshot: {e}")
+            raise HTTPException(status_code=500, detail=f"Error importing snapshot: {str(e)}")
+    
+    logger.info(f"Activated snapshot from {manifest['created_at']}")
+    
+    return {
+        "message": "Snapshot activated",
+        "created_at": manifest["created_at"],
+        "model": manifest["model"],
+        "vectors": manifest["vectors"],
+        "documents": manifest["documents"],
+        "total_chunks": len(rag_processor.vector_store.chunks)
+    }
+
+@app.get("/replication/changes")
+async def replication_changes(
+    after: int = Query(0, ge=0),
+    limit: int = Query(100, ge=0, le=1000),
+    wait: float = Query(0.0, ge=0.0, le=30.0)
+):
+    """Logged index changes after sequence number `after`, for followers tailing over HTTP.
+    
+    With wait, a caught-up request is held open up to that many seconds for new changes.
+    limit=0 returns only the log head. Returns 410 when the changes were compacted away.
+    """
+    if not replication_leader:
+        raise HTTPException(status_code=404, detail="This instance is not a replication leader")
+    
+    log = replication_leader.log
+    deadline = time.monotonic() + wait
+    while log.last_seq == after and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    
+    try:
+        lines = await run_in_threadpool(log.read_lines, after, limit)
+    except ReplicationGap as e:
+        raise HTTPException(status_code=410, detail=str(e))
+    
+    # Logged lines are already JSON; splice them in rather than decoding and re-encoding the vectors
+    head = json.dumps(log.head())
+    return Response(
+        content=head[:-1].encode("utf-8") + b', "changes": [' + b", ".join(lines) + b"]}",
+        media_type="application/json"
+    )
+
+@app.get("/replication/snapshot")
+async def replication_snapshot(min_seq: int = Query(0, ge=0)):
+    """The leader's latest on-disk snapshot, for followers bootstrapping over HTTP.
+    
+    Served as written by the leader's snapshot thread, so a (re)bootstrap never serialises the
+    live store. Returns 503 until there is a snapshot at or after change min_seq.
+    """
+    if not replication_leader:
+        raise HTTPException(status_code=404, detail="This instance is not a replication leader")
+    
+    latest = replication_leader.log.latest_snapshot()
+    if latest is None or latest[0] < min_seq:
+        raise HTTPException(status_code=503, detail=f"No replication snapshot at or after change {min_seq} yet")
+    
+    seq, path = latest
+    return FileResponse(
+        path, media_type="application/gzip", filename=os.path.basename(path), headers={"X-Snapshot-Seq": str(seq)}
+    )
+
 @app.post("/search", response_model=SearchResponse)
-async def search_documents(query: DocumentQuery):
-    """Search for relevant document chunks."""
+async def search_documents(query: DocumentQuery, http_request: Request, accept: Optional[str] = Header(None)):
+    """Search for relevant document chunks.
+    
+    Responds with msgpack when the Accept header asks for it. Projected and msgpack
+    responses are returned directly, skipping response model validation.
+    """
     global rag_processor
     
     if not rag_processor:
@@ -110,30 +594,111 @@ async def search_documents(query: DocumentQuery):
     if len(rag_processor.vector_store.chunks) == 0:
         raise HTTPException(status_code=400, detail="No documents have been processed yet")
     
+    response_format = negotiate_format(accept)
+    if response_format == "msgpack" and not msgpack_available():
+        raise HTTPException(status_code=406, detail="msgpack responses require the msgpack package")
+    
+    if not query_log:
+        return await _schedule(http_request, "interactive", "search", _run_search, rag_processor, query, response_format)
+    
+    start = time.perf_counter()
+    status = 200
+    try:
+        return await _schedule(http_request, "interactive", "search", _run_search, rag_processor, query, response_format)
+    except HTTPException as e:
+        status = e.status_code
+        raise
+    finally:
+        query_log.record(query.model_dump(exclude_defaults=True), status, (time.perf_counter() - start) * 1000)
+
+def _run_search(processor: BankingRAGProcessor, query: DocumentQuery, response_format: str):
+    """Run a search against a processor and build the (projected/msgpack) response."""
     try:
         logger.info(f"Searching for: {query.query}")
-        results = rag_processor.search_banking_context(
+        results = processor.search_banking_context(
             query=query.query,
             risk_type=query.risk_type,
             document_type=query.document_type,
-            top_k=query.top_k
+            top_k=query.max_results if query.min_score is not None else query.top_k,
+            diversify=query.diversify,
+            mmr_lambda=query.mmr_lambda,
+            max_per_document=query.max_per_document,
+            merge_adjacent=query.merge_adjacent,
+            date_from=query.date_from,
+            date_to=query.date_to,
+            min_score=query.min_score,
+            top_documents=query.top_documents
         )
         
+        if query.expand_window > 0 or query.expand_full_document:
+            results = processor.expand_context(
+                results,
+                window=query.expand_window,
+                full_document=query.expand_full_document,
+                token_budget=query.expand_token_budget
+            )
+        
+        if response_format == "msgpack" or query.fields or query.text_chars is not None:
+            payload = {
+                "results": project_results(results, query.fields, query.text_chars),
+                "total_chunks": len(processor.vector_store.chunks),
+                "query": query.query
+            }
+            if response_format == "msgpack":
+                return Response(content=encode_msgpack(payload), media_type=MSGPACK_MEDIA_TYPE)
+            return JSONResponse(content=payload)
+        
         return SearchResponse(
             results=results,
-            total_chunks=len(rag_processor.vector_store.chunks),
+            total_chunks=len(processor.vector_store.chunks),
             query=query.query
         )
     except Exception as e:
         logger.error(f"Error searching documents: {e}")
         raise HTTPException(status_code=500, detail=f"Error searching documents: {str(e)}")
 
+@app.post("/context")
+async def build_context(request: ContextRequest, http_request: Request):
+    """Pack the best non-redundant chunks into a ready-to-use prompt context with citations."""
+    global rag_processor
+    
+    if not rag_processor:
+        raise HTTPException(status_code=500, detail="RAG processor not initialized")
+    
+    if len(rag_processor.vector_store.chunks) == 0:
+        raise HTTPException(status_code=400, detail="No documents have been processed yet")
+    
+    if request.token_budget <= 0:
+        raise HTTPException(status_code=400, detail="token_budget must be positive")
+    
+    try:
+        logger.info(f"Building context for: {request.query}")
+        packed = await _schedule(
+            http_request, "interactive", "search", rag_processor.build_context,
+            request.query,
+            token_budget=request.token_budget,
+            risk_type=request.risk_type,
+            document_type=request.document_type,
+            candidates=request.candidates,
+            max_per_document=request.max_per_document,
+            mmr_lambda=request.mmr_lambda,
+            date_from=request.date_from,
+            date_to=request.date_to,
+            min_score=request.min_score
+        )
+        return {"query": request.query, "token_budget": request.token_budget, **packed}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error building context: {e}")
+        raise HTTPException(status_code=500, detail=f"Error building context: {str(e)}")
+
 @app.get("/stats")
 async def get_stats():
     """Get statistics about the indexed documents."""
     global rag_processor
     
-    if not rag_processor or len(rag_processor.vector_store.chunks) == 0:
+    if not rag_processor or rag_processor.vector_store.stats.total_chunks == 0:
         return {
             "total_chunks": 0,
             "unique_documents": 0,
@@ -141,25 +706,134 @@ async def get_stats():
             "risk_types": []
         }
     
-    chunks = rag_processor.vector_store.chunks
+    vector_store = rag_processor.vector_store
     
-    # Collect statistics
-    unique_docs = set()
-    doc_types = set()
-    risk_types = set()
+    # Statistics are maintained incrementally by the vector store
+    return {
+        **vector_store.stats.summary(),
+        "index_memory_bytes": vector_store.index_memory_bytes(),
+        "binary_index_memory_bytes": vector_store.binary_index_memory_bytes(),
+        "document_index_memory_bytes": vector_store.document_index_memory_bytes(),
+        "segments": vector_store.segment_status()
+    }
+
+@app.get("/documents")
+async def list_documents(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    document_type: Optional[List[str]] = Query(None),
+    risk_type: Optional[List[str]] = Query(None),
+    region: Optional[List[str]] = Query(None),
+    business_group: Optional[List[str]] = Query(None),
+    level: Optional[List[str]] = Query(None),
+    fields: Optional[List[str]] = Query(None),
+    if_none_match: Optional[str] = Header(None)
+):
+    """List indexed documents from the catalog with cursor pagination and filtering.
     
-    for chunk in chunks:
-        metadata = chunk.get("metadata", {})
-        unique_docs.add(metadata.get("document_id", ""))
-        doc_types.add(metadata.get("type", "Unknown"))
-        risk_types.add(metadata.get("risk_type", "Unknown"))
+    Responses carry an ETag; a matching If-None-Match returns 304 with no body.
+    """
+    global rag_processor
     
-    return {
-        "total_chunks": len(chunks),
-        "unique_documents": len(unique_docs),
-        "document_types": sorted(list(doc_types)),
-        "risk_types": sorted(list(risk_types))
+    if not rag_processor:
+        raise HTTPException(status_code=500, detail="RAG processor not initialized")
+    
+    catalog = rag_processor.vector_store.catalog
+    filters = {
+        "type": document_type,
+        "risk_type": risk_type,
+        "region": region,
+        "business_group": business_group,
+        "level": level
     }
+    etag = catalog.etag(cursor, limit, filters, fields)
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    try:
+        documents, next_cursor = catalog.page(cursor, limit, filters, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return JSONResponse(
+        content={
+            "documents": documents,
+            "next_cursor": next_cursor,
+            "total_documents": len(catalog)
+        },
+        headers={"ETag": etag}
+    )
+
+async def _get_collection(name: str) -> BankingRAGProcessor:
+    """Load a named collection (off the event loop), mapping lookup errors to HTTP errors."""
+    if not collection_manager:
+        raise HTTPException(status_code=500, detail="Collection manager not initialized")
+    try:
+        return await run_in_threadpool(collection_manager.get, name)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e).strip("'"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/collections")
+async def list_collections():
+    """List named collections and which of them are loaded."""
+    if not collection_manager:
+        raise HTTPException(status_code=500, detail="Collection manager not initialized")
+    return {"collections": collection_manager.names(), **collection_manager.status()}
+
+@app.post("/collections/{name}/process_documents")
+async def process_collection_documents(name: str, request: DocumentProcessRequest, http_request: Request):
+    """Process and index documents into a named collection, creating it if needed."""
+    if not collection_manager:
+        raise HTTPException(status_code=500, detail="Collection manager not initialized")
+    
+    if SEARCH_ONLY:
+        raise HTTPException(status_code=403, detail="Document ingestion is disabled in search-only mode")
+    
+    try:
+        logger.info(f"Processing {len(request.documents)} documents into collection {name}...")
+        result = await _schedule(
+            http_request, "ingest", "embedding", collection_manager.process_documents, name, request.documents
+        )
+    except HTTPException:
+        raise
+    except CollectionLimitError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error processing documents for collection {name}: {e}")
+        raise HTTPException(status_code=500, detail=f"Error processing documents: {str(e)}")
+    
+    return {"message": "Documents processed successfully", **result}
+
+@app.post("/collections/{name}/search", response_model=SearchResponse)
+async def search_collection(name: str, query: DocumentQuery, http_request: Request,
+                            accept: Optional[str] = Header(None)):
+    """Search a named collection; same request and response formats as /search."""
+    processor = await _get_collection(name)
+    
+    if len(processor.vector_store.chunks) == 0:
+        raise HTTPException(status_code=400, detail=f"Collection {name} has no documents")
+    
+    response_format = negotiate_format(accept)
+    if response_format == "msgpack" and not msgpack_available():
+        raise HTTPException(status_code=406, detail="msgpack responses require the msgpack package")
+    
+    return await _schedule(http_request, "interactive", "search", _run_search, processor, query, response_format)
+
+@app.get("/collections/{name}/stats")
+async def get_collection_stats(name: str):
+    """Statistics for a named collection, without loading it if it is unloaded."""
+    if not collection_manager:
+        raise HTTPException(status_code=500, detail="Collection manager not initialized")
+    try:
+        return {"collection": name, **collection_manager.stats(name)}
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e).strip("'"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,66 @@
+"""
+Opt-in capture of search requests.
+Each /search request is appended as one JSON line (timestamp, query, the non-default filters
+and options, status and latency) to a size-rotated local log. Lines carry a "query" key and
+the request's own field names, so they can be replayed with replay_queries.py or used as
+warm-up queries (RAG_WARMUP_QUERIES_FILE). Writes happen on a background thread.
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import time
+from typing import Dict, Any
+
+# Log entry fields that are not part of the search request
+ENTRY_FIELDS = ("ts", "status", "latency_ms", "endpoint")
+
+class QueryLog:
+    """Rotating JSONL log of search requests."""
+
+    def __init__(self, path: str, max_bytes: int = 50 * 1024 * 1024, backup_count: int = 5):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+
+        # The request path only enqueues; the listener thread does the file I/O and rotation
+        records: queue.Queue = queue.Queue()
+        self._listener = logging.handlers.QueueListener(records, handler)
+        self._logger = logging.getLogger(f"query_log.{path}")
+        self._logger.setLevel(logging.INFO)
+        self._logger.propagate = False
+        self._logger.handlers = [logging.handlers.QueueHandler(records)]
+        self._listener.start()
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.entries = 0
+
+    def record(self, request: Dict[str, Any], status: int, latency_ms: float, endpoint: str = "/search"):
+        """Append one request with its outcome."""
+        entry = {
+            "ts": round(time.time(), 3),
+            "endpoint": endpoint,
+            **request,
+            "status": status,
+            "latency_ms": round(latency_ms, 2)
+        }
+        self._logger.info(json.dumps(entry))
+        self.entries += 1
+
+    def close(self):
+        """Flush pending entries and stop the writer thread."""
+        self._listener.stop()
+
+    def status(self) -> Dict[str, Any]:
+        """Capture settings and counts for /health."""
+        return {
+            "path": self.path,
+            "entries": self.entries,
+            "max_bytes": self.max_bytes,
+            "backup_count": self.backup_count
+        }
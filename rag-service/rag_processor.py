@@ -1,26 +1,169 @@
 import os
 import json
+import time
+import importlib
+import queue
+import threading
 import numpy as np
-import faiss
-from sentence_transformers import SentenceTransformer
-from typing import List, Dict, Any, Optional
-import tiktoken
+from typing import List, Dict, Any, Optional, Iterable, Callable
 from pathlib import Path
-import pickle
 import logging
+from corpus_stats import CorpusStats
+from document_catalog import DocumentCatalog
+from diversification import mmr_select, cap_per_document, merge_adjacent_chunks
+from context_expansion import expand_hits
+from context_packing import pack_context
+from date_segments import SegmentedIndex, parse_date, segment_key, periods_ago
+from document_index import DocumentIndex
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Default location of the persisted store, shared by the service and offline tools
+DEFAULT_VECTOR_STORE_PATH = "./data/banking_vector_store"
+
+# Ingestion streams chunks to the embedder in fixed-size batches; at most
+# INGEST_QUEUE_SIZE chunks wait between the chunking and embedding stages
+INGEST_BATCH_SIZE = 64
+INGEST_QUEUE_SIZE = 256
+_END = object()
+
+class StoreContents:
+    """Point-in-time copy of what a vector store writes to disk (see FAISSVectorStore.copy_contents).
+    
+    The index is held serialized (the bytes faiss.write_index would write). The chunk list is a
+    new list of the store's own chunk dicts, which are never modified once indexed.
+    """
+    
+    def __init__(self, index_bytes: np.ndarray, vectors: int, chunks: List[Dict[str, Any]], stats: CorpusStats,
+                 catalog: DocumentCatalog, document_index: DocumentIndex, metadata: Dict[str, Any],
+                 replication_seq: int, generation: int):
+        self.index_bytes = index_bytes
+        self.vectors = vectors
+        self.chunks = chunks
+        self.stats = stats
+        self.catalog = catalog
+        self.document_index = document_index
+        self.metadata = metadata
+        self.replication_seq = replication_seq
+        self.generation = generation
+    
+    def write_index(self, path: str):
+        with open(path, "wb") as f:
+            self.index_bytes.tofile(f)
+    
+    def save(self, path: str):
+        """Write the copy in the store's on-disk layout (see FAISSVectorStore.load)."""
+        import pickle
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        
+        # Segmented stores are saved as one exact flat index
+        self.write_index(f"{path}.faiss")
+        with open(f"{path}.chunks", "wb") as f:
+            pickle.dump(self.chunks, f)
+        self.stats.save(f"{path}.stats.json")
+        self.catalog.save(f"{path}.catalog.json")
+        self.document_index.save(path)
+        # Record which model produced the vectors
+        with open(f"{path}.meta.json", "w", encoding="utf-8") as f:
+            json.dump(self.metadata, f)
+
+class _DocumentSummary:
+    """Queue item carrying a document's summary text alongside its chunks."""
+    
+    def __init__(self, metadata: Dict[str, Any], text: str):
+        self.metadata = metadata
+        self.text = text
+
+# Optional binary prefilter: "flat" or "hnsw" Hamming index over sign bits, re-scored exactly
+BINARY_PREFILTER_KINDS = ("flat", "hnsw")
+# Deleted HNSW binary codes are only marked; the graph is rebuilt once this share is stale
+BINARY_STALE_FRACTION = 0.2
+DEFAULT_CANDIDATE_POOL = 200
+
+# Chunk metadata fields that can be pushed down into the index scan as ID selectors
+FILTER_FIELDS = ("risk_type", "type")
+
+# Embedding model used unless configured otherwise; recorded in every saved store
+DEFAULT_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+# Output dimensions of common sentence-transformers models, so a store can be sized
+# without loading the model (unknown models are loaded to ask for their dimension)
+EMBEDDING_DIMENSIONS = {
+    "all-MiniLM-L6-v2": 384,
+    "all-MiniLM-L12-v2": 384,
+    "multi-qa-MiniLM-L6-cos-v1": 384,
+    "paraphrase-multilingual-MiniLM-L12-v2": 384,
+    "all-mpnet-base-v2": 768,
+    "multi-qa-mpnet-base-dot-v1": 768,
+}
+
+# Heavy dependencies (sentence_transformers/torch, faiss, tiktoken) are imported
+# on first use so that a search-only process does not pay for ingestion-only
+# modules at startup. Import and load timings are recorded here for /health.
+STARTUP_TIMINGS: Dict[str, float] = {}
+_LAZY_MODULES: Dict[str, Any] = {}
+
+def _lazy_import(module_name: str):
+    """Import a module on first use and record how long the import took."""
+    module = _LAZY_MODULES.get(module_name)
+    if module is None:
+        start = time.perf_counter()
+        module = importlib.import_module(module_name)
+        STARTUP_TIMINGS[f"import_{module_name}"] = round(time.perf_counter() - start, 4)
+        _LAZY_MODULES[module_name] = module
+    return module
+
+def _record_timing(name: str, start: float):
+    """Record the elapsed seconds since start under the given name."""
+    STARTUP_TIMINGS[name] = round(time.perf_counter() - start, 4)
+
 class DocumentEmbedder:
     """Handles document chunking and embedding for RAG."""
     
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
-        """Initialize with sentence transformer model."""
-        self.model = SentenceTransformer(model_name)
-        self.encoding = tiktoken.get_encoding("cl100k_base")
+    def __init__(self, model_name: str = DEFAULT_EMBEDDING_MODEL):
+        """Initialize with sentence transformer model (loaded on first use)."""
+        self.model_name = model_name
+        self._model = None
+        self._encoding = None
         self.chunk_size = 512
         self.chunk_overlap = 50
+        # Optional callable run before each chunk-embedding batch; may block so ingestion yields to queries
+        self.batch_gate: Optional[Callable[[], None]] = None
+        # Searches run on several worker threads; only the first to need the model loads it
+        self._load_lock = threading.Lock()
+
+    @property
+    def model(self):
+        """Sentence transformer model, loaded on first access."""
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    sentence_transformers = _lazy_import("sentence_transformers")
+                    start = time.perf_counter()
+                    self._model = sentence_transformers.SentenceTransformer(self.model_name)
+                    _record_timing("model_load", start)
+                    logger.info(f"Loaded embedding model {self.model_name}")
+        return self._model
+
+    @property
+    def encoding(self):
+        """tiktoken encoding used for chunking, loaded on first access."""
+        if self._encoding is None:
+            tiktoken = _lazy_import("tiktoken")
+            self._encoding = tiktoken.get_encoding("cl100k_base")
+        return self._encoding
+
+    @property
+    def model_loaded(self) -> bool:
+        return self._model is not None
+
+    @property
+    def dimension(self) -> int:
+        """Embedding dimension of the model."""
+        if self.model_name in EMBEDDING_DIMENSIONS:
+            return EMBEDDING_DIMENSIONS[self.model_name]
+        return self.model.get_sentence_embedding_dimension()
         
     def chunk_text(self, text: str, metadata: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Split text into overlapping chunks with metadata."""
@@ -47,134 +190,822 @@ class DocumentEmbedder:
             
         return chunks
     
-    def embed_chunks(self, chunks: List[Dict[str, Any]]) -> np.ndarray:
-        """Generate embeddings for text chunks."""
+    def embed_chunks(self, chunks: List[Dict[str, Any]], gated: bool = True) -> np.ndarray:
+        """Generate embeddings for text chunks (gated=False skips batch_gate, for callers holding a lock)."""
+        if gated and self.batch_gate is not None:
+            self.batch_gate()
         texts = [chunk["text"] for chunk in chunks]
         embeddings = self.model.encode(texts, convert_to_numpy=True)
         return embeddings
 
+def _binary_codes(embeddings: np.ndarray) -> np.ndarray:
+    """Sign-quantize embeddings to packed bits (384 dimensions -> 48 bytes)."""
+    return np.packbits(embeddings > 0, axis=1)
+
+def _chunk_key(chunk: Dict[str, Any]) -> tuple:
+    # Document IDs are keyed as strings, like the catalog, so stores saved with int IDs still resolve
+    return (str(chunk.get("metadata", {}).get("document_id", "")), chunk.get("chunk_index", 0))
+
+def _build_adjacency(chunks: List[Dict[str, Any]]) -> Dict[tuple, int]:
+    return {_chunk_key(chunk): position for position, chunk in enumerate(chunks)}
+
+def _chunk_dates(chunks: List[Dict[str, Any]]) -> np.ndarray:
+    return np.array([parse_date(chunk.get("metadata", {}).get("date")) for chunk in chunks], dtype="int64")
+
+def _chunk_filter_values(chunks: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    return {
+        field: np.array([str(chunk.get("metadata", {}).get(field, "")).lower() for chunk in chunks], dtype=object)
+        for field in FILTER_FIELDS
+    }
+
+def _date_bounds(date_from: Optional[str], date_to: Optional[str]) -> tuple:
+    """Inclusive YYYYMMDD bounds of an optional date range."""
+    return (parse_date(date_from) if date_from else 0, parse_date(date_to, end=True) if date_to else 99991231)
+
+def _metadata_mask(dates: np.ndarray, filter_values: Dict[str, np.ndarray], date_from: Optional[str],
+                   date_to: Optional[str], filters: Optional[Dict[str, Optional[str]]]) -> Optional[np.ndarray]:
+    """Rows matching the date range and (case-insensitive) metadata filters, or None if unrestricted."""
+    mask = None
+    if date_from or date_to:
+        start, end = _date_bounds(date_from, date_to)
+        mask = (dates >= max(start, 0)) & (dates <= end)
+    for field, value in (filters or {}).items():
+        if not value:
+            continue
+        if field not in FILTER_FIELDS:
+            raise ValueError(f"Cannot filter on {field!r}; expected one of {FILTER_FIELDS}")
+        match = filter_values[field] == value.lower()
+        mask = match if mask is None else mask & match
+    return mask
+
 class FAISSVectorStore:
     """FAISS-based vector store for document retrieval."""
     
-    def __init__(self, dimension: int = 384):  # all-MiniLM-L6-v2 dimension
+    def __init__(self, dimension: int = 384, model_name: str = DEFAULT_EMBEDDING_MODEL):  # all-MiniLM-L6-v2 dimension
         self.dimension = dimension
-        self.index = faiss.IndexFlatIP(dimension)  # Inner product (cosine similarity)
+        # Model that produced the vectors; saved with the store and checked on load
+        self.model_name = model_name
+        self.index = _lazy_import("faiss").IndexFlatIP(dimension)  # Inner product (cosine similarity)
         self.chunks = []
+        # Corpus statistics maintained on add/delete so /stats never scans chunks
+        self.stats = CorpusStats()
+        # Per-document catalog built from chunk metadata at ingest time
+        self.catalog = DocumentCatalog()
+        # (document_id, chunk_index) -> position in chunks/index, for O(1) neighbour lookups
+        self.adjacency: Dict[tuple, int] = {}
+        # Bumped on every add/delete so caches and watchers can tell index versions apart
+        self.generation = 0
+        # Guards index/chunk alignment when documents are added or deleted in the background
+        self._lock = threading.RLock()
+        # Serialises save() calls, which write outside _lock, so an older copy never overwrites a newer one
+        self._save_lock = threading.Lock()
+        # Two-stage search: Hamming candidates from sign-bit codes, re-scored by inner product
+        self.binary_prefilter: Optional[str] = None
+        self.candidate_pool = DEFAULT_CANDIDATE_POOL
+        self.binary_index = None
+        # HNSW binary codes cannot be removed: current position of each code (-1 once deleted).
+        # None for the flat prefilter, whose codes are removed in place and stay aligned with the index
+        self.binary_positions: Optional[np.ndarray] = None
+        # Publication date (YYYYMMDD, -1 if unknown) per position, for date-bounded search
+        self.dates = np.zeros(0, dtype="int64")
+        # Lower-cased filterable metadata per position (see FILTER_FIELDS)
+        self.filter_values = _chunk_filter_values([])
+        # One summary vector per document for hierarchical search (built on demand for older stores)
+        self.document_index: Optional[DocumentIndex] = None
+        # Date segments settings (granularity, retention); None keeps a single flat index
+        self.segment_settings: Optional[Dict[str, Any]] = None
+        # Replication: position in the leader's change log this store's contents correspond to,
+        # and the callback (op, payload) -> seq that logs each committed change (leader only)
+        self.replication_seq = 0
+        self.change_listener: Optional[Callable[[str, Dict[str, Any]], int]] = None
         
     def add_documents(self, chunks: List[Dict[str, Any]], embeddings: np.ndarray):
         """Add document chunks and embeddings to the vector store."""
+        faiss = _lazy_import("faiss")
+
         # Normalize embeddings for cosine similarity
         faiss.normalize_L2(embeddings)
         
-        # Add to FAISS index
-        self.index.add(embeddings.astype('float32'))
-        
-        # Store chunk metadata
-        self.chunks.extend(chunks)
+        with self._lock:
+            self._check_dimension(embeddings)
+            # Add to FAISS index
+            dates = _chunk_dates(chunks)
+            if isinstance(self.index, SegmentedIndex):
+                self.index.add(embeddings.astype('float32'), [segment_key(d, self.index.granularity) for d in dates])
+                self._apply_retention()
+            else:
+                self.index.add(embeddings.astype('float32'))
+            self.dates = np.concatenate([self.dates, dates])
+            for field, values in _chunk_filter_values(chunks).items():
+                self.filter_values[field] = np.concatenate([self.filter_values[field], values])
+            if self.binary_index is not None:
+                self.binary_index.add(_binary_codes(embeddings))
+                if self.binary_positions is not None:
+                    start = len(self.chunks)
+                    self.binary_positions = np.concatenate([
+                        self.binary_positions, np.arange(start, start + len(chunks), dtype="int64")
+                    ])
+            
+            # Store chunk metadata
+            start = len(self.chunks)
+            self.chunks.extend(chunks)
+            for position, chunk in enumerate(chunks, start):
+                self.adjacency[_chunk_key(chunk)] = position
+            self.stats.add_chunks(chunks)
+            self.catalog.add_chunks(chunks)
+            self.generation += 1
+            self._notify_change("add", chunks=chunks, embeddings=embeddings)
         
         logger.info(f"Added {len(chunks)} chunks to vector store. Total: {len(self.chunks)}")
     
-    def search(self, query_embedding: np.ndarray, top_k: int = 5) -> List[Dict[str, Any]]:
-        """Search for most similar document chunks."""
+    def delete_documents(self, document_ids: List[str]) -> int:
+        """Remove every chunk belonging to the given documents. Returns the number removed."""
+        doc_ids = {str(doc_id) for doc_id in document_ids}
+        with self._lock:
+            positions = [i for i, chunk in enumerate(self.chunks)
+                         if chunk.get("metadata", {}).get("document_id") in doc_ids]
+            if not positions:
+                return 0
+            
+            # Flat indexes compact on removal, keeping the remaining vectors in order
+            self.index.remove_ids(np.array(positions, dtype="int64"))
+            self.dates = np.delete(self.dates, positions)
+            self.filter_values = {field: np.delete(values, positions) for field, values in self.filter_values.items()}
+            if self.document_index is not None:
+                self.document_index.remove(list(doc_ids))
+            if isinstance(self.index, SegmentedIndex):
+                self._apply_retention()
+            removed = set(positions)
+            removed_chunks = [self.chunks[i] for i in positions]
+            self.stats.remove_chunks(removed_chunks)
+            self.catalog.remove_chunks(removed_chunks)
+            self.chunks = [chunk for i, chunk in enumerate(self.chunks) if i not in removed]
+            # Positions shift after compaction
+            self.adjacency = _build_adjacency(self.chunks)
+            self._remove_binary_codes(positions)
+            self.generation += 1
+            self._notify_change("delete", document_ids=sorted(doc_ids))
+        
+        logger.info(f"Removed {len(positions)} chunks for {len(doc_ids)} documents. Total: {len(self.chunks)}")
+        return len(positions)
+    
+    def search(self, query_embedding: np.ndarray, top_k: int = 5, date_from: Optional[str] = None,
+               date_to: Optional[str] = None, min_score: Optional[float] = None,
+               filters: Optional[Dict[str, Optional[str]]] = None,
+               top_documents: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Search for most similar document chunks, optionally published within [date_from, date_to].
+        
+        With min_score (cosine), returns every chunk scoring at least that much, at most top_k of them.
+        filters maps FILTER_FIELDS to required (case-insensitive) values, applied inside the index scan.
+        With top_documents, only chunks of the top_documents best-matching documents (by summary) are scored.
+        """
+        faiss = _lazy_import("faiss")
+
         # Normalize query embedding
         query_embedding = query_embedding.reshape(1, -1)
         faiss.normalize_L2(query_embedding)
         
-        # Search FAISS index
-        scores, indices = self.index.search(query_embedding.astype('float32'), top_k)
-        
-        # Return results with metadata
-        results = []
-        for score, idx in zip(scores[0], indices[0]):
-            if idx >= 0:  # Valid index
-                chunk = self.chunks[idx].copy()
-                chunk["similarity_score"] = float(score)
-                results.append(chunk)
+        with self._lock:
+            self._check_dimension(query_embedding)
+            # Search FAISS index
+            scores, indices = self._search_index(
+                query_embedding.astype('float32'), top_k, date_from, date_to, min_score, filters, top_documents
+            )
+            
+            # Return results with metadata
+            results = []
+            for score, idx in zip(scores[0], indices[0]):
+                if idx >= 0:  # Valid index
+                    chunk = self.chunks[idx].copy()
+                    chunk["similarity_score"] = float(score)
+                    results.append(chunk)
                 
         return results
     
-    def save(self, path: str):
-        """Save the vector store to disk."""
-        os.makedirs(os.path.dirname(path), exist_ok=True)
+    def search_with_embeddings(self, query_embedding: np.ndarray, top_k: int = 5, date_from: Optional[str] = None,
+                               date_to: Optional[str] = None, min_score: Optional[float] = None,
+                               filters: Optional[Dict[str, Optional[str]]] = None,
+                               top_documents: Optional[int] = None):
+        """Search like search(), also returning the normalized embeddings of the hits."""
+        faiss = _lazy_import("faiss")
         
-        # Save FAISS index
-        faiss.write_index(self.index, f"{path}.faiss")
+        query_embedding = query_embedding.reshape(1, -1)
+        faiss.normalize_L2(query_embedding)
         
-        # Save chunks metadata
-        with open(f"{path}.chunks", "wb") as f:
-            pickle.dump(self.chunks, f)
+        with self._lock:
+            self._check_dimension(query_embedding)
+            scores, indices = self._search_index(
+                query_embedding.astype('float32'), top_k, date_from, date_to, min_score, filters, top_documents
+            )
+            valid = [(float(score), int(idx)) for score, idx in zip(scores[0], indices[0]) if idx >= 0]
             
+            results = []
+            for score, idx in valid:
+                chunk = self.chunks[idx].copy()
+                chunk["similarity_score"] = score
+                results.append(chunk)
+            
+            # Stored vectors are already normalized, so reconstruction gives cosine-ready rows
+            ids = np.array([idx for _, idx in valid], dtype="int64")
+            embeddings = self.index.reconstruct_batch(ids) if len(ids) else np.zeros((0, self.dimension), dtype="float32")
+        
+        return results, embeddings
+    
+    def _check_dimension(self, vectors: np.ndarray):
+        # Vectors from another model (e.g. embedded just before a migration cutover) cannot be mixed in
+        if vectors.shape[-1] != self.dimension:
+            raise RuntimeError(
+                f"Embedding dimension {vectors.shape[-1]} does not match the {self.dimension}-d index "
+                f"built with {self.model_name}"
+            )
+    
+    def replace_with(self, other: "FAISSVectorStore"):
+        """Swap in another store's contents (index, chunks, model) in place."""
+        with self._lock, other._lock:
+            self.dimension = other.dimension
+            self.model_name = other.model_name
+            self.index = other.index
+            self.chunks = other.chunks
+            self.dates = other.dates
+            self.filter_values = other.filter_values
+            self.document_index = other.document_index
+            self.stats = other.stats
+            self.catalog = other.catalog
+            self.adjacency = other.adjacency
+            self.replication_seq = other.replication_seq
+            self._apply_segments()
+            self._rebuild_binary_index()
+            self.generation += 1
+            # Followers cannot replay a wholesale swap; they re-sync from a snapshot
+            self._notify_change("reset")
+    
+    def _notify_change(self, op: str, **payload):
+        """Hand a committed change to the replication log (called under the lock, so in order)."""
+        if self.change_listener is not None:
+            self.replication_seq = self.change_listener(op, payload)
+    
+    def metadata(self) -> Dict[str, Any]:
+        """Model metadata persisted next to the index."""
+        return {"model_name": self.model_name, "dimension": self.dimension}
+    
+    def _search_index(self, query_embedding: np.ndarray, top_k: int, date_from: Optional[str] = None,
+                      date_to: Optional[str] = None, min_score: Optional[float] = None,
+                      filters: Optional[Dict[str, Optional[str]]] = None, top_documents: Optional[int] = None):
+        """Exact flat search, or binary prefilter + exact re-scoring when enabled.
+        
+        A date range or metadata filters restrict the search to matching chunks: only the overlapping
+        segments are scanned when the store is segmented, otherwise an ID selector filters the flat scan.
+        With min_score, every chunk scoring at least min_score is returned (at most top_k) by range search.
+        With top_documents, only the chunks of the best-matching documents are scored (hierarchical search).
+        """
+        mask = _metadata_mask(self.dates, self.filter_values, date_from, date_to, filters)
+        if top_documents:
+            return self._hierarchical_search_index(
+                query_embedding, top_k, top_documents, date_from, date_to, min_score, filters, mask
+            )
+        
+        if mask is None and self.binary_index is not None and self.index.ntotal > self.candidate_pool:
+            scores, ids = self._prefilter_search(query_embedding, top_k)
+            if min_score is not None:
+                keep = scores[0] >= min_score
+                scores, ids = scores[:, keep], ids[:, keep]
+            return scores, ids
+        
+        if isinstance(self.index, SegmentedIndex):
+            keys = self.index.keys_overlapping(*_date_bounds(date_from, date_to)) if date_from or date_to else None
+            return self.index.search(query_embedding, top_k, keys=keys, mask=mask, min_score=min_score)
+        
+        params = None
+        if mask is not None:
+            ids = np.nonzero(mask)[0].astype("int64")
+            if not len(ids):
+                return np.zeros((1, 0), dtype="float32"), np.zeros((1, 0), dtype="int64")
+            faiss = _lazy_import("faiss")
+            params = faiss.SearchParameters()
+            params.sel = faiss.IDSelectorBatch(ids)
+        if min_score is None:
+            return self.index.search(query_embedding, top_k, params=params)
+        
+        _, scores, ids = self.index.range_search(query_embedding, min_score, params=params)
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        return scores[order][None, :], ids[order][None, :]
+    
+    def _hierarchical_search_index(self, query_embedding: np.ndarray, top_k: int, top_documents: int,
+                                   date_from: Optional[str], date_to: Optional[str], min_score: Optional[float],
+                                   filters: Optional[Dict[str, Optional[str]]], mask: Optional[np.ndarray]):
+        """Pick the top documents by summary vector, then score only their chunks exactly."""
+        self._ensure_document_index()
+        documents = self.document_index
+        if not len(documents):
+            return np.zeros((1, 0), dtype="float32"), np.zeros((1, 0), dtype="int64")
+        document_mask = _metadata_mask(documents.dates, documents.filter_values, date_from, date_to, filters)
+        top = documents.search(query_embedding, top_documents, document_mask)
+        
+        positions = np.array([position for doc_id, _ in top for position in self._document_positions(doc_id)],
+                             dtype="int64")
+        if mask is not None and len(positions):
+            positions = positions[mask[positions]]
+        if not len(positions):
+            return np.zeros((1, 0), dtype="float32"), np.zeros((1, 0), dtype="int64")
+        
+        scores = self.index.reconstruct_batch(positions) @ query_embedding[0]
+        if min_score is not None:
+            keep = scores >= min_score
+            scores, positions = scores[keep], positions[keep]
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        return scores[order][None, :], positions[order][None, :]
+    
+    def _document_positions(self, document_id: str) -> List[int]:
+        """Positions of a document's chunks, via the catalog chunk count and the adjacency map."""
+        entry = self.catalog.entries.get(document_id)
+        if entry is None:
+            return []
+        positions = (self.adjacency.get((document_id, index)) for index in range(entry["chunkCount"]))
+        return [position for position in positions if position is not None]
+    
+    def add_document_summaries(self, metadatas: List[Dict[str, Any]], embeddings: np.ndarray):
+        """Index one summary embedding per document (metadata as on the document's chunks)."""
+        faiss = _lazy_import("faiss")
+        faiss.normalize_L2(embeddings)
+        records = [{"metadata": metadata} for metadata in metadatas]
+        with self._lock:
+            self._check_dimension(embeddings)
+            if self.document_index is None:
+                self.document_index = DocumentIndex(self.dimension)
+            self.document_index.upsert(
+                [metadata.get("document_id", "") for metadata in metadatas], embeddings,
+                _chunk_dates(records), _chunk_filter_values(records)
+            )
+            self._notify_change("summaries", metadatas=metadatas, embeddings=embeddings)
+    
+    def _ensure_document_index(self):
+        """Give documents without a summary vector their first chunk's vector.
+        
+        Covers stores saved before the document index existed and chunks indexed without summaries
+        (collections, embedding migrations); the first chunk starts with the title and summary.
+        """
+        with self._lock:
+            if self.document_index is None:
+                self.document_index = DocumentIndex(self.dimension)
+            if len(self.document_index) >= len(self.catalog):
+                return
+            missing = [doc_id for doc_id in self.catalog.entries if doc_id not in self.document_index]
+            positions = [self.adjacency.get((doc_id, 0)) for doc_id in missing]
+            pairs = [(doc_id, position) for doc_id, position in zip(missing, positions) if position is not None]
+            if not pairs:
+                return
+            ids = np.array([position for _, position in pairs], dtype="int64")
+            records = [self.chunks[position] for position in ids]
+            self.document_index.upsert(
+                [doc_id for doc_id, _ in pairs], self.index.reconstruct_batch(ids),
+                _chunk_dates(records), _chunk_filter_values(records)
+            )
+    
+    def document_index_memory_bytes(self) -> int:
+        """Memory held by the document summary vectors, 0 when there are none."""
+        return self.document_index.memory_bytes() if self.document_index is not None else 0
+    
+    def _prefilter_search(self, query_embedding: np.ndarray, top_k: int):
+        _, candidates = self.binary_index.search(_binary_codes(query_embedding), self.candidate_pool)
+        candidates = candidates[0][candidates[0] >= 0]
+        if self.binary_positions is not None:
+            candidates = self.binary_positions[candidates]
+            candidates = candidates[candidates >= 0]
+        scores = self.index.reconstruct_batch(candidates) @ query_embedding[0]
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        return scores[order][None, :], candidates[order][None, :]
+    
+    def enable_binary_prefilter(self, kind: str = "flat", candidate_pool: int = DEFAULT_CANDIDATE_POOL):
+        """Search in two stages: Hamming top-candidate_pool over sign bits, then exact inner product.
+        
+        kind is "flat" (exhaustive Hamming scan) or "hnsw" (graph search over the codes).
+        The binary codes are derived from the float index and rebuilt on load.
+        """
+        if kind not in BINARY_PREFILTER_KINDS:
+            raise ValueError(f"Unknown binary prefilter {kind!r}; expected one of {BINARY_PREFILTER_KINDS}")
+        with self._lock:
+            self.binary_prefilter = kind
+            self.candidate_pool = candidate_pool
+            self._rebuild_binary_index()
+    
+    def _remove_binary_codes(self, positions: List[int]):
+        """Drop the binary codes of removed positions without re-encoding the rest.
+        
+        Flat codes are removed in place (compacting like the float index). HNSW codes are only
+        marked deleted, and the graph is rebuilt once BINARY_STALE_FRACTION of it is stale.
+        """
+        if self.binary_index is None:
+            return
+        if self.binary_positions is None:
+            self.binary_index.remove_ids(np.array(positions, dtype="int64"))
+            return
+        removed = np.zeros(len(self.chunks) + len(positions), dtype=bool)
+        removed[positions] = True
+        # Surviving positions move down by the number of removed positions before them
+        shift = np.cumsum(removed)
+        live = self.binary_positions >= 0
+        old = self.binary_positions[live]
+        self.binary_positions[live] = np.where(removed[old], -1, old - shift[old])
+        stale = int(np.count_nonzero(self.binary_positions < 0))
+        if stale > BINARY_STALE_FRACTION * len(self.binary_positions):
+            self._rebuild_binary_index()
+    
+    def _rebuild_binary_index(self):
+        self.binary_positions = None
+        if not self.binary_prefilter:
+            self.binary_index = None
+            return
+        faiss = _lazy_import("faiss")
+        bits = -(-self.dimension // 8) * 8
+        if self.binary_prefilter == "hnsw":
+            index = faiss.IndexBinaryHNSW(bits, 32)
+            index.hnsw.efSearch = max(self.candidate_pool, 64)
+        else:
+            index = faiss.IndexBinaryFlat(bits)
+        if self.index.ntotal:
+            index.add(_binary_codes(self.index.reconstruct_n(0, self.index.ntotal)))
+        self.binary_index = index
+        if self.binary_prefilter == "hnsw":
+            self.binary_positions = np.arange(self.index.ntotal, dtype="int64")
+    
+    def enable_date_segments(self, granularity: str = "quarter", compress_after: Optional[int] = None,
+                             unload_after: Optional[int] = None, offload_dir: Optional[str] = None):
+        """Partition the index into per-quarter (or per-year) segments by chunk publication date.
+        
+        Segments that ended more than compress_after periods ago are held as 8-bit scalar-quantized
+        indexes, and those older than unload_after periods are unloaded to offload_dir and read back
+        only when a query reaches them. Both need offload_dir, where exact vectors are kept for save().
+        Undated chunks get their own segment, which is never compressed or unloaded.
+        """
+        with self._lock:
+            self.segment_settings = {
+                "granularity": granularity,
+                "compress_after": compress_after,
+                "unload_after": unload_after,
+                "offload_dir": offload_dir
+            }
+            self._apply_segments()
+            self._rebuild_binary_index()
+    
+    def _apply_segments(self):
+        """Re-partition the current index according to segment_settings."""
+        if not self.segment_settings:
+            return
+        index = self.index.to_flat() if isinstance(self.index, SegmentedIndex) else self.index
+        segmented = SegmentedIndex(self.dimension, self.segment_settings["granularity"], self.segment_settings["offload_dir"])
+        if index.ntotal:
+            keys = [segment_key(d, segmented.granularity) for d in self.dates]
+            segmented.add(index.reconstruct_n(0, index.ntotal), keys)
+        self.index = segmented
+        self._apply_retention()
+    
+    def _apply_retention(self):
+        settings = self.segment_settings
+        granularity = settings["granularity"]
+        compress_before = periods_ago(settings["compress_after"], granularity) if settings["compress_after"] is not None else None
+        unload_before = periods_ago(settings["unload_after"], granularity) if settings["unload_after"] is not None else None
+        self.index.apply_retention(compress_before, unload_before)
+    
+    def segment_status(self) -> Optional[List[Dict[str, Any]]]:
+        """Per-segment vector counts, states and memory, or None when the store is not segmented."""
+        with self._lock:
+            return self.index.status() if isinstance(self.index, SegmentedIndex) else None
+    
+    def binary_index_memory_bytes(self) -> int:
+        """Memory held by the binary codes (one bit per dimension; HNSW links not included), 0 when disabled."""
+        if self.binary_index is None:
+            return 0
+        return int(self.binary_index.ntotal) * (self.binary_index.d // 8)
+    
+    def get_chunk(self, document_id: str, chunk_index: int) -> Optional[Dict[str, Any]]:
+        """Look up a chunk by document and chunk index, or None if it does not exist."""
+        position = self.adjacency.get((str(document_id), chunk_index))
+        return self.chunks[position] if position is not None else None
+    
+    def prefault(self):
+        """Touch every index page (one full flat scan) so the first real searches do not fault them in."""
+        with self._lock:
+            if isinstance(self.index, SegmentedIndex):
+                self.index.prefault()
+            elif self.index.ntotal:
+                self.index.search(np.zeros((1, self.dimension), dtype="float32"), 1)
+    
+    def index_memory_bytes(self) -> int:
+        """Approximate memory held by the FAISS index (flat float32 vectors)."""
+        if isinstance(self.index, SegmentedIndex):
+            return self.index.memory_bytes()
+        return int(self.index.ntotal) * self.dimension * 4
+    
+    def exact_index(self):
+        """The vectors as a single exact flat index, as written to disk."""
+        return self.index.to_flat() if isinstance(self.index, SegmentedIndex) else self.index
+    
+    def set_contents(self, index, chunks: List[Dict[str, Any]], stats: CorpusStats, catalog: DocumentCatalog,
+                     document_index: Optional[DocumentIndex] = None):
+        """Swap in a loaded index and its chunks, rebuilding the derived lookups."""
+        with self._lock:
+            self.index = index
+            self.chunks = chunks
+            self.document_index = document_index
+            self.dates = _chunk_dates(chunks)
+            self.filter_values = _chunk_filter_values(chunks)
+            self.stats = stats
+            self.catalog = catalog
+            self.adjacency = _build_adjacency(chunks)
+            self._apply_segments()
+            self._rebuild_binary_index()
+            self.generation += 1
+    
+    def copy_contents(self) -> StoreContents:
+        """Copy what save() and snapshots write, holding the lock only while copying.
+        
+        The copy is cheap next to writing it: the serialized index, a shallow copy of the chunk
+        list and per-document copies of the statistics, catalog and summary index.
+        """
+        faiss = _lazy_import("faiss")
+        with self._lock:
+            # Filled in from first chunks where missing
+            self._ensure_document_index()
+            index = self.exact_index()
+            return StoreContents(
+                faiss.serialize_index(index), int(index.ntotal), list(self.chunks), self.stats.copy(),
+                self.catalog.copy(), self.document_index.copy(), self.metadata(),
+                self.replication_seq, self.generation
+            )
+    
+    def save(self, path: str) -> StoreContents:
+        """Save the vector store to disk. Returns the copy that was written.
+        
+        The store lock is only held while copying (see copy_contents), so searches and
+        ingests carry on while the files are written.
+        """
+        with self._save_lock:
+            contents = self.copy_contents()
+            contents.save(path)
         logger.info(f"Saved vector store to {path}")
+        return contents
     
     def load(self, path: str):
         """Load the vector store from disk."""
+        import pickle
+        faiss = _lazy_import("faiss")
+        start = time.perf_counter()
+
+        # Refuse stores built with another embedding model before reading the index
+        metadata = read_store_metadata(path)
+        if metadata is not None and metadata != self.metadata():
+            raise ValueError(
+                f"Vector store {path} was built with {metadata['model_name']} ({metadata['dimension']}-d) "
+                f"but this processor uses {self.model_name} ({self.dimension}-d); "
+                f"load it with that model or migrate it with embedding_migration.py"
+            )
+        
         # Load FAISS index
-        self.index = faiss.read_index(f"{path}.faiss")
+        index = faiss.read_index(f"{path}.faiss")
+        if index.d != self.dimension:
+            raise ValueError(f"Vector store {path} holds {index.d}-d vectors but {self.model_name} produces {self.dimension}-d")
+        if metadata is None:
+            logger.warning(f"Vector store {path} has no model metadata; assuming {self.model_name}")
         
         # Load chunks metadata
         with open(f"{path}.chunks", "rb") as f:
-            self.chunks = pickle.load(f)
+            chunks = pickle.load(f)
+        
+        # Load corpus statistics, rebuilding them for stores saved without (or with stale) stats
+        stats = CorpusStats.load(f"{path}.stats.json") if os.path.exists(f"{path}.stats.json") else None
+        if stats is None or stats.total_chunks != len(chunks):
+            stats = CorpusStats.from_chunks(chunks)
+        catalog = DocumentCatalog.load(f"{path}.catalog.json") if os.path.exists(f"{path}.catalog.json") else None
+        if catalog is None or sum(entry["chunkCount"] for entry in catalog.entries.values()) != len(chunks):
+            catalog = DocumentCatalog.from_chunks(chunks)
+        
+        self.set_contents(index, chunks, stats, catalog, DocumentIndex.load(path, self.dimension))
             
+        _record_timing("vector_store_load", start)
         logger.info(f"Loaded vector store from {path} with {len(self.chunks)} chunks")
 
+def read_store_metadata(path: str) -> Optional[Dict[str, Any]]:
+    """Model metadata saved with a store, or None for stores saved without it."""
+    if not os.path.exists(f"{path}.meta.json"):
+        return None
+    with open(f"{path}.meta.json", encoding="utf-8") as f:
+        return json.load(f)
+
 class RAGDocumentProcessor:
     """Main class for processing documents and creating RAG-ready vector store."""
     
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
-        self.embedder = DocumentEmbedder(model_name)
-        self.vector_store = FAISSVectorStore()
+    def __init__(self, model_name: str = DEFAULT_EMBEDDING_MODEL, search_only: bool = False,
+                 embedder: Optional[DocumentEmbedder] = None):
+        # An existing embedder can be passed in so several processors share one loaded model
+        self.embedder = embedder or DocumentEmbedder(model_name)
+        self.vector_store = FAISSVectorStore(self.embedder.dimension, self.embedder.model_name)
+        # Search-only processors serve a pre-built store and never chunk or embed documents
+        self.search_only = search_only
+        # Optional SemanticQueryCache consulted by search_banking_context
+        self.query_cache = None
         
-    def process_documents(self, documents: List[Dict[str, Any]]):
-        """Process a list of documents into the vector store."""
-        all_chunks = []
+    def chunk_document(self, doc: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Build the chunk list (text plus metadata) for a single document."""
+        # Extract document content
+        title = doc.get("title", "")
+        content = doc.get("content", "")
+        summary = doc.get("summary", "")
         
-        for doc in documents:
-            # Extract document content
-            title = doc.get("title", "")
-            content = doc.get("content", "")
-            summary = doc.get("summary", "")
-            
-            # Combine title, summary, and content for better context
-            full_text = f"Title: {title}\n\nSummary: {summary}\n\nContent: {content}"
-            
-            # Create metadata
-            metadata = {
-                "document_id": doc.get("id", ""),
-                "title": title,
-                "date": doc.get("date", ""),
-                "type": doc.get("type", ""),
-                "level": doc.get("level", ""),
-                "business_group": doc.get("business_group", ""),
-                "region": doc.get("region", ""),
-                "risk_type": doc.get("risk_type", ""),
-                "source_link": doc.get("source_link", "")
-            }
-            
-            # Chunk the document
-            chunks = self.embedder.chunk_text(full_text, metadata)
-            all_chunks.extend(chunks)
+        # Combine title, summary, and content for better context
+        full_text = f"Title: {title}\n\nSummary: {summary}\n\nContent: {content}"
+        
+        # Chunk the document
+        return self.embedder.chunk_text(full_text, self.document_metadata(doc))
+        
+    def document_summary(self, doc: Dict[str, Any]) -> str:
+        """Text embedded for the document-level index (title and summary)."""
+        return f"Title: {doc.get('title', '')}\n\nSummary: {doc.get('summary', '')}"
+        
+    def document_metadata(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        """Metadata attached to every chunk of a document."""
+        return {
+            "document_id": str(doc.get("id", "")),
+            "title": doc.get("title", ""),
+            "date": doc.get("date", ""),
+            "type": doc.get("type", ""),
+            "level": doc.get("level", ""),
+            "business_group": doc.get("business_group", ""),
+            "region": doc.get("region", ""),
+            "risk_type": doc.get("risk_type", ""),
+            "source_link": doc.get("source_link", "")
+        }
+        
+    def process_documents(self, documents: Iterable[Dict[str, Any]], batch_size: int = INGEST_BATCH_SIZE,
+                          queue_size: int = INGEST_QUEUE_SIZE) -> int:
+        """Stream documents into the vector store: chunk -> embed in batches -> index.
+        
+        Chunking runs on a producer thread feeding a bounded queue, so it blocks while
+        embedding is behind and only one batch of chunks and embeddings is in flight.
+        Batches are indexed as they complete, so a failure part-way leaves the batches
+        before it indexed (the ingest is not all-or-nothing). Returns the number of chunks added.
+        """
+        if self.search_only:
+            raise RuntimeError("Document ingestion is disabled in search-only mode")
+        
+        chunk_queue = queue.Queue(maxsize=queue_size)
+        stop = threading.Event()
+        errors: List[BaseException] = []
+        counts = {"documents": 0, "chunks": 0}
+        
+        def produce():
+            try:
+                for doc in documents:
+                    chunks = self.chunk_document(doc)
+                    for chunk in chunks:
+                        if stop.is_set():
+                            return
+                        chunk_queue.put(chunk)
+                    if chunks:
+                        # Summary for the document-level index, embedded with the next batch
+                        chunk_queue.put(_DocumentSummary(chunks[0]["metadata"], self.document_summary(doc)))
+                    counts["documents"] += 1
+            except BaseException as e:
+                errors.append(e)
+            finally:
+                chunk_queue.put(_END)
+        
+        producer = threading.Thread(target=produce, name="chunk-producer", daemon=True)
+        producer.start()
+        try:
+            batch: List[Dict[str, Any]] = []
+            summaries: List[_DocumentSummary] = []
+            while True:
+                item = chunk_queue.get()
+                if item is _END:
+                    break
+                if isinstance(item, _DocumentSummary):
+                    summaries.append(item)
+                    continue
+                batch.append(item)
+                if len(batch) >= batch_size:
+                    self.index_chunks(batch)
+                    counts["chunks"] += len(batch)
+                    batch = []
+                    self.index_document_summaries([item.metadata for item in summaries], [item.text for item in summaries])
+                    summaries = []
+            if errors:
+                raise errors[0]
+            if batch:
+                self.index_chunks(batch)
+                counts["chunks"] += len(batch)
+            self.index_document_summaries([item.metadata for item in summaries], [item.text for item in summaries])
+        finally:
+            # Unblock the producer if indexing failed part-way
+            stop.set()
+            while producer.is_alive():
+                try:
+                    chunk_queue.get(timeout=0.1)
+                except queue.Empty:
+                    pass
             
-        logger.info(f"Created {len(all_chunks)} chunks from {len(documents)} documents")
+        logger.info(f"Created {counts['chunks']} chunks from {counts['documents']} documents")
+        return counts["chunks"]
+        
+    def replace_documents(self, documents: Iterable[Dict[str, Any]], batch_size: int = INGEST_BATCH_SIZE) -> int:
+        """Replace documents (by ID) in one step. Returns the number of chunks added.
+        
+        Everything is chunked and embedded outside the store lock first; the old chunks are then
+        deleted and the new ones added under a single lock hold, so searches never see the
+        documents missing or duplicated. Unlike process_documents the whole request is held in memory.
+        """
+        if self.search_only:
+            raise RuntimeError("Document ingestion is disabled in search-only mode")
+        
+        documents = list(documents)
+        chunks: List[Dict[str, Any]] = []
+        summary_metadatas: List[Dict[str, Any]] = []
+        summary_texts: List[str] = []
+        for doc in documents:
+            doc_chunks = self.chunk_document(doc)
+            chunks.extend(doc_chunks)
+            if doc_chunks:
+                summary_metadatas.append(doc_chunks[0]["metadata"])
+                summary_texts.append(self.document_summary(doc))
+        
+        def embed(embedder: DocumentEmbedder):
+            batches = [embedder.embed_chunks(chunks[start:start + batch_size])
+                       for start in range(0, len(chunks), batch_size)]
+            summaries = embedder.model.encode(summary_texts, convert_to_numpy=True) if summary_texts else None
+            return (np.vstack(batches) if batches else None), summaries
+        
+        def add(embeddings):
+            chunk_embeddings, summary_embeddings = embeddings
+            # Runs under the store lock (reentrant), so the delete and the adds are applied together
+            self.vector_store.delete_documents([doc.get("id", "") for doc in documents])
+            if chunk_embeddings is not None:
+                self.vector_store.add_documents(chunks, chunk_embeddings)
+            if summary_embeddings is not None:
+                self.vector_store.add_document_summaries(summary_metadatas, summary_embeddings)
+        
+        self._embed_and_add(embed, add)
+        logger.info(f"Replaced {len(documents)} documents with {len(chunks)} chunks")
+        return len(chunks)
+        
+    def index_chunks(self, chunks: List[Dict[str, Any]]):
+        """Embed chunks and add them to the vector store."""
+        if self.search_only:
+            raise RuntimeError("Document ingestion is disabled in search-only mode")
         
-        # Generate embeddings
-        embeddings = self.embedder.embed_chunks(all_chunks)
+        self._embed_and_add(
+            lambda embedder: embedder.embed_chunks(chunks),
+            lambda embeddings: self.vector_store.add_documents(chunks, embeddings)
+        )
         
-        # Add to vector store
-        self.vector_store.add_documents(all_chunks, embeddings)
+    def index_document_summaries(self, metadatas: List[Dict[str, Any]], texts: List[str]):
+        """Embed document summaries (see document_summary) into the document-level index."""
+        if not texts:
+            return
+        self._embed_and_add(
+            lambda embedder: embedder.model.encode(texts, convert_to_numpy=True),
+            lambda embeddings: self.vector_store.add_document_summaries(metadatas, embeddings)
+        )
         
+    def _embed_and_add(self, embed: Callable[[DocumentEmbedder], np.ndarray], add: Callable[[np.ndarray], None]):
+        """Embed outside the store lock, then add under it if the store still uses that embedder's model.
+        
+        An embedding migration can cut over while a batch is being embedded; models with the same
+        dimension would pass the index's dimension check, so the batch is re-embedded instead.
+        """
+        for _ in range(2):
+            embedder = self.embedder
+            embeddings = embed(embedder)
+            with self.vector_store._lock:
+                if embedder.model_name == self.vector_store.model_name:
+                    add(embeddings)
+                    return
+            logger.info(f"Embedding model changed to {self.vector_store.model_name} during ingestion; re-embedding batch")
+        raise RuntimeError(
+            f"Vector store uses {self.vector_store.model_name} but the embedder produces {self.embedder.model_name}"
+        )
+        
+    def embed_query(self, query: str) -> np.ndarray:
+        """Generate the embedding for a search query."""
+        return self.embedder.model.encode([query], convert_to_numpy=True)
+    
     def search_documents(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
         """Search for relevant document chunks given a query."""
         # Generate query embedding
-        query_embedding = self.embedder.model.encode([query], convert_to_numpy=True)
+        query_embedding = self.embed_query(query)
         
         # Search vector store
         results = self.vector_store.search(query_embedding, top_k)
         
         return results
     
-    def save_vector_store(self, path: str):
-        """Save the vector store to disk."""
-        self.vector_store.save(path)
+    def delete_documents(self, document_ids: List[str]) -> int:
+        """Remove documents from the vector store."""
+        if self.search_only:
+            raise RuntimeError("Document deletion is disabled in search-only mode")
+        return self.vector_store.delete_documents(document_ids)
+    
+    def save_vector_store(self, path: str) -> StoreContents:
+        """Save the vector store to disk. Returns the copy that was written."""
+        return self.vector_store.save(path)
     
     def load_vector_store(self, path: str):
         """Load the vector store from disk."""
@@ -184,23 +1015,20 @@ class RAGDocumentProcessor:
 class BankingRAGProcessor(RAGDocumentProcessor):
     """Specialized RAG processor for banking documents."""
     
-    def __init__(self):
+    def __init__(self, search_only: bool = False, model_name: str = DEFAULT_EMBEDDING_MODEL,
+                 embedder: Optional[DocumentEmbedder] = None):
         # Use a model that's good for financial/legal text
-        super().__init__(model_name="all-MiniLM-L6-v2")
+        super().__init__(model_name=model_name, search_only=search_only, embedder=embedder)
         
-    def process_banking_documents(self, documents: List[Dict[str, Any]]):
-        """Process banking documents with specialized handling."""
-        enhanced_docs = []
+    def enhance_document(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        """Enhance a document with banking-specific regulatory context."""
+        enhanced_doc = doc.copy()
         
-        for doc in documents:
-            # Enhance document with banking-specific context
-            enhanced_doc = doc.copy()
-            
-            # Add regulatory context to content
-            content = doc.get("content", "")
-            if content:
-                # Add regulatory markers for better retrieval
-                regulatory_context = f"""
+        # Add regulatory context to content
+        content = doc.get("content", "")
+        if content:
+            # Add regulatory markers for better retrieval
+            regulatory_context = f"""
 REGULATORY DOCUMENT: {doc.get('type', 'Banking Document')}
 RISK TYPE: {doc.get('risk_type', 'General')}
 PUBLICATION DATE: {doc.get('date', 'Unknown')}
@@ -208,40 +1036,151 @@ REGULATORY LEVEL: {doc.get('level', 'Unknown')}
 
 {content}
 """
-                enhanced_doc["content"] = regulatory_context
-                
-            enhanced_docs.append(enhanced_doc)
+            enhanced_doc["content"] = regulatory_context
             
-        # Process with enhanced content
-        self.process_documents(enhanced_docs)
+        return enhanced_doc
+        
+    def process_banking_documents(self, documents: Iterable[Dict[str, Any]]) -> int:
+        """Process banking documents with specialized handling."""
+        enhanced_docs = (self.enhance_document(doc) for doc in documents)
+            
+        # Process with enhanced content, streamed so only one batch is held at a time
+        return self.process_documents(enhanced_docs)
+        
+    def replace_banking_documents(self, documents: Iterable[Dict[str, Any]]) -> int:
+        """Replace banking documents by ID (see replace_documents), with specialized handling."""
+        return self.replace_documents(self.enhance_document(doc) for doc in documents)
+        
+    def _passes_filters(self, result: Dict[str, Any], risk_type: Optional[str],
+                        document_type: Optional[str]) -> bool:
+        """Check a search result against the banking metadata filters."""
+        metadata = result.get("metadata", {})
+        if risk_type and metadata.get("risk_type", "").lower() != risk_type.lower():
+            return False
+        if document_type and metadata.get("type", "").lower() != document_type.lower():
+            return False
+        return True
+        
+    def expand_context(self, results: List[Dict[str, Any]], window: int = 1, full_document: bool = False,
+                       token_budget: int = 2000) -> List[Dict[str, Any]]:
+        """Expand hits with neighbouring chunks via the adjacency index, within a token budget."""
+        return expand_hits(
+            results, self.vector_store, self.embedder.encoding, window=window,
+            full_document=full_document, token_budget=token_budget,
+            overlap_tokens=self.embedder.chunk_overlap
+        )
+        
+    def build_context(self, query: str, token_budget: int = 2000, risk_type: Optional[str] = None,
+                      document_type: Optional[str] = None, candidates: int = 20,
+                      max_per_document: Optional[int] = 2, mmr_lambda: float = 0.5,
+                      date_from: Optional[str] = None, date_to: Optional[str] = None,
+                      min_score: Optional[float] = None) -> Dict[str, Any]:
+        """Assemble a citation-numbered prompt context of at most token_budget tokens."""
+        results = self.search_banking_context(
+            query, risk_type=risk_type, document_type=document_type, top_k=candidates,
+            diversify=True, mmr_lambda=mmr_lambda, max_per_document=max_per_document,
+            merge_adjacent=True, date_from=date_from, date_to=date_to, min_score=min_score
+        )
+        packed = pack_context(results, token_budget, self.embedder.encoding)
+        packed["chunks_considered"] = len(results)
+        return packed
         
     def search_banking_context(self, query: str, risk_type: Optional[str] = None, 
-                             document_type: Optional[str] = None, top_k: int = 5) -> List[Dict[str, Any]]:
-        """Enhanced search with banking-specific filtering."""
+                             document_type: Optional[str] = None, top_k: int = 5,
+                             diversify: bool = False, mmr_lambda: float = 0.5,
+                             max_per_document: Optional[int] = None,
+                             merge_adjacent: bool = False, date_from: Optional[str] = None,
+                             date_to: Optional[str] = None,
+                             min_score: Optional[float] = None,
+                             top_documents: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Enhanced search with banking-specific filtering.
+        
+        With diversify, a larger candidate pool is re-ranked by maximal marginal relevance;
+        max_per_document caps hits per document and merge_adjacent joins neighbouring chunks.
+        date_from/date_to ("YYYY[-MM[-DD]]") bound the publication date of the hits.
+        With min_score, every hit with cosine similarity >= min_score is returned, top_k at most,
+        and the metadata filters are applied inside the index scan instead of over-fetching.
+        With top_documents, the best documents are picked by their summary vectors first and only
+        their chunks are scored, so cost grows with the number of documents rather than chunks.
+        """
         # Enhance query with banking context
         enhanced_query = f"Banking regulation: {query}"
         if risk_type:
             enhanced_query += f" Risk type: {risk_type}"
         if document_type:
             enhanced_query += f" Document type: {document_type}"
-            
-        # Search with enhanced query
-        results = self.search_documents(enhanced_query, top_k * 2)  # Get more results for filtering
         
-        # Filter results based on criteria
-        filtered_results = []
-        for result in results:
-            metadata = result.get("metadata", {})
-            
-            # Apply filters
-            if risk_type and metadata.get("risk_type", "").lower() != risk_type.lower():
-                continue
-            if document_type and metadata.get("type", "").lower() != document_type.lower():
-                continue
-                
-            filtered_results.append(result)
+        query_embedding = self.embed_query(enhanced_query)
+        search_args = (risk_type, document_type, top_k, diversify, mmr_lambda, max_per_document, merge_adjacent,
+                       date_from, date_to, min_score, top_documents)
+        
+        cache = self.query_cache
+        if cache is None:
+            return self._search_with_embedding(query_embedding, *search_args)
+        
+        # Serve paraphrases of recent queries from the semantic cache
+        params = (
+            (risk_type or "").lower(), (document_type or "").lower(), top_k,
+            diversify, mmr_lambda, max_per_document, merge_adjacent, date_from, date_to, min_score,
+            top_documents
+        )
+        generation = self.vector_store.generation
+        cached = cache.lookup(query_embedding, params, generation)
+        if cached is not None:
+            if cache.should_verify():
+                fresh = self._search_with_embedding(query_embedding.copy(), *search_args)
+                if cache.record_verification(cached, fresh):
+                    return fresh
+            return cached
+        
+        results = self._search_with_embedding(query_embedding.copy(), *search_args)
+        cache.store(query_embedding, params, generation, results)
+        return results
+    
+    def _search_with_embedding(self, query_embedding: np.ndarray, risk_type: Optional[str],
+                               document_type: Optional[str], top_k: int, diversify: bool,
+                               mmr_lambda: float, max_per_document: Optional[int],
+                               merge_adjacent: bool, date_from: Optional[str] = None,
+                               date_to: Optional[str] = None, min_score: Optional[float] = None,
+                               top_documents: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Run the filtered (and optionally diversified) search for a query embedding."""
+        # Threshold and hierarchical modes push the metadata filters into the index search
+        pushdown = min_score is not None or bool(top_documents)
+        filters = {"risk_type": risk_type, "type": document_type} if pushdown else None
+        if diversify:
+            # Re-rank a wider candidate pool by MMR over the reconstructed embeddings
+            candidates, embeddings = self.vector_store.search_with_embeddings(
+                query_embedding, max(top_k * 4, 20), date_from, date_to, min_score, filters, top_documents
+            )
+            keep = [i for i, result in enumerate(candidates) if self._passes_filters(result, risk_type, document_type)]
+            candidates = [candidates[i] for i in keep]
+            selected = mmr_select(
+                embeddings[keep],
+                np.array([result["similarity_score"] for result in candidates]),
+                top_k,
+                mmr_lambda=mmr_lambda,
+                document_ids=[result["metadata"].get("document_id", "") for result in candidates],
+                max_per_document=max_per_document
+            )
+            filtered_results = [candidates[i] for i in selected]
+        elif pushdown:
+            # Filters are already applied inside the search, so no over-fetching is needed
+            filtered_results = self.vector_store.search(
+                query_embedding, top_k, date_from, date_to, min_score, filters, top_documents
+            )
+            if max_per_document:
+                filtered_results = cap_per_document(filtered_results, max_per_document)
+        else:
+            # Search with enhanced query
+            results = self.vector_store.search(query_embedding, top_k * 2, date_from, date_to)  # Get more results for filtering
             
-            if len(filtered_results) >= top_k:
-                break
+            # Filter results based on criteria
+            filtered_results = [result for result in results if self._passes_filters(result, risk_type, document_type)]
+            if max_per_document:
+                filtered_results = cap_per_document(filtered_results, max_per_document)
+            filtered_results = filtered_results[:top_k]
+        
+        if merge_adjacent:
+            filtered_results = merge_adjacent_chunks(filtered_results, self.embedder.chunk_overlap)
                 
-        return filtered_results[:top_k]
+        return filtered_results
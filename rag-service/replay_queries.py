@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Replay captured search traffic against one or more service builds.
+Reads query logs written with RAG_QUERY_LOG (rotated files included), re-issues the requests
+with an async client at the recorded inter-arrival times (optionally sped up) or at a fixed
+rate, with bounded concurrency, and reports latency percentiles, errors and - when several
+targets are given - how each build compares with the first one, including result overlap.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import List, Dict, Any, Optional, Tuple
+
+import httpx
+
+from query_log import ENTRY_FIELDS
+from request_scheduler import REQUEST_CLASSES
+
+def load_entries(paths: List[str], limit: Optional[int] = None, include_failed: bool = False) -> List[Dict[str, Any]]:
+    """Read captured /search entries from query logs, oldest first."""
+    entries = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                entry = json.loads(line)
+                if entry.get("endpoint", "/search") != "/search" or not entry.get("query"):
+                    continue
+                if not include_failed and entry.get("status", 200) != 200:
+                    continue
+                entries.append(entry)
+    entries.sort(key=lambda entry: entry.get("ts", 0))
+    return entries[:limit] if limit else entries
+
+def schedule(entries: List[Dict[str, Any]], speed: float, rate: Optional[float]) -> List[float]:
+    """Send offsets in seconds: recorded gaps divided by speed, a fixed rate, or all at once (speed 0)."""
+    if rate:
+        return [i / rate for i in range(len(entries))]
+    if speed <= 0:
+        return [0.0] * len(entries)
+    start = entries[0].get("ts", 0) if entries else 0
+    return [(entry.get("ts", start) - start) / speed for entry in entries]
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of values (None when empty)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))], 2)
+
+def _result_ids(payload: Dict[str, Any]) -> List[Tuple[str, Any]]:
+    ids = []
+    for result in payload.get("results", []):
+        metadata = result.get("metadata", {})
+        ids.append((metadata.get("document_id", result.get("document_id")), result.get("chunk_index")))
+    return ids
+
+async def replay(url: str, entries: List[Dict[str, Any]], offsets: List[float], concurrency: int,
+                 timeout: float, request_class: Optional[str] = None) -> Dict[str, Any]:
+    """Replay entries against one service, returning per-request outcomes and the wall time.
+
+    request_class is sent as X-Request-Class (e.g. "batch" so a replay yields to live traffic).
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    outcomes: List[Optional[Dict[str, Any]]] = [None] * len(entries)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    headers = {"X-Request-Class": request_class} if request_class else None
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=timeout, headers=headers) as client:
+        start = time.perf_counter()
+
+        async def send(i: int):
+            delay = offsets[i] - (time.perf_counter() - start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            async with semaphore:
+                # How far behind schedule the request went out (client or concurrency saturation)
+                lag_ms = max(0.0, (time.perf_counter() - start - offsets[i]) * 1000)
+                body = {k: v for k, v in entries[i].items() if k not in ENTRY_FIELDS}
+                sent = time.perf_counter()
+                outcome = {"lag_ms": lag_ms, "status": None, "error": None, "ids": None}
+                try:
+                    response = await client.post("/search", json=body)
+                    outcome["status"] = response.status_code
+                    if response.status_code == 200:
+                        outcome["ids"] = _result_ids(response.json())
+                    else:
+                        outcome["error"] = f"HTTP {response.status_code}"
+                except httpx.HTTPError as e:
+                    outcome["error"] = type(e).__name__
+                outcome["latency_ms"] = (time.perf_counter() - sent) * 1000
+                outcomes[i] = outcome
+
+        await asyncio.gather(*(send(i) for i in range(len(entries))))
+        elapsed = time.perf_counter() - start
+
+    return {"outcomes": outcomes, "seconds": elapsed}
+
+def summarize(run: Dict[str, Any]) -> Dict[str, Any]:
+    """Latency percentiles, throughput and error breakdown for one replay."""
+    outcomes = run["outcomes"]
+    latencies = [o["latency_ms"] for o in outcomes if o["error"] is None]
+    errors: Dict[str, int] = {}
+    for outcome in outcomes:
+        if outcome["error"]:
+            errors[outcome["error"]] = errors.get(outcome["error"], 0) + 1
+    return {
+        "requests": len(outcomes),
+        "errors": sum(errors.values()),
+        "error_breakdown": errors,
+        "seconds": round(run["seconds"], 2),
+        "requests_per_second": round(len(outcomes) / run["seconds"], 2) if run["seconds"] > 0 else 0.0,
+        "p50_ms": percentile(latencies, 50),
+        "p90_ms": percentile(latencies, 90),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": round(max(latencies), 2) if latencies else None,
+        "mean_ms": round(sum(latencies) / len(latencies), 2) if latencies else None,
+        "schedule_lag_p95_ms": percentile([o["lag_ms"] for o in outcomes], 95)
+    }
+
+def compare(baseline: Dict[str, Any], candidate: Dict[str, Any]) -> Dict[str, Any]:
+    """Latency ratios and result agreement of a candidate run against the baseline run."""
+    overlaps = []
+    same_top = 0
+    for base, cand in zip(baseline["outcomes"], candidate["outcomes"]):
+        if base["ids"] is None or cand["ids"] is None:
+            continue
+        union = set(base["ids"]) | set(cand["ids"])
+        overlaps.append(len(set(base["ids"]) & set(cand["ids"])) / len(union) if union else 1.0)
+        same_top += base["ids"][:1] == cand["ids"][:1]
+
+    base_summary, cand_summary = summarize(baseline), summarize(candidate)
+
+    def ratio(key: str) -> Optional[float]:
+        if not base_summary[key] or cand_summary[key] is None:
+            return None
+        return round(cand_summary[key] / base_summary[key], 3)
+
+    return {
+        "compared_requests": len(overlaps),
+        "p50_ratio": ratio("p50_ms"),
+        "p95_ratio": ratio("p95_ms"),
+        "p99_ratio": ratio("p99_ms"),
+        "error_delta": cand_summary["errors"] - base_summary["errors"],
+        "mean_result_overlap": round(sum(overlaps) / len(overlaps), 4) if overlaps else None,
+        "same_top_result": round(same_top / len(overlaps), 4) if overlaps else None
+    }
+
+def parse_target(value: str) -> Tuple[str, str]:
+    """"name=url" or a bare URL (named after itself)."""
+    name, sep, url = value.partition("=")
+    return (name, url) if sep else (value, value)
+
+async def main():
+    parser = argparse.ArgumentParser(description="Replay captured search traffic and compare service builds")
+    parser.add_argument("logs", nargs="+", help="Query log files (RAG_QUERY_LOG output, rotated files included)")
+    parser.add_argument("--target", action="append", required=True,
+                        help="Service to replay against, as name=url or url; repeat to compare (first is the baseline)")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Replay speed relative to the recorded arrival times (0 sends as fast as allowed)")
+    parser.add_argument("--rate", type=float, help="Fixed requests per second instead of the recorded times")
+    parser.add_argument("--concurrency", type=int, default=16, help="Maximum requests in flight")
+    parser.add_argument("--limit", type=int, help="Replay at most this many requests")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument("--include-failed", action="store_true", help="Also replay requests that failed when captured")
+    parser.add_argument("--request-class", choices=REQUEST_CLASSES,
+                        help="Scheduling class to request (default: the service's, interactive for /search)")
+    parser.add_argument("--output", help="Write the JSON report here")
+    args = parser.parse_args()
+
+    entries = load_entries(args.logs, args.limit, args.include_failed)
+    if not entries:
+        print("❌ No replayable /search requests found")
+        return
+    offsets = schedule(entries, args.speed, args.rate)
+    print(f"🔁 Replaying {len(entries)} requests over ~{offsets[-1]:.1f}s (concurrency {args.concurrency})")
+
+    runs = {}
+    report = {"requests": len(entries), "targets": {}, "comparison": {}}
+    for name, url in map(parse_target, args.target):
+        runs[name] = await replay(url, entries, offsets, args.concurrency, args.timeout, args.request_class)
+        report["targets"][name] = {"url": url, **summarize(runs[name])}
+        print(f"📊 {name}: {report['targets'][name]}")
+
+    names = list(runs)
+    for name in names[1:]:
+        report["comparison"][name] = compare(runs[names[0]], runs[name])
+        print(f"⚖️ {name} vs {names[0]}: {report['comparison'][name]}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"📝 Report written to {args.output}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
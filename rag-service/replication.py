@@ -0,0 +1,700 @@
+#!/usr/bin/env python3
+"""
+Leader/follower replication of the vector store.
+The leader appends every committed index change (chunk adds with their normalized vectors,
+deletes, document summaries, and a reset whenever the store is swapped wholesale) to an
+ordered change log of JSON-line segments, and writes periodic snapshots next to it so old
+segments can be compacted. Followers bootstrap from a snapshot, then tail the log - from the
+shared directory or over HTTP from the leader's /replication/changes endpoint - and apply
+the changes to their own store, tracking how far behind the leader they are.
+"""
+
+import argparse
+import base64
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from rag_processor import (
+    RAGDocumentProcessor, BankingRAGProcessor, DocumentEmbedder, FAISSVectorStore, DEFAULT_VECTOR_STORE_PATH
+)
+from snapshot import export_snapshot, load_snapshot
+from embedding_migration import record_model_change
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# A new segment is started once the current one would grow past this size
+DEFAULT_SEGMENT_BYTES = 64 * 1024 * 1024
+# Snapshots kept in the log directory; segments older than the oldest kept one are deleted
+SNAPSHOTS_KEPT = 2
+# Upper bound on the bytes of changes returned by one read (a single larger change is still returned)
+DEFAULT_READ_BYTES = 8 * 1024 * 1024
+# Seconds an HTTP follower asks the leader to hold a request open when it is caught up
+LONG_POLL_SECONDS = 10.0
+
+HEAD_NAME = "head.json"
+_SEGMENT_PATTERN = re.compile(r"^changes-(\d{12})\.jsonl$")
+_SNAPSHOT_PATTERN = re.compile(r"^snapshot-(\d{12})\.tar\.gz$")
+_SEQ_PREFIX = re.compile(rb'^\{"seq": (\d+)')
+
+class ReplicationGap(Exception):
+    """Raised when requested changes were compacted away; the reader must re-sync from a snapshot."""
+
+def encode_vectors(vectors: np.ndarray) -> Dict[str, Any]:
+    """float32 vectors as base64 with their shape, for the JSON log."""
+    data = np.ascontiguousarray(vectors, dtype="float32").tobytes()
+    return {"shape": list(vectors.shape), "data": base64.b64encode(data).decode("ascii")}
+
+def decode_vectors(value: Dict[str, Any]) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(value["data"]), dtype="float32").reshape(value["shape"]).copy()
+
+class ChangeLog:
+    """Append-only log of store changes, numbered from 1, split into size-bounded segments.
+
+    Segments are named after their first sequence number. head.json records the log's ID, its
+    last sequence number and when that change was committed, so readers can measure their lag.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = DEFAULT_SEGMENT_BYTES):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self._lock = threading.Lock()
+        self._file = None
+        # seq -> (segment path, offset just past that change), so tailing readers resume without rescanning
+        self._cursors: "OrderedDict[int, Tuple[str, int]]" = OrderedDict()
+        self.log_id: Optional[str] = None
+        # Last durable change, the one readers see; appended changes become durable on sync()
+        self.last_seq = 0
+        self.last_ts: Optional[float] = None
+        self._appended_seq = 0
+        self._appended_ts: Optional[float] = None
+        self._sync_lock = threading.Lock()
+
+    def segments(self) -> List[Tuple[int, str]]:
+        """(first seq, path) of each segment, oldest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        found = []
+        for name in os.listdir(self.directory):
+            match = _SEGMENT_PATTERN.match(name)
+            if match:
+                found.append((int(match.group(1)), os.path.join(self.directory, name)))
+        return sorted(found)
+
+    def snapshots(self) -> List[Tuple[int, str]]:
+        """(replication seq, path) of each snapshot in the log directory, oldest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        found = []
+        for name in os.listdir(self.directory):
+            match = _SNAPSHOT_PATTERN.match(name)
+            if match:
+                found.append((int(match.group(1)), os.path.join(self.directory, name)))
+        return sorted(found)
+
+    def latest_snapshot(self) -> Optional[Tuple[int, str]]:
+        snapshots = self.snapshots()
+        return snapshots[-1] if snapshots else None
+
+    def open(self):
+        """Open the log for appending, creating it or recovering the last sequence number."""
+        os.makedirs(self.directory, exist_ok=True)
+        head = self._read_head()
+        self.log_id = head["log_id"] if head else uuid.uuid4().hex
+        segments = self.segments()
+        if segments:
+            path = segments[-1][1]
+            with open(path, "rb+") as f:
+                data = f.read()
+                # Drop a change torn by a crash mid-write; it was never acknowledged
+                complete = data.rfind(b"\n") + 1
+                if complete < len(data):
+                    f.truncate(complete)
+            self.last_seq = segments[-1][0] - 1
+            for line in data[:complete].splitlines():
+                self.last_seq = int(_SEQ_PREFIX.match(line).group(1))
+            self._file = open(path, "ab")
+            # Changes written before a crash may not have been synced yet
+            os.fsync(self._file.fileno())
+        elif head:
+            # Every segment compacted away (should not happen, the newest one is always kept)
+            self.last_seq = head["last_seq"]
+        self.last_ts = head["ts"] if head else None
+        self._appended_seq = self.last_seq
+        self._appended_ts = self.last_ts
+        self._write_head()
+        logger.info(f"Opened replication log {self.directory} at change {self.last_seq}")
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    def _read_head(self) -> Optional[Dict[str, Any]]:
+        path = os.path.join(self.directory, HEAD_NAME)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_head(self):
+        tmp_path = os.path.join(self.directory, f"{HEAD_NAME}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"log_id": self.log_id, "last_seq": self.last_seq, "ts": self.last_ts}, f)
+        os.replace(tmp_path, os.path.join(self.directory, HEAD_NAME))
+
+    def head(self) -> Dict[str, Any]:
+        """Log ID, first and last available sequence numbers and the last change's commit time."""
+        if self.log_id is not None:
+            head = {"log_id": self.log_id, "last_seq": self.last_seq, "ts": self.last_ts}
+        else:
+            # Reader of another process's log
+            head = self._read_head() or {"log_id": None, "last_seq": 0, "ts": None}
+        segments = self.segments()
+        head["first_seq"] = segments[0][0] if segments else head["last_seq"] + 1
+        return head
+
+    def append(self, op: str, payload: Dict[str, Any], sync: bool = True) -> int:
+        """Append one change and return its sequence number.
+
+        With sync=False the change is written but only becomes durable (and visible to readers)
+        at the next sync(), which covers every change appended before it.
+        """
+        record = {"seq": 0, "ts": round(time.time(), 3), "op": op}
+        record.update({key: encode_vectors(value) if isinstance(value, np.ndarray) else value
+                       for key, value in payload.items()})
+        with self._lock:
+            record["seq"] = self._appended_seq + 1
+            line = (json.dumps(record) + "\n").encode("utf-8")
+            if self._file is None or (self._file.tell() and self._file.tell() + len(line) > self.segment_bytes):
+                if self._file:
+                    # Once per segment: a closed segment must already be durable
+                    os.fsync(self._file.fileno())
+                    self._file.close()
+                path = os.path.join(self.directory, f"changes-{record['seq']:012d}.jsonl")
+                self._file = open(path, "ab")
+            self._file.write(line)
+            self._file.flush()
+            self._appended_seq = record["seq"]
+            self._appended_ts = record["ts"]
+        if sync:
+            self.sync()
+        return record["seq"]
+
+    def sync(self):
+        """Make every appended change durable and publish it to readers (group commit).
+
+        Appends carry on while the fsync runs; they are covered by the next sync.
+        """
+        with self._sync_lock:
+            with self._lock:
+                if self._file is None or self._appended_seq == self.last_seq:
+                    return
+                seq, ts = self._appended_seq, self._appended_ts
+                # A duplicate descriptor stays valid if append() rotates segments meanwhile
+                fd = os.dup(self._file.fileno())
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            with self._lock:
+                self.last_seq = seq
+                self.last_ts = ts
+                self._write_head()
+
+    def read_lines(self, after_seq: int, limit: int = 100, max_bytes: int = DEFAULT_READ_BYTES) -> List[bytes]:
+        """Raw JSON lines of the durable changes after after_seq, oldest first, up to limit or max_bytes."""
+        # Changes appended but not yet synced are never handed out
+        visible_seq = self.last_seq if self.log_id is not None else (self._read_head() or {"last_seq": 0})["last_seq"]
+        segments = self.segments()
+        if not segments or limit <= 0:
+            return []
+        if after_seq + 1 < segments[0][0]:
+            raise ReplicationGap(f"Changes after {after_seq} were compacted; the log starts at {segments[0][0]}")
+
+        with self._lock:
+            cursor = self._cursors.get(after_seq)
+        if cursor and any(path == cursor[0] for _, path in segments):
+            start_path, offset = cursor
+        else:
+            start_path = [path for first_seq, path in segments if first_seq <= after_seq + 1][-1]
+            offset = 0
+        paths = [path for _, path in segments]
+
+        lines: List[bytes] = []
+        size = 0
+        end = None
+        caught_up = False
+        try:
+            for path in paths[paths.index(start_path):]:
+                with open(path, "rb") as f:
+                    f.seek(offset)
+                    while len(lines) < limit and (size < max_bytes or not lines):
+                        line = f.readline()
+                        # An incomplete last line is a change still being written
+                        if not line.endswith(b"\n"):
+                            break
+                        seq = int(_SEQ_PREFIX.match(line).group(1))
+                        if seq > visible_seq:
+                            caught_up = True
+                            break
+                        offset += len(line)
+                        if seq <= after_seq:
+                            continue
+                        lines.append(line.rstrip(b"\n"))
+                        size += len(line)
+                        end = (path, offset)
+                if caught_up or len(lines) >= limit or size >= max_bytes:
+                    break
+                offset = 0
+        except FileNotFoundError:
+            raise ReplicationGap(f"Changes after {after_seq} were compacted while being read")
+
+        if end:
+            last_seq = int(_SEQ_PREFIX.match(lines[-1]).group(1))
+            with self._lock:
+                self._cursors[last_seq] = end
+                while len(self._cursors) > 256:
+                    self._cursors.popitem(last=False)
+        return lines
+
+    def read(self, after_seq: int, limit: int = 100, max_bytes: int = DEFAULT_READ_BYTES) -> List[Dict[str, Any]]:
+        """Changes after after_seq, oldest first. Raises ReplicationGap if some were compacted."""
+        return [json.loads(line) for line in self.read_lines(after_seq, limit, max_bytes)]
+
+    def write_snapshot(self, vector_store: FAISSVectorStore) -> Dict[str, Any]:
+        """Snapshot the store at its current change, then drop older snapshots and covered segments."""
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = os.path.join(self.directory, "snapshot.tar.gz.tmp")
+        with open(tmp_path, "wb") as f:
+            manifest = export_snapshot(vector_store, f)
+        # Publish the changes the snapshot includes first, so readers never see it ahead of the log
+        self.sync()
+        os.replace(tmp_path, os.path.join(self.directory, f"snapshot-{manifest['replication_seq']:012d}.tar.gz"))
+        self._compact()
+        return manifest
+
+    def _compact(self):
+        snapshots = self.snapshots()
+        for _, path in snapshots[:-SNAPSHOTS_KEPT]:
+            os.remove(path)
+        if not snapshots:
+            return
+        # Changes up to the oldest kept snapshot are no longer needed by anyone who can re-sync
+        covered = snapshots[-SNAPSHOTS_KEPT:][0][0]
+        segments = self.segments()
+        for (_, path), (next_first, _) in zip(segments, segments[1:]):
+            if next_first - 1 <= covered:
+                os.remove(path)
+                logger.info(f"Compacted replication segment {os.path.basename(path)}")
+
+class ReplicationLeader:
+    """Logs a store's committed changes and keeps a recent snapshot beside the log."""
+
+    def __init__(self, vector_store: FAISSVectorStore, log: ChangeLog, snapshot_every: int = 1000):
+        self.vector_store = vector_store
+        self.log = log
+        # Changes between snapshots; a snapshot also follows every reset
+        self.snapshot_every = snapshot_every
+        self._changes_since_snapshot = 0
+        self._snapshot_due = threading.Event()
+        self._sync_due = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._sync_thread: Optional[threading.Thread] = None
+        self.stats = {
+            "snapshots_written": 0,
+            "last_snapshot_seq": None,
+            "last_snapshot_at": None,
+            "last_error": None
+        }
+
+    def _on_change(self, op: str, payload: Dict[str, Any]) -> int:
+        # Runs under the store lock: only write the change here, the sync thread fsyncs it
+        seq = self.log.append(op, payload, sync=False)
+        self._sync_due.set()
+        self._changes_since_snapshot += 1
+        if op == "reset" or self._changes_since_snapshot >= self.snapshot_every:
+            self._changes_since_snapshot = 0
+            self._snapshot_due.set()
+        return seq
+
+    def run(self):
+        """Write snapshots when due until stop() is called."""
+        while True:
+            self._snapshot_due.wait()
+            if self._stop.is_set():
+                break
+            self._snapshot_due.clear()
+            try:
+                manifest = self.log.write_snapshot(self.vector_store)
+                self.stats["snapshots_written"] += 1
+                self.stats["last_snapshot_seq"] = manifest["replication_seq"]
+                self.stats["last_snapshot_at"] = time.time()
+            except Exception as e:
+                self.stats["last_error"] = str(e)
+                logger.error(f"Error writing replication snapshot: {e}")
+
+    def _sync_changes(self):
+        """Fsync logged changes outside the store lock; changes logged during one fsync share the next."""
+        while True:
+            self._sync_due.wait()
+            self._sync_due.clear()
+            try:
+                self.log.sync()
+            except Exception as e:
+                self.stats["last_error"] = str(e)
+                logger.error(f"Error syncing replication log: {e}")
+            if self._stop.is_set():
+                break
+
+    def start(self):
+        """Start logging changes and writing snapshots on background threads."""
+        self.log.open()
+        with self.vector_store._lock:
+            self.vector_store.change_listener = self._on_change
+            # The log cannot tell what the loaded store already holds, so followers re-sync from a snapshot
+            self.vector_store.replication_seq = self._on_change("reset", {})
+        self.log.sync()
+        self._sync_thread = threading.Thread(target=self._sync_changes, name="replication-sync", daemon=True)
+        self._sync_thread.start()
+        self._thread = threading.Thread(target=self.run, name="replication-leader", daemon=True)
+        self._thread.start()
+        logger.info(f"Replication leader logging changes to {self.log.directory}")
+
+    def stop(self):
+        with self.vector_store._lock:
+            self.vector_store.change_listener = None
+        self._stop.set()
+        self._snapshot_due.set()
+        self._sync_due.set()
+        if self._thread:
+            self._thread.join()
+        if self._sync_thread:
+            self._sync_thread.join()
+        self.log.sync()
+        self.log.close()
+
+    def status(self) -> Dict[str, Any]:
+        """Leader state for /health."""
+        head = self.log.head()
+        return {
+            "role": "leader",
+            "directory": self.log.directory,
+            "log_id": head["log_id"],
+            "leader_seq": head["last_seq"],
+            "first_seq": head["first_seq"],
+            "segments": len(self.log.segments()),
+            **self.stats
+        }
+
+class ReplicationFollower:
+    """Keeps a processor's store in sync with a leader's change log (a directory or an http(s) URL)."""
+
+    def __init__(self, processor: RAGDocumentProcessor, source: str, store_path: str = DEFAULT_VECTOR_STORE_PATH,
+                 poll_seconds: float = 0.5, batch_size: int = 100, commit_interval: float = 30.0,
+                 timeout: float = 60.0):
+        self.processor = processor
+        self.source = source.rstrip("/")
+        self.remote = self.source.startswith(("http://", "https://"))
+        self.store_path = store_path
+        self.poll_seconds = poll_seconds
+        self.batch_size = batch_size
+        self.commit_interval = commit_interval
+        self.log = None if self.remote else ChangeLog(self.source)
+        self._client = None
+        if self.remote:
+            import httpx
+            self._client = httpx.Client(base_url=self.source, timeout=timeout + LONG_POLL_SECONDS)
+            # One INFO line per long poll would flood the service log
+            logging.getLogger("httpx").setLevel(logging.WARNING)
+        self.state_path = f"{store_path}.replication.json"
+
+        # Log the applied changes came from; None until bootstrapped
+        self.log_id: Optional[str] = None
+        self._applied_ts: Optional[float] = None
+        self._committed_seq: Optional[int] = None
+        self._last_commit = time.monotonic()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {
+            "state": "starting",
+            "leader_seq": None,
+            "leader_ts": None,
+            "changes_applied": 0,
+            "bootstraps": 0,
+            "last_contact_at": None,
+            "last_error": None
+        }
+        self._resume()
+
+    def _resume(self):
+        """Pick up where a previous run left off if its saved state matches the loaded store."""
+        if not os.path.exists(self.state_path):
+            return
+        with open(self.state_path, encoding="utf-8") as f:
+            state = json.load(f)
+        store = self.processor.vector_store
+        if state.get("source") == self.source and state.get("total_chunks") == len(store.chunks):
+            self.log_id = state["log_id"]
+            store.replication_seq = state["applied_seq"]
+            self._committed_seq = state["applied_seq"]
+            logger.info(f"Resuming replication from {self.source} after change {state['applied_seq']}")
+
+    def _head(self) -> Dict[str, Any]:
+        """The leader's log head without any changes."""
+        if not self.remote:
+            return self.log.head()
+        response = self._client.get("/replication/changes", params={"limit": 0})
+        response.raise_for_status()
+        return response.json()
+
+    def _fetch(self, after_seq: int, wait: float) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """The leader's log head and the next changes after after_seq."""
+        if not self.remote:
+            return self.log.head(), self.log.read(after_seq, self.batch_size)
+        response = self._client.get(
+            "/replication/changes", params={"after": after_seq, "limit": self.batch_size, "wait": wait}
+        )
+        if response.status_code == 410:
+            raise ReplicationGap(response.json().get("detail", "Changes were compacted"))
+        response.raise_for_status()
+        body = response.json()
+        changes = body.pop("changes")
+        return body, changes
+
+    def _bootstrap(self, head: Dict[str, Any], min_seq: int = 0) -> bool:
+        """Replace the store with a leader snapshot at or after min_seq. False if none is available yet."""
+        self.stats["state"] = "bootstrapping"
+        with tempfile.TemporaryFile() as spool:
+            if self.remote:
+                # The leader serves its latest on-disk snapshot rather than serialising the live store
+                with self._client.stream("GET", "/replication/snapshot", params={"min_seq": min_seq}) as response:
+                    if response.status_code == 503:
+                        self.stats["state"] = "waiting_for_snapshot"
+                        return False
+                    response.raise_for_status()
+                    for block in response.iter_bytes():
+                        spool.write(block)
+                    modified = response.headers.get("last-modified")
+                snapshot_ts = parsedate_to_datetime(modified).timestamp() if modified else time.time()
+            else:
+                latest = self.log.latest_snapshot()
+                if latest is None or latest[0] < min_seq:
+                    self.stats["state"] = "waiting_for_snapshot"
+                    return False
+                with open(latest[1], "rb") as f:
+                    for block in iter(lambda: f.read(1024 * 1024), b""):
+                        spool.write(block)
+                snapshot_ts = os.path.getmtime(latest[1])
+            spool.seek(0)
+            # Not pinned to our model: the leader may have migrated to another embedding model
+            store, manifest = load_snapshot(spool)
+
+        self._activate(store)
+        self.log_id = head["log_id"]
+        self._applied_ts = snapshot_ts
+        self.stats["bootstraps"] += 1
+        self.stats["state"] = "streaming"
+        logger.info(f"Bootstrapped from leader snapshot at change {manifest['replication_seq']} "
+                    f"({manifest['vectors']} vectors)")
+        return True
+
+    def _activate(self, store: FAISSVectorStore):
+        """Swap in a bootstrapped store, switching the query embedder if the leader changed model."""
+        processor = self.processor
+        embedder = processor.embedder
+        if store.model_name != embedder.model_name:
+            logger.info(f"Leader migrated from {embedder.model_name} to {store.model_name}; switching query model")
+            embedder = DocumentEmbedder(store.model_name)
+            embedder.batch_gate = processor.embedder.batch_gate
+            # Loaded before the swap so the first query after it does not pay for the model load
+            embedder.model
+            record_model_change(self.store_path, processor.embedder.model_name, store.model_name)
+        with processor.vector_store._lock:
+            processor.vector_store.replace_with(store)
+            processor.embedder = embedder
+
+    def _apply(self, change: Dict[str, Any]):
+        """Apply one logged change to the store."""
+        store = self.processor.vector_store
+        op = change["op"]
+        with store._lock:
+            if op == "add":
+                store.add_documents(change["chunks"], decode_vectors(change["embeddings"]))
+            elif op == "delete":
+                store.delete_documents(change["document_ids"])
+            elif op == "summaries":
+                store.add_document_summaries(change["metadatas"], decode_vectors(change["embeddings"]))
+            else:
+                raise ValueError(f"Unknown replication change {op!r} at {change['seq']}")
+            store.replication_seq = change["seq"]
+        self._applied_ts = change["ts"]
+        self.stats["changes_applied"] += 1
+
+    def poll_once(self, wait: float = 0.0) -> int:
+        """Fetch and apply the next batch of changes (re-syncing when needed). Returns the number applied."""
+        store = self.processor.vector_store
+        try:
+            head, changes = self._fetch(store.replication_seq, wait)
+        except ReplicationGap as e:
+            logger.warning(f"Replication gap, re-syncing from a snapshot: {e}")
+            self._bootstrap(self._head())
+            return 0
+        self.stats["last_contact_at"] = time.time()
+        self.stats["leader_seq"] = head["last_seq"]
+        self.stats["leader_ts"] = head["ts"]
+
+        # Not bootstrapped yet, or the leader started a new log
+        if head["log_id"] is None:
+            self.stats["state"] = "waiting_for_leader"
+            return 0
+        if self.log_id != head["log_id"] or head["last_seq"] < store.replication_seq:
+            self._bootstrap(head)
+            return 0
+
+        applied = 0
+        for change in changes:
+            if change["op"] == "reset":
+                # The leader swapped its store; only a snapshot taken after the reset reflects it
+                if not self._bootstrap(head, min_seq=change["seq"]):
+                    return applied
+                break
+            self._apply(change)
+            applied += 1
+        self.stats["state"] = "streaming"
+        return applied
+
+    def commit(self, force: bool = False) -> bool:
+        """Save the store and the applied position if they changed and the commit interval elapsed."""
+        store = self.processor.vector_store
+        if self.log_id is None or store.replication_seq == self._committed_seq:
+            return False
+        if not force and time.monotonic() - self._last_commit < self.commit_interval:
+            return False
+
+        # The position comes from the same copy as the saved store, so a restart never re-applies or
+        # skips a change; the store lock is only held while that copy is taken
+        contents = self.processor.save_vector_store(self.store_path)
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "source": self.source,
+                "log_id": self.log_id,
+                "applied_seq": contents.replication_seq,
+                "total_chunks": len(contents.chunks)
+            }, f)
+        os.replace(tmp_path, self.state_path)
+        self._committed_seq = contents.replication_seq
+        self._last_commit = time.monotonic()
+        return True
+
+    def run(self):
+        """Tail the leader until stop() is called, committing on the configured cadence."""
+        while not self._stop.is_set():
+            applied = 0
+            try:
+                # Over HTTP the leader holds the request open while there is nothing new
+                applied = self.poll_once(wait=LONG_POLL_SECONDS if self.remote else 0.0)
+                self.stats["last_error"] = None
+                self.commit()
+            except Exception as e:
+                self.stats["state"] = "error"
+                self.stats["last_error"] = str(e)
+                logger.error(f"Error replicating from {self.source}: {e}")
+                self._stop.wait(self.poll_seconds)
+                continue
+            if not applied and not self.remote:
+                self._stop.wait(self.poll_seconds)
+        self.commit(force=True)
+
+    def start(self):
+        """Run the follower on a background thread."""
+        self._thread = threading.Thread(target=self.run, name="replication-follower", daemon=True)
+        self._thread.start()
+        logger.info(f"Following replication leader at {self.source}")
+
+    def stop(self):
+        """Stop tailing and commit the applied changes."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        if self._client:
+            self._client.close()
+
+    def status(self) -> Dict[str, Any]:
+        """Follower state and replication lag for /health."""
+        applied_seq = self.processor.vector_store.replication_seq
+        leader_seq = self.stats["leader_seq"]
+        lag_changes = max(0, leader_seq - applied_seq) if leader_seq is not None else None
+        lag_seconds = None
+        if lag_changes == 0:
+            lag_seconds = 0.0
+        elif lag_changes and self.stats["leader_ts"] and self._applied_ts:
+            lag_seconds = round(max(0.0, self.stats["leader_ts"] - self._applied_ts), 3)
+        last_contact = self.stats["last_contact_at"]
+        return {
+            "role": "follower",
+            "source": self.source,
+            "running": self._thread is not None and self._thread.is_alive(),
+            "log_id": self.log_id,
+            "applied_seq": applied_seq,
+            "lag_changes": lag_changes,
+            "lag_seconds": lag_seconds,
+            "seconds_since_contact": round(time.time() - last_contact, 3) if last_contact else None,
+            **self.stats
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect a replication log or run a standalone follower")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    status_parser = subparsers.add_parser("status", help="Show a change log's head, segments and snapshots")
+    status_parser.add_argument("directory", help="Replication log directory")
+
+    follow_parser = subparsers.add_parser("follow", help="Keep a saved store in sync with a leader")
+    follow_parser.add_argument("source", help="Leader log directory or service URL")
+    follow_parser.add_argument("--store", default=DEFAULT_VECTOR_STORE_PATH, help="Vector store path (without extension)")
+    follow_parser.add_argument("--model", help="Embedding model name (defaults to the saved store's)")
+    follow_parser.add_argument("--poll-seconds", type=float, default=0.5, help="Seconds between polls of a directory")
+    follow_parser.add_argument("--commit-interval", type=float, default=30.0, help="Seconds between store commits")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        log = ChangeLog(args.directory)
+        print(json.dumps({
+            **log.head(),
+            "segments": [{"first_seq": first, "bytes": os.path.getsize(path)} for first, path in log.segments()],
+            "snapshots": [seq for seq, _ in log.snapshots()]
+        }, indent=2))
+        return
+
+    from rag_processor import read_store_metadata, DEFAULT_EMBEDDING_MODEL
+    metadata = read_store_metadata(args.store)
+    model_name = args.model or (metadata["model_name"] if metadata else DEFAULT_EMBEDDING_MODEL)
+    processor = BankingRAGProcessor(search_only=True, model_name=model_name)
+    if os.path.exists(f"{args.store}.faiss"):
+        processor.load_vector_store(args.store)
+    follower = ReplicationFollower(
+        processor, args.source, store_path=args.store, poll_seconds=args.poll_seconds,
+        commit_interval=args.commit_interval
+    )
+    try:
+        follower.run()
+    except KeyboardInterrupt:
+        follower.commit(force=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+Priority-aware request scheduling.
+Requests are tagged interactive (chat lookups), batch (evaluation jobs, bulk queries) or
+ingest (document processing), by header or API key. Their work runs on dedicated thread
+pools - one for searches, one for embedding documents - instead of the event loop. Queued
+work is dispatched by weighted fair queueing under per-class concurrency limits, and
+ingestion is paused (between embedding batches, and before new ingest requests start)
+while interactive latency is over its SLO.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Callable
+
+logger = logging.getLogger(__name__)
+
+REQUEST_CLASSES = ("interactive", "batch", "ingest")
+DEFAULT_WEIGHTS = {"interactive": 8.0, "batch": 2.0, "ingest": 1.0}
+DEFAULT_CONCURRENCY = {"interactive": 4, "batch": 2, "ingest": 1}
+DEFAULT_EXECUTORS = {"search": 4, "embedding": 1}
+
+# Recent requests kept per class for the wait/run/latency percentiles
+METRICS_WINDOW = 500
+# Interactive latencies older than this no longer count towards the SLO check
+SLO_WINDOW_SECONDS = 10.0
+# How often a paused ingest worker or held ingest request re-checks the SLO
+THROTTLE_POLL_SECONDS = 0.05
+
+class SchedulerOverloaded(Exception):
+    """Raised when a class's queue is full."""
+
+def parse_class_map(value: Optional[str], cast: Callable = str) -> Dict[str, Any]:
+    """Parse "name=value,name=value" (e.g. RAG_SCHEDULER_WEIGHTS) into a dict."""
+    parsed = {}
+    for item in (value or "").split(","):
+        if item.strip():
+            name, _, setting = item.partition("=")
+            parsed[name.strip()] = cast(setting.strip())
+    return parsed
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))], 2)
+
+class _Task:
+    """One queued request: its class, target executor and fair-queueing tags."""
+
+    def __init__(self, request_class: str, executor: str, fn: Callable, args: tuple, start_tag: float, finish_tag: float):
+        self.request_class = request_class
+        self.executor = executor
+        self.fn = fn
+        self.args = args
+        self.start_tag = start_tag
+        self.finish_tag = finish_tag
+        self.enqueued_at = time.perf_counter()
+        self.granted: Optional[asyncio.Future] = None
+
+class RequestScheduler:
+    """Weighted fair queueing of request classes over named thread pools.
+
+    Each class has a FIFO queue, a weight and a concurrency limit. When a worker frees up the
+    queued request with the smallest virtual finish tag (start-time fair queueing) among the
+    classes under their limit is started, so under contention each class gets worker time in
+    proportion to its weight and an idle class cannot bank credit. Queue state is only touched
+    on the event loop; the pools run the work.
+    """
+
+    def __init__(self, executors: Optional[Dict[str, int]] = None, weights: Optional[Dict[str, float]] = None,
+                 concurrency: Optional[Dict[str, int]] = None, max_queue: int = 256,
+                 interactive_slo_ms: float = 500.0, max_ingest_pause: float = 10.0,
+                 api_key_classes: Optional[Dict[str, str]] = None):
+        self.weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        self.concurrency = {**DEFAULT_CONCURRENCY, **(concurrency or {})}
+        unknown = (set(self.weights) | set(self.concurrency) | set((api_key_classes or {}).values())) \
+            - set(REQUEST_CLASSES)
+        if unknown:
+            raise ValueError(f"Unknown request classes {sorted(unknown)}; expected {REQUEST_CLASSES}")
+        self.workers = {**DEFAULT_EXECUTORS, **(executors or {})}
+        self.executors = {
+            name: ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"{name}-worker")
+            for name, workers in self.workers.items()
+        }
+        self.busy = {name: 0 for name in self.executors}
+        self.max_queue = max_queue
+        self.interactive_slo_ms = interactive_slo_ms
+        # Longest an ingest request or batch is held back at a time; past it ingestion is slowed, not stopped
+        self.max_ingest_pause = max_ingest_pause
+        self.api_key_classes = api_key_classes or {}
+
+        self.queues: Dict[str, deque] = {name: deque() for name in REQUEST_CLASSES}
+        self.running = {name: 0 for name in REQUEST_CLASSES}
+        self._finish_tags = {name: 0.0 for name in REQUEST_CLASSES}
+        self._virtual_time = 0.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._recheck: Optional[asyncio.TimerHandle] = None
+
+        self.counts = {name: {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0} for name in REQUEST_CLASSES}
+        self._wait_ms = {name: deque(maxlen=METRICS_WINDOW) for name in REQUEST_CLASSES}
+        self._run_ms = {name: deque(maxlen=METRICS_WINDOW) for name in REQUEST_CLASSES}
+        # (finished at, end-to-end ms) of interactive requests; read by ingest worker threads too
+        self._interactive = deque(maxlen=METRICS_WINDOW)
+        self._interactive_lock = threading.Lock()
+        # Ingest batches paused by the gate, and ingest requests started over the SLO after max_ingest_pause
+        self.ingest_stats = {"paused_batches": 0, "paused_seconds": 0.0, "started_over_slo": 0}
+
+    def classify(self, header: Optional[str], api_key: Optional[str], default: str) -> str:
+        """Request class from the API key mapping, else the X-Request-Class header, else the endpoint default."""
+        if api_key and api_key in self.api_key_classes:
+            return self.api_key_classes[api_key]
+        if header:
+            request_class = header.strip().lower()
+            if request_class not in REQUEST_CLASSES:
+                raise ValueError(f"Unknown request class {header!r}; expected one of {REQUEST_CLASSES}")
+            return request_class
+        return default
+
+    def interactive_p95_ms(self) -> Optional[float]:
+        """p95 end-to-end latency of interactive requests finished in the last SLO window."""
+        cutoff = time.monotonic() - SLO_WINDOW_SECONDS
+        with self._interactive_lock:
+            recent = [ms for finished, ms in self._interactive if finished >= cutoff]
+        return _percentile(recent, 95)
+
+    def over_slo(self) -> bool:
+        p95 = self.interactive_p95_ms()
+        return p95 is not None and p95 > self.interactive_slo_ms
+
+    def ingest_gate(self):
+        """Embedder batch gate: block an ingest worker while interactive latency is over its SLO."""
+        if not self.over_slo():
+            return
+        start = time.monotonic()
+        while self.over_slo() and time.monotonic() - start < self.max_ingest_pause:
+            time.sleep(THROTTLE_POLL_SECONDS)
+        self.ingest_stats["paused_batches"] += 1
+        self.ingest_stats["paused_seconds"] += time.monotonic() - start
+
+    async def run(self, request_class: str, executor: str, fn: Callable, *args) -> Any:
+        """Queue fn(*args) under request_class, run it on the named executor and return its result."""
+        self._loop = asyncio.get_running_loop()
+        queue = self.queues[request_class]
+        if len(queue) >= self.max_queue:
+            self.counts[request_class]["rejected"] += 1
+            raise SchedulerOverloaded(f"Too many queued {request_class} requests ({len(queue)})")
+
+        start_tag = max(self._virtual_time, self._finish_tags[request_class])
+        task = _Task(request_class, executor, fn, args, start_tag, start_tag + 1.0 / self.weights[request_class])
+        self._finish_tags[request_class] = task.finish_tag
+        task.granted = self._loop.create_future()
+        queue.append(task)
+        self.counts[request_class]["submitted"] += 1
+        self._dispatch()
+
+        try:
+            await task.granted
+        except asyncio.CancelledError:
+            # Client went away: drop the request, or give back a slot granted just before
+            if task in queue:
+                queue.remove(task)
+            else:
+                self._release(task)
+            raise
+
+        started = time.perf_counter()
+        self._wait_ms[request_class].append((started - task.enqueued_at) * 1000)
+        work = self.executors[executor].submit(fn, *args)
+        # Freed when the work finishes, even if the awaiting request was cancelled meanwhile
+        work.add_done_callback(lambda _: self._loop.call_soon_threadsafe(self._finish, task, started))
+        try:
+            result = await asyncio.wrap_future(work)
+        except Exception:
+            self.counts[request_class]["failed"] += 1
+            raise
+        self.counts[request_class]["completed"] += 1
+        if request_class == "interactive":
+            # Measured once the request resumes, so a saturated event loop counts against the SLO too
+            with self._interactive_lock:
+                self._interactive.append((time.monotonic(), (time.perf_counter() - task.enqueued_at) * 1000))
+        return result
+
+    def _finish(self, task: _Task, started: float):
+        self._run_ms[task.request_class].append((time.perf_counter() - started) * 1000)
+        self._release(task)
+
+    def _release(self, task: _Task):
+        self.running[task.request_class] -= 1
+        self.busy[task.executor] -= 1
+        self._dispatch()
+
+    def _eligible(self, request_class: str) -> bool:
+        queue = self.queues[request_class]
+        if not queue or self.running[request_class] >= self.concurrency[request_class]:
+            return False
+        head = queue[0]
+        if self.busy[head.executor] >= self.workers[head.executor]:
+            return False
+        if request_class == "ingest" and self.over_slo():
+            # Hold new ingestion while interactive traffic is slow, but never longer than max_ingest_pause
+            return time.perf_counter() - head.enqueued_at >= self.max_ingest_pause
+        return True
+
+    def _dispatch(self):
+        """Start queued requests, smallest finish tag first, while workers and class limits allow."""
+        while True:
+            candidates = [name for name in REQUEST_CLASSES if self._eligible(name)]
+            if not candidates:
+                break
+            request_class = min(candidates, key=lambda name: self.queues[name][0].finish_tag)
+            task = self.queues[request_class].popleft()
+            if request_class == "ingest" and self.over_slo():
+                self.ingest_stats["started_over_slo"] += 1
+            self._virtual_time = max(self._virtual_time, task.start_tag)
+            self.running[request_class] += 1
+            self.busy[task.executor] += 1
+            task.granted.set_result(None)
+
+        # A held ingest request has no completion to wake it; re-check the SLO shortly
+        if self.queues["ingest"] and self._recheck is None and self._loop is not None:
+            self._recheck = self._loop.call_later(THROTTLE_POLL_SECONDS, self._scheduled_recheck)
+
+    def _scheduled_recheck(self):
+        self._recheck = None
+        self._dispatch()
+
+    def shutdown(self):
+        for executor in self.executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def status(self) -> Dict[str, Any]:
+        """Per-class queue metrics and the ingest throttle state, for /health."""
+        classes = {}
+        for name in REQUEST_CLASSES:
+            wait_ms, run_ms = list(self._wait_ms[name]), list(self._run_ms[name])
+            classes[name] = {
+                "weight": self.weights[name],
+                "concurrency_limit": self.concurrency[name],
+                "queued": len(self.queues[name]),
+                "running": self.running[name],
+                **self.counts[name],
+                "wait_p50_ms": _percentile(wait_ms, 50),
+                "wait_p95_ms": _percentile(wait_ms, 95),
+                "run_p50_ms": _percentile(run_ms, 50),
+                "run_p95_ms": _percentile(run_ms, 95)
+            }
+        return {
+            "classes": classes,
+            "executors": {name: {"workers": self.workers[name], "busy": self.busy[name]} for name in self.executors},
+            "interactive_slo_ms": self.interactive_slo_ms,
+            "interactive_p95_ms": self.interactive_p95_ms(),
+            "ingest_paused": self.over_slo(),
+            **{f"ingest_{key}": round(value, 3) if isinstance(value, float) else value
+               for key, value in self.ingest_stats.items()}
+        }
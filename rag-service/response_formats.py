@@ -0,0 +1,82 @@
+"""
+Response encoding for search results.
+Supports JSON and msgpack (negotiated via the Accept header) and field projection,
+so high-volume callers can skip Pydantic validation and full-text payloads.
+"""
+
+from typing import List, Dict, Any, Optional
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+# Top-level keys of a search result; any other projected field is read from metadata
+RESULT_FIELDS = ("text", "metadata", "chunk_index", "token_count", "similarity_score")
+
+def negotiate_format(accept: Optional[str]) -> str:
+    """Pick the response format from an Accept header ("json" or "msgpack")."""
+    if not accept:
+        return "json"
+
+    best_format, best_quality = "json", 0.0
+    for part in accept.split(","):
+        media_type, _, params = part.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+
+        media_type = media_type.strip().lower()
+        if media_type in MSGPACK_MEDIA_TYPES and quality > best_quality:
+            best_format, best_quality = "msgpack", quality
+        elif media_type in (JSON_MEDIA_TYPE, "*/*") and quality > best_quality:
+            best_format, best_quality = "json", quality
+
+    return best_format
+
+def truncate_text(text: str, max_chars: int) -> str:
+    """Truncate text the same way demo_service builds document_preview."""
+    return text[:max_chars] + "..." if len(text) > max_chars else text
+
+def project_results(results: List[Dict[str, Any]], fields: Optional[List[str]] = None,
+                    text_chars: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Reduce search results to the requested fields, optionally truncating text."""
+    if not fields and text_chars is None:
+        return results
+
+    projected = []
+    for result in results:
+        if fields:
+            metadata = result.get("metadata", {})
+            item = {}
+            for field in fields:
+                if field in RESULT_FIELDS:
+                    if field in result:
+                        item[field] = result[field]
+                else:
+                    item[field] = metadata.get(field)
+        else:
+            item = dict(result)
+
+        if text_chars is not None and "text" in item:
+            item["text"] = truncate_text(item["text"], text_chars)
+        projected.append(item)
+
+    return projected
+
+def encode_msgpack(payload: Dict[str, Any]) -> bytes:
+    """Serialize a payload with msgpack (imported on first use)."""
+    import msgpack
+    return msgpack.packb(payload, use_bin_type=True)
+
+def msgpack_available() -> bool:
+    """Check whether the optional msgpack dependency is installed."""
+    try:
+        import msgpack  # noqa: F401
+    except ImportError:
+        return False
+    return True
@@ -0,0 +1,117 @@
+"""
+Semantic query-result cache.
+Keeps a small FAISS index of recent query embeddings and returns cached results when a new
+query is within a cosine threshold of a cached one with the same search parameters.
+Entries are LRU-evicted and invalidated when the vector store generation changes.
+"""
+
+import random
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+# How many nearest cached queries to check for a parameter match
+_NEIGHBOURS = 8
+
+def _result_key(result: Dict[str, Any]) -> Tuple[str, int]:
+    return (result.get("metadata", {}).get("document_id", ""), result.get("chunk_index", 0))
+
+class SemanticQueryCache:
+    """LRU cache of search results keyed on query-embedding similarity plus exact parameters."""
+
+    def __init__(self, dimension: int, threshold: float = 0.95, max_entries: int = 1024,
+                 verify_rate: float = 0.0):
+        self.dimension = dimension
+        self.threshold = threshold
+        self.max_entries = max_entries
+        # Fraction of hits re-checked against a real search to measure false hits
+        self.verify_rate = verify_rate
+        self.index = self._new_index(dimension)
+        self.entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self.generation = None
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.metrics = {"hits": 0, "misses": 0, "verified_hits": 0, "false_hits": 0,
+                        "evictions": 0, "invalidations": 0}
+
+    def _new_index(self, dimension: int):
+        import faiss
+        return faiss.IndexIDMap(faiss.IndexFlatIP(dimension))
+
+    def _normalize(self, embedding: np.ndarray) -> np.ndarray:
+        vector = np.array(embedding, dtype="float32").reshape(1, -1)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _check_generation(self, generation: int, dimension: int):
+        if generation != self.generation:
+            if self.entries:
+                self.metrics["invalidations"] += 1
+            self.index.reset()
+            self.entries.clear()
+            self.generation = generation
+        # A migration to another embedding model changes the query dimension
+        if dimension != self.dimension:
+            self.dimension = dimension
+            self.index = self._new_index(dimension)
+            self.entries.clear()
+
+    def lookup(self, embedding: np.ndarray, params: tuple, generation: int) -> Optional[List[Dict[str, Any]]]:
+        """Return cached results for a similar query with identical params, or None."""
+        vector = self._normalize(embedding)
+        with self._lock:
+            self._check_generation(generation, vector.shape[1])
+            if self.entries:
+                scores, ids = self.index.search(vector, min(_NEIGHBOURS, len(self.entries)))
+                for score, entry_id in zip(scores[0], ids[0]):
+                    if entry_id < 0 or score < self.threshold:
+                        break
+                    entry = self.entries.get(int(entry_id))
+                    if entry is not None and entry["params"] == params:
+                        self.entries.move_to_end(int(entry_id))
+                        self.metrics["hits"] += 1
+                        return [result.copy() for result in entry["results"]]
+            self.metrics["misses"] += 1
+            return None
+
+    def should_verify(self) -> bool:
+        """Whether a hit should be re-checked against a real search (sampled)."""
+        return self.verify_rate > 0 and random.random() < self.verify_rate
+
+    def record_verification(self, cached: List[Dict[str, Any]], fresh: List[Dict[str, Any]]) -> bool:
+        """Compare a cached answer with a fresh one. Returns True if the hit was false."""
+        false_hit = [_result_key(r) for r in cached] != [_result_key(r) for r in fresh]
+        with self._lock:
+            self.metrics["verified_hits"] += 1
+            if false_hit:
+                self.metrics["false_hits"] += 1
+        return false_hit
+
+    def store(self, embedding: np.ndarray, params: tuple, generation: int, results: List[Dict[str, Any]]):
+        """Cache results for a query, evicting the least recently used entry if full."""
+        vector = self._normalize(embedding)
+        with self._lock:
+            self._check_generation(generation, vector.shape[1])
+            while len(self.entries) >= self.max_entries:
+                evicted_id, _ = self.entries.popitem(last=False)
+                self.index.remove_ids(np.array([evicted_id], dtype="int64"))
+                self.metrics["evictions"] += 1
+
+            entry_id = self._next_id
+            self._next_id += 1
+            self.index.add_with_ids(vector, np.array([entry_id], dtype="int64"))
+            self.entries[entry_id] = {"params": params, "results": [result.copy() for result in results]}
+
+    def status(self) -> Dict[str, Any]:
+        """Cache size and hit/false-hit metrics for /health."""
+        lookups = self.metrics["hits"] + self.metrics["misses"]
+        verified = self.metrics["verified_hits"]
+        return {
+            "entries": len(self.entries),
+            "threshold": self.threshold,
+            "hit_rate": round(self.metrics["hits"] / lookups, 4) if lookups else 0.0,
+            "false_hit_rate": round(self.metrics["false_hits"] / verified, 4) if verified else 0.0,
+            **self.metrics
+        }
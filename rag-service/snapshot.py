@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Portable index snapshots for build-once, serve-many deployments.
+A snapshot is a single gzip-compressed tar archive holding the flat FAISS index, the chunks
+as JSON lines (no pickle), the corpus statistics, the document catalog and the model
+metadata, led by a manifest with the format version and a SHA-256 per member. Archives are
+written and read as streams, and an import is fully verified before it can be activated.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import tarfile
+import tempfile
+import time
+import zlib
+from typing import Dict, Any, BinaryIO, Optional, Tuple
+
+from rag_processor import FAISSVectorStore, DEFAULT_VECTOR_STORE_PATH, read_store_metadata, _lazy_import
+from corpus_stats import CorpusStats
+from document_catalog import DocumentCatalog
+from document_index import DocumentIndex
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = "banking-rag-snapshot"
+SNAPSHOT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+SNAPSHOT_MEMBERS = ("index.faiss", "chunks.jsonl", "stats.json", "catalog.json", "meta.json")
+# Document summary index; absent from older snapshots, which rebuild it from first chunks
+OPTIONAL_MEMBERS = ("index.docs.faiss", "index.docs.json")
+
+# Read/write granularity when hashing and copying members
+COPY_BUFFER_SIZE = 1024 * 1024
+
+class SnapshotError(Exception):
+    """Raised for malformed, corrupt or incompatible snapshots."""
+
+def _sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(COPY_BUFFER_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _write_members(vector_store: FAISSVectorStore, directory: str) -> Dict[str, Any]:
+    """Write the store's snapshot members into directory and return the manifest.
+
+    The store lock is only held to copy its contents; serialising and hashing happen without it.
+    """
+    contents = vector_store.copy_contents()
+    contents.write_index(os.path.join(directory, "index.faiss"))
+    with open(os.path.join(directory, "chunks.jsonl"), "w", encoding="utf-8") as f:
+        for chunk in contents.chunks:
+            f.write(json.dumps(chunk) + "\n")
+    contents.stats.save(os.path.join(directory, "stats.json"))
+    contents.catalog.save(os.path.join(directory, "catalog.json"))
+    with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(contents.metadata, f)
+    contents.document_index.save(os.path.join(directory, "index"))
+
+    return {
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "model": contents.metadata,
+        "vectors": contents.vectors,
+        "documents": len(contents.catalog),
+        # Change-log position the contents correspond to; followers resume tailing after it
+        "replication_seq": contents.replication_seq,
+        "members": {
+            name: {
+                "sha256": _sha256_file(os.path.join(directory, name)),
+                "bytes": os.path.getsize(os.path.join(directory, name))
+            }
+            for name in SNAPSHOT_MEMBERS + OPTIONAL_MEMBERS
+        }
+    }
+
+def export_snapshot(vector_store: FAISSVectorStore, fileobj: BinaryIO) -> Dict[str, Any]:
+    """Stream a snapshot of the store to a writable binary file object. Returns the manifest."""
+    with tempfile.TemporaryDirectory() as tmp:
+        manifest = _write_members(vector_store, tmp)
+        with open(os.path.join(tmp, MANIFEST_NAME), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+        # Stream mode: members are copied block by block, the archive is never held in memory
+        with tarfile.open(fileobj=fileobj, mode="w|gz") as tar:
+            for name in (MANIFEST_NAME, *SNAPSHOT_MEMBERS, *OPTIONAL_MEMBERS):
+                tar.add(os.path.join(tmp, name), arcname=name)
+
+    logger.info(f"Exported snapshot: {manifest['vectors']} vectors, {manifest['documents']} documents")
+    return manifest
+
+def export_snapshot_file(vector_store: FAISSVectorStore, path: str) -> Dict[str, Any]:
+    """Write a snapshot to path atomically. Returns the manifest with the archive's SHA-256."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        manifest = export_snapshot(vector_store, f)
+    os.replace(tmp_path, path)
+    return {**manifest, "archive_sha256": _sha256_file(path)}
+
+def _check_manifest(manifest: Dict[str, Any]):
+    """Reject manifests missing the fields an import reads, rather than failing on them later."""
+    members = manifest.get("members")
+    if not isinstance(members, dict) or not all(isinstance(entry, dict) for entry in members.values()):
+        raise SnapshotError("Snapshot manifest has no valid member list")
+    model = manifest.get("model")
+    if not isinstance(model, dict) or not isinstance(model.get("model_name"), str) \
+            or not isinstance(model.get("dimension"), int):
+        raise SnapshotError("Snapshot manifest has no valid model metadata")
+    if not isinstance(manifest.get("vectors"), int) or not isinstance(manifest.get("replication_seq", 0), int):
+        raise SnapshotError("Snapshot manifest has no valid vector count")
+
+def read_snapshot(fileobj: BinaryIO, directory: str) -> Dict[str, Any]:
+    """Stream-extract a snapshot into directory, verifying the version and every checksum."""
+    manifest = None
+    digests: Dict[str, Tuple[str, int]] = {}
+    try:
+        with tarfile.open(fileobj=fileobj, mode="r|gz") as tar:
+            for member in tar:
+                if member.name == MANIFEST_NAME:
+                    manifest = json.load(tar.extractfile(member))
+                    if not isinstance(manifest, dict) or manifest.get("format") != SNAPSHOT_FORMAT:
+                        raise SnapshotError("Not a banking RAG snapshot")
+                    if manifest.get("version") != SNAPSHOT_VERSION:
+                        raise SnapshotError(
+                            f"Unsupported snapshot version {manifest.get('version')} (expected {SNAPSHOT_VERSION})"
+                        )
+                    continue
+                # Only known flat member names are written, so nothing can escape the directory
+                if member.name not in SNAPSHOT_MEMBERS + OPTIONAL_MEMBERS or not member.isfile() \
+                        or member.name in digests:
+                    raise SnapshotError(f"Unexpected snapshot member {member.name!r}")
+
+                digest = hashlib.sha256()
+                source = tar.extractfile(member)
+                with open(os.path.join(directory, member.name), "wb") as out:
+                    for block in iter(lambda: source.read(COPY_BUFFER_SIZE), b""):
+                        digest.update(block)
+                        out.write(block)
+                digests[member.name] = (digest.hexdigest(), member.size)
+    except (tarfile.TarError, EOFError, zlib.error, json.JSONDecodeError) as e:
+        raise SnapshotError(f"Corrupt snapshot archive: {e}")
+
+    if manifest is None:
+        raise SnapshotError("Snapshot has no manifest")
+    _check_manifest(manifest)
+    # Every extracted member is verified; optional ones the manifest does not list are rejected
+    unlisted = sorted(set(digests) - set(manifest["members"]))
+    if unlisted:
+        raise SnapshotError(f"Snapshot members not listed in the manifest: {unlisted}")
+    for name in SNAPSHOT_MEMBERS + tuple(name for name in OPTIONAL_MEMBERS if name in manifest["members"]):
+        expected = manifest["members"].get(name, {})
+        if digests.get(name) != (expected.get("sha256"), expected.get("bytes")):
+            raise SnapshotError(f"Checksum mismatch for snapshot member {name}")
+    return manifest
+
+def load_snapshot(fileobj: BinaryIO, model_name: Optional[str] = None) -> Tuple[FAISSVectorStore, Dict[str, Any]]:
+    """Verify a snapshot and build a new (not yet active) vector store from it.
+
+    With model_name, snapshots built with another embedding model are refused.
+    """
+    faiss = _lazy_import("faiss")
+    with tempfile.TemporaryDirectory() as tmp:
+        manifest = read_snapshot(fileobj, tmp)
+        model = manifest["model"]
+        if model_name and model["model_name"] != model_name:
+            raise SnapshotError(f"Snapshot was built with {model['model_name']} but this service uses {model_name}")
+
+        index = faiss.read_index(os.path.join(tmp, "index.faiss"))
+        if index.d != model["dimension"] or index.ntotal != manifest["vectors"]:
+            raise SnapshotError(f"Snapshot index holds {index.ntotal} {index.d}-d vectors, manifest disagrees")
+        with open(os.path.join(tmp, "chunks.jsonl"), encoding="utf-8") as f:
+            chunks = [json.loads(line) for line in f]
+        if len(chunks) != index.ntotal:
+            raise SnapshotError(f"Snapshot has {len(chunks)} chunks for {index.ntotal} vectors")
+
+        store = FAISSVectorStore(model["dimension"], model["model_name"])
+        store.set_contents(
+            index, chunks,
+            CorpusStats.load(os.path.join(tmp, "stats.json")),
+            DocumentCatalog.load(os.path.join(tmp, "catalog.json")),
+            DocumentIndex.load(os.path.join(tmp, "index"), model["dimension"])
+        )
+        store.replication_seq = manifest.get("replication_seq", 0)
+
+    logger.info(f"Verified snapshot from {manifest.get('created_at', 'unknown date')}: {manifest['vectors']} vectors")
+    return store, manifest
+
+def main():
+    parser = argparse.ArgumentParser(description="Export, verify or import vector store snapshots")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Write a snapshot of a saved store")
+    export_parser.add_argument("output", help="Snapshot file to write ('-' for stdout)")
+    export_parser.add_argument("--store", default=DEFAULT_VECTOR_STORE_PATH, help="Vector store path (without extension)")
+
+    verify_parser = subparsers.add_parser("verify", help="Check a snapshot's version and checksums")
+    verify_parser.add_argument("snapshot", help="Snapshot file ('-' for stdin)")
+
+    import_parser = subparsers.add_parser("import", help="Verify a snapshot and save it as a store")
+    import_parser.add_argument("snapshot", help="Snapshot file ('-' for stdin)")
+    import_parser.add_argument("--store", default=DEFAULT_VECTOR_STORE_PATH, help="Vector store path to write")
+    import_parser.add_argument("--model", help="Refuse snapshots built with another embedding model")
+    args = parser.parse_args()
+
+    def open_input(path: str) -> BinaryIO:
+        return sys.stdin.buffer if path == "-" else open(path, "rb")
+
+    try:
+        if args.command == "export":
+            metadata = read_store_metadata(args.store)
+            store = FAISSVectorStore(metadata["dimension"], metadata["model_name"]) if metadata else FAISSVectorStore()
+            store.load(args.store)
+            if args.output == "-":
+                manifest = export_snapshot(store, sys.stdout.buffer)
+            else:
+                manifest = export_snapshot_file(store, args.output)
+                logger.info(f"Wrote {args.output} (sha256 {manifest['archive_sha256']})")
+        elif args.command == "verify":
+            with open_input(args.snapshot) as f, tempfile.TemporaryDirectory() as tmp:
+                manifest = read_snapshot(f, tmp)
+            print(json.dumps(manifest, indent=2))
+        else:
+            with open_input(args.snapshot) as f:
+                store, manifest = load_snapshot(f, model_name=args.model)
+            store.save(args.store)
+            logger.info(f"Imported snapshot into {args.store}")
+    except SnapshotError as e:
+        logger.error(f"Snapshot rejected: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
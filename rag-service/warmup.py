@@ -0,0 +1,136 @@
+"""
+Startup warm-up for the search path.
+Loads the model and tokenizer, pre-faults the index pages and replays representative
+queries through search_banking_context so the first real requests do not pay for lazy
+initialization, and so the semantic query cache starts populated.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import deque
+from typing import List, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Replayed when no query file is configured
+DEFAULT_WARMUP_QUERIES = [
+    {"query": "What are the Basel III capital requirements?"},
+    {"query": "What are the FRY-9C reporting requirements?"},
+    {"query": "Tell me about the Liquidity Coverage Ratio"},
+    {"query": "Enhanced prudential standards under Regulation YY"},
+    {"query": "Anti-money laundering program requirements", "risk_type": "Compliance Risk"},
+    {"query": "Model risk management and validation"},
+    {"query": "Cybersecurity risk management expectations"},
+    {"query": "Organizational structure reporting on FR Y-10 and FR Y-6"},
+]
+
+# search_banking_context keyword arguments accepted from a query file
+SEARCH_PARAMS = ("risk_type", "document_type", "top_k", "diversify", "mmr_lambda",
+                 "max_per_document", "merge_adjacent", "date_from", "date_to", "min_score",
+                 "top_documents")
+# DocumentQuery.max_results default: the hit cap in threshold (min_score) mode
+DEFAULT_MAX_RESULTS = 50
+
+def search_params(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """search_banking_context arguments for a logged /search request, resolved the way /search does.
+
+    In threshold mode max_results is the cap and top_k is ignored; otherwise max_results is unused.
+    """
+    params = {k: entry[k] for k in SEARCH_PARAMS if entry.get(k) is not None}
+    if params.get("min_score") is not None:
+        params["top_k"] = entry.get("max_results", DEFAULT_MAX_RESULTS)
+    return params
+
+def load_warmup_queries(path: Optional[str], limit: int = 50) -> List[Dict[str, Any]]:
+    """Read warm-up queries from a file: JSONL with a "query" key (query logs) or plain lines.
+
+    The most recent `limit` entries are kept. Without a path, the built-in set is used.
+    """
+    if not path:
+        return DEFAULT_WARMUP_QUERIES[:limit]
+
+    # Only the last `limit` entries are held while the log is read
+    queries = deque(maxlen=limit)
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                entry = json.loads(line)
+                # Query logs also record failed requests; only replay the ones that succeeded
+                if not entry.get("query") or entry.get("status", 200) != 200:
+                    continue
+                queries.append({"query": entry["query"], **search_params(entry)})
+            else:
+                queries.append({"query": line})
+    return list(queries)
+
+class SearchWarmUp:
+    """Runs the warm-up once, optionally on a background thread, and reports readiness."""
+
+    def __init__(self, processor, queries: List[Dict[str, Any]]):
+        self.processor = processor
+        self.queries = queries
+        self._thread: Optional[threading.Thread] = None
+        self._done = threading.Event()
+        self.stats = {
+            "queries": len(queries),
+            "queries_replayed": 0,
+            "query_errors": 0,
+            "model_load_seconds": None,
+            "prefault_seconds": None,
+            "first_query_ms": None,
+            "last_query_ms": None,
+            "seconds": None
+        }
+
+    @property
+    def ready(self) -> bool:
+        return self._done.is_set()
+
+    def run(self):
+        """Load lazy resources, pre-fault the index and replay the queries."""
+        start = time.perf_counter()
+        try:
+            step = time.perf_counter()
+            self.processor.embedder.model
+            self.processor.embedder.encoding
+            self.stats["model_load_seconds"] = round(time.perf_counter() - step, 4)
+
+            vector_store = self.processor.vector_store
+            if vector_store.index.ntotal:
+                step = time.perf_counter()
+                vector_store.prefault()
+                self.stats["prefault_seconds"] = round(time.perf_counter() - step, 4)
+
+                for query in self.queries:
+                    step = time.perf_counter()
+                    try:
+                        self.processor.search_banking_context(**query)
+                    except Exception as e:
+                        self.stats["query_errors"] += 1
+                        logger.warning(f"Warm-up query failed ({query.get('query')}): {e}")
+                        continue
+                    elapsed_ms = round((time.perf_counter() - step) * 1000, 2)
+                    if self.stats["first_query_ms"] is None:
+                        self.stats["first_query_ms"] = elapsed_ms
+                    self.stats["last_query_ms"] = elapsed_ms
+                    self.stats["queries_replayed"] += 1
+        except Exception as e:
+            logger.error(f"Warm-up failed: {e}")
+        finally:
+            self.stats["seconds"] = round(time.perf_counter() - start, 4)
+            self._done.set()
+            logger.info(f"Warm-up finished: {self.stats}")
+
+    def start(self):
+        """Run the warm-up on a background thread."""
+        self._thread = threading.Thread(target=self.run, name="search-warmup", daemon=True)
+        self._thread.start()
+
+    def status(self) -> Dict[str, Any]:
+        """Warm-up progress for /health."""
+        return {"ready": self.ready, **self.stats}